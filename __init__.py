@@ -1,11 +1,26 @@
 import hashlib
+import os
+import threading
+from collections import OrderedDict
 from mycroft import intent_file_handler
 from mycroft.skills.common_play_skill import CommonPlaySkill, CPSMatchLevel
 from mycroft.skills.audioservice import AudioService
 from mycroft.api import DeviceApi
+from mycroft.messagebus.message import Message
 
-from .emby_croft import EmbyCroft
 from .music_info import Music_info
+from .metrics import Metrics
+from .structured_log import StructuredLog, redact
+from .deadline import Deadline, within, remaining
+
+TOKEN_FILE = "emby_token.json"            # access token kept across restarts
+INDEX_FILE = "emby_library.db"            # local index of the music library
+INDEX_SYNC_DELAY = 30                     # seconds after load before the first library sync
+INDEX_SYNC_INTERVAL = 900                 # seconds between library syncs
+CPS_MATCH_CACHE_SIZE = 8                  # common play matches kept for CPS_start
+CPS_MATCH_BUDGET = 4                      # seconds to answer a common play query, under the playback control's wait
+METRICS_FILE = "emby_metrics.prom"        # Prometheus text file of the request metrics
+METRICS_INTERVAL = 60                     # seconds between metrics exports
 
 class Emby(CommonPlaySkill):
 
@@ -14,15 +29,105 @@ class Emby(CommonPlaySkill):
         self._setup = False
         self.audio_service = None
         self.emby_croft = None
-        self.device_id = hashlib.md5(
-            ('Emby'+DeviceApi().identity.uuid).encode())\
-            .hexdigest()
+        self.cps_matches = OrderedDict()  # phrase -> Music_info from the CPS match phase
+        self.cps_matches_lock = threading.Lock() # matches are stored and claimed from different threads
+        self.metrics = Metrics()          # kept across reconnects
+        self.breaker = None               # CircuitBreaker kept across reconnects, created with the first client
+        self.connect_lock = threading.Lock() # one connection attempt at a time
+        self._device_id = None
+
+    @property
+    def device_id(self):
+        """
+        Emby client ID of this device, only worked out when the first connection is made
+        """
+        if self._device_id is None:
+            self._device_id = hashlib.md5(
+                ('Emby'+DeviceApi().identity.uuid).encode())\
+                .hexdigest()
+        return self._device_id
 
     def initialize(self):
-        pass
+        self.settings_change_callback = self.on_settings_changed
+        self.apply_log_settings()
+        self.schedule_event(self.connect_in_background, 0, name='EmbyConnect')
+        self.schedule_repeating_event(self.sync_library_index, INDEX_SYNC_DELAY,
+                                      INDEX_SYNC_INTERVAL, name='EmbySyncLibrary')
+        self.schedule_repeating_event(self.export_metrics, METRICS_INTERVAL,
+                                      METRICS_INTERVAL, name='EmbyExportMetrics')
+        self.add_event('emby-skill.metrics.get', self.handle_metrics_request)
+        self.add_event('play:start', self.handle_play_start)
+
+    def export_metrics(self):
+        """
+        Write the request metrics where a scraper can read them and announce them on the message bus
+        """
+        try:
+            self.metrics.write(os.path.join(self.file_system.path, METRICS_FILE))
+        except OSError as e:
+            self.log.log(20, "export_metrics() failed to write metrics, error: {0}".format(str(e)))
+        self.bus.emit(Message('emby-skill.metrics', self.metrics.snapshot()))
+
+    def handle_metrics_request(self, message):
+        """
+        Reply to emby-skill.metrics.get with the request metrics
+        """
+        self.bus.emit(message.response(self.metrics.snapshot()))
+
+    def handle_play_start(self, message):
+        """
+        When the playback control picked another skill, stop fetching tracks for our match
+        """
+        if message.data.get("skill_id") != self.skill_id and self._setup:
+            self.emby_croft.client.drop_speculative()
+
+    def connect_in_background(self):
+        """
+        Log in right after the skill loads and fetch the name tables, so the
+        first intent is resolved as fast as later ones
+        """
+        if not self.connect_to_emby():
+            return
+        with self.metrics.intent('warm_up'):
+            self.emby_croft.warm_up()
+        self.log.log(20, "connect_in_background() warm up "+str(self.emby_croft.client.warm_up_progress))
+
+    def sync_library_index(self):
+        """
+        Bring the local library index up to date in the background so that
+        phrases can be resolved without searching the server
+        The client skips the sync while intents are being handled
+        """
+        if not self.connect_to_emby() or self.breaker.is_open():
+            return
+        try:
+            with self.metrics.intent('sync_library_index'):
+                self.emby_croft.sync_library()
+        except Exception as e:
+            self.log.log(20, "sync_library_index() failed, error: {0}".format(redact(str(e))))
+
+    def on_settings_changed(self):
+        """
+        Drop the authenticated client so the next intent logs in with the new settings,
+        which may name a server that is up
+        """
+        self._setup = False
+        if self.breaker is not None:
+            self.breaker.reset()
+        self.apply_log_settings()
+
+    def apply_log_settings(self):
+        """
+        In quiet mode the client only logs warnings and the timings and counts of intents
+        """
+        StructuredLog.set_quiet(str(self.settings.get("quiet_logging", False)).lower() == "true")
 
     @intent_file_handler('emby.intent')
     def handle_emby(self, message):
+        with self.metrics.intent('handle_emby'):
+            self._handle_emby(message)
+
+    def _handle_emby(self, message):
 
         self.log.log(20, message.data)
 
@@ -32,13 +137,13 @@ class Emby(CommonPlaySkill):
             return
 
         # determine intent
-        intent, intent_type = EmbyCroft.determine_intent(message.data)
+        intent, intent_type = self.emby_croft.determine_intent(message.data)
 
         songs = []
         try:
             songs = self.emby_croft.handle_intent(intent, intent_type)
         except Exception as e:
-            self.log.log(20, "handle_emby() e = "+e)
+            self.log.log(20, "handle_emby() e = "+redact(str(e)))
             self.speak_dialog('play_fail', {"media": intent})
 
         if not songs or len(songs) < 1:
@@ -85,6 +190,10 @@ class Emby(CommonPlaySkill):
     # NEW CODE - for manipulating playlists
     @intent_file_handler('playlist.intent')
     def handle_playlist(self, message):
+      with self.metrics.intent('handle_playlist'):
+        self._handle_playlist(message)
+
+    def _handle_playlist(self, message):
       utterance = str(message.data["utterance"])
       self.log.log(20, "handle_playlist(): utterance = "+utterance) 
       if not self.connect_to_emby():        # connect to emby or bail
@@ -101,93 +210,143 @@ class Emby(CommonPlaySkill):
     def stop(self):
         pass
 
+    def shutdown(self):
+        if self.breaker is not None:      # stop probing
+            self.breaker.reset()
+        if self.emby_croft is not None:
+            self.emby_croft.client.close()
+
     def CPS_start(self, phrase, data):
         """ Starts playback.
             Called by the playback control skill to start playback if the
             skill is selected (has the best match level)
+            The tracks of the match are only fetched now
         """
-        # setup audio service
+        if not self.connect_to_emby():
+            self.speak_dialog('configuration_fail')
+            return
+        with self.cps_matches_lock:
+            music_info = self.cps_matches.pop(phrase, None)
+        if music_info is None:            # not in the handoff cache, rebuild it from the data
+            match = data[phrase]
+            music_info = Music_info(None, "", {}, match["track_ids"] or None,
+                                    self.emby_croft.client.get_song_file, match["entity"])
+        try:
+            with self.metrics.intent('CPS_start'):
+                music_info = self.emby_croft.expand_music(music_info)
+        except Exception as e:            # e.g. the server went away since the match
+            self.log.log(20, "CPS_start() failed to fetch tracks, error: {0}".format(redact(str(e))))
+            self.speak_dialog('play_fail', {"media": phrase})
+            return
+        if music_info.mesg_file:
+            self.speak_dialog(music_info.mesg_file, music_info.mesg_info, wait=True)
+        if not music_info.track_ids:
+            self.speak_dialog('play_fail', {"media": phrase})
+            return
+
+        # setup audio service, stream URLs are only built now
         self.audio_service = AudioService(self.bus)
-        self.audio_service.play(data[phrase])
+        self.audio_service.play(list(music_info.track_uris))
 
     def CPS_match_query_phrase(self, phrase):
         """ This method responds whether the skill can play the input phrase.
             The method is invoked by the PlayBackControlSkill.
+            Only the match level is decided here; the tracks are fetched
+            in CPS_start if this skill wins
+            While the server is down, only the local index and cached
+            lookups can match, anything else is declined at once
+            Connecting and matching share CPS_MATCH_BUDGET seconds; music
+            found without its tracks when they run out is still a match
             Returns: tuple (matched phrase(str),
                             match level(CPSMatchLevel),
                             optional data(dict))
                      or None if no match was found.
         """
-        # first thing is connect to emby or bail
-        if not self.connect_to_emby():
-            return None
+        deadline = Deadline(CPS_MATCH_BUDGET)
+        with within(deadline):
+            # first thing is connect to emby or bail
+            if not self.connect_to_emby():
+                return None
 
-        # NEW CODE
-        songs = []
-        self.log.log(20, "CPS_match_query_phrase() phrase = "+phrase)
-        music_info = self.emby_croft.parse_common_phrase(phrase)
+            self.log.log(20, "CPS_match_query_phrase() phrase = "+phrase)
+            try:
+                with self.metrics.intent('CPS_match_query_phrase'):
+                    music_info = self.emby_croft.match_common_phrase(phrase, deadline)
+            except Exception as e:
+                self.log.log(20, "CPS_match_query_phrase() failed to match, error: {0}".format(redact(str(e))))
+                return None
         match_type = music_info.match_type
-        self.log.log(20, "CPS_match_query_phrase() match_type = "+match_type)
-        mesg_file = music_info.mesg_file
-        mesg_info = music_info.mesg_info
-        songs = music_info.track_uris
-        self.log.log(20, "CPS_match_query_phrase() type(songs) = "+str(type(songs)))
-        if mesg_file != None:
-          self.log.log(20, "CPS_match_query_phrase() mesg_file = "+mesg_file)
-          if mesg_info != None:
-            self.log.log(20, "CPS_match_query_phrase() mesg_info = "+str(mesg_info))
-          self.log.log(20, "CPS_match_query_phrase() calling speak.dialog with wait=True")  
-        #  self.speak_dialog(mesg_file, mesg_info, wait=True) # have Mycroft speak the message
-          self.speak_dialog(mesg_file, mesg_info) # have Mycroft speak the message
-        # END NEW CODE  
-
-        if match_type and songs:
-            match_level = None
-            if match_type is not None:
-                if match_type == 'song' or match_type == 'album':
-                    match_level = CPSMatchLevel.TITLE
-                    match_level = CPSMatchLevel.EXACT
-                elif match_type == 'artist':
-                    match_level = CPSMatchLevel.ARTIST
-                    match_level = CPSMatchLevel.EXACT
-            self.log.log(20, "CPS_match_query_phrase() match level = "+str(match_level))
-
-            song_data = dict()
-            song_data[phrase] = songs
-            # NEW CODE
-            num_songs = len(songs)
-            # self.log.log(20, "First 3 item urls returned")
-            self.log.log(20, "CPS_match_query_phrase() first "+str(num_songs)+" item urls returned")
-            # END NEW CODE
-            max_songs_to_log = 3
-            songs_logged = 0
-            for song in songs:
-                self.log.log(20, "CPS_match_query_phrase() song = "+str(song))
-                songs_logged = songs_logged + 1
-                if songs_logged >= max_songs_to_log:
-                    break
-
-            return phrase, match_level, song_data
-        else:
+        self.log.log(20, "CPS_match_query_phrase() match_type = "+str(match_type))
+        if not match_type or (music_info.entity is None and not music_info.track_ids):
+            if music_info.mesg_file:
+                self.log.log(20, "CPS_match_query_phrase() not matched, mesg_file = "+music_info.mesg_file)
             return None
 
+        match_level = None
+        # only a name matched as said claims the request outright; one that
+        # just sounds like it must not take it from a skill that knows better
+        if match_type == 'song' or match_type == 'album':
+            match_level = CPSMatchLevel.EXACT if music_info.exact else CPSMatchLevel.TITLE
+        elif match_type == 'artist':
+            match_level = CPSMatchLevel.EXACT if music_info.exact else CPSMatchLevel.ARTIST
+        self.log.log(20, "CPS_match_query_phrase() match level = "+str(match_level))
+
+        # hand the match over to CPS_start
+        with self.cps_matches_lock:
+            self.cps_matches[phrase] = music_info
+            while len(self.cps_matches) > CPS_MATCH_CACHE_SIZE:
+                self.cps_matches.popitem(last=False)
+        song_data = dict()
+        song_data[phrase] = {"entity": music_info.entity,
+                             "track_ids": list(music_info.track_ids or [])}
+        return phrase, match_level, song_data
+
     def connect_to_emby(self, diagnostic=False):
         """
         Attempts to connect to the server based on the config
         if diagnostic is False an attempt to auth is also made
         returns true/false on success/failure respectively
+        An authenticated connection is kept for the life of the skill,
+        so later calls return immediately without logging in again
+        While the circuit breaker says the server is down, no attempt is made
 
         :return:
         """
+        if self._setup and not diagnostic:
+            return True
+        if self.breaker is not None and self.breaker.is_open() and not diagnostic:
+            return False
+        left = remaining()                # an intent waits for the background connection, within its deadline
+        if not self.connect_lock.acquire(timeout=-1 if left is None else left):
+            return False
+        try:
+            if self._setup and not diagnostic:
+                return True
+            return self._connect(diagnostic)
+        finally:
+            self.connect_lock.release()
+
+    def _connect(self, diagnostic):
+        from .emby_croft import EmbyCroft  # loads the client modules on first use only
+        from .circuit_breaker import CircuitBreaker
+        if self.breaker is None:
+            self.breaker = CircuitBreaker()
         auth_success = False
+        self._setup = False
+        if self.emby_croft is not None:    # release the old pooled connections
+            self.emby_croft.client.close()
         try:
             self.emby_croft = EmbyCroft(
                 self.settings["hostname"] + ":" + str(self.settings["port"]),
                 self.settings["username"], self.settings["password"],
-                self.device_id, diagnostic)
+                self.device_id, diagnostic,
+                token_file=os.path.join(self.file_system.path, TOKEN_FILE),
+                index_file=os.path.join(self.file_system.path, INDEX_FILE),
+                metrics=self.metrics, breaker=self.breaker)
             auth_success = True
+            self._setup = not diagnostic
         except Exception as e:
-            self.log.log(20, "connect_to_emby() failed to connect to emby, error: {0}".format(str(e)))
+            self.log.log(20, "connect_to_emby() failed to connect to emby, error: {0}".format(redact(str(e))))
 
         return auth_success
 
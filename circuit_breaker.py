@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+import requests
+
+try:
+    from .structured_log import StructuredLog
+except (ImportError, SystemError):
+    from structured_log import StructuredLog
+
+FAILURE_THRESHOLD = 3                      # failures in a row that open the circuit
+PROBE_DELAY = 2                            # seconds before the first probe of a server that went away
+MAX_PROBE_DELAY = 300                      # longest wait between probes
+PROBE_JITTER = 0.1                         # fraction of the delay added at random, so devices do not probe together
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    A request refused without trying because the server is known to be unreachable
+    """
+
+
+class CircuitBreaker(object):
+    """
+    Stops calls to a server that keeps failing so they fail at once instead of after a timeout
+    After threshold failures in a row the circuit opens; a background probe is then made
+    after delay seconds, doubling up to max_delay while the server stays away, and the
+    circuit closes on the first probe that succeeds
+    """
+
+    def __init__(self, threshold=FAILURE_THRESHOLD, delay=PROBE_DELAY, max_delay=MAX_PROBE_DELAY):
+        self.log = StructuredLog(__name__)
+        self.threshold = threshold
+        self.delay = delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.failures = 0                  # failures in a row
+        self.opened_at = None              # when the circuit opened, None while it is closed
+        self.probe_delay = delay           # wait before the next probe
+        self.probe = None                  # returns True if the server answers
+        self.timer = None
+
+    def is_open(self):
+        return self.opened_at is not None
+
+    def set_probe(self, probe):
+        """
+        Use probe() to find out whether the server is back, e.g. from the client that now owns the breaker
+        """
+        self.probe = probe
+
+    def check(self):
+        """
+        :raises CircuitOpenError: if the circuit is open
+        """
+        if self.opened_at is not None:
+            raise CircuitOpenError("server unreachable for {0:.0f} seconds, waiting for it to come back"
+                                   .format(time.monotonic() - self.opened_at))
+
+    def success(self):
+        if self.failures:
+            with self.lock:
+                self.failures = 0
+
+    def failure(self):
+        """
+        Count a failed call and open the circuit when there are threshold of them in a row
+        """
+        with self.lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures < self.threshold:
+                return
+            self.opened_at = time.monotonic()
+            self.probe_delay = self.delay
+            self.log.warning("circuit opened after %s failed calls", self.failures)
+            self._schedule_probe()
+
+    def _schedule_probe(self):
+        """
+        Probe the server after the current delay, called with the lock held
+        """
+        delay = self.probe_delay * (1 + random.uniform(0, PROBE_JITTER))
+        self.timer = threading.Timer(delay, self._run_probe)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def _run_probe(self):
+        try:
+            server_back = self.probe is not None and self.probe()
+        except Exception as e:
+            self.log.log(20, "probe failed: %s", e)
+            server_back = False
+        with self.lock:
+            if self.opened_at is None:     # closed by reset()
+                return
+            if server_back:
+                self.log.warning("circuit closed, server back after %.0f seconds", time.monotonic() - self.opened_at)
+                self.opened_at = None
+                self.failures = 0
+                self.timer = None
+                return
+            self.probe_delay = min(self.probe_delay * 2, self.max_delay)
+            self._schedule_probe()
+
+    def reset(self):
+        """
+        Close the circuit and stop probing, e.g. when the server settings change
+        """
+        with self.lock:
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = None
+            self.opened_at = None
+            self.failures = 0
+
+    def state(self):
+        """
+        Return the state for diagnostics and metrics
+        """
+        with self.lock:
+            return {"open": self.opened_at is not None, "failures": self.failures,
+                    "probe_delay": self.probe_delay if self.opened_at is not None else 0}
@@ -0,0 +1,62 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# the deadline of the request being handled, copied into the worker threads it starts
+current_deadline = contextvars.ContextVar("emby_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    The time budget of a request ran out before an HTTP call could be made or finished
+    """
+
+
+class Deadline(object):
+    """
+    Point in time by which a request must be answered
+    """
+    __slots__ = ("expires",)
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+    def __repr__(self):
+        return "Deadline(remaining={0:.3f})".format(self.remaining())
+
+
+@contextmanager
+def within(deadline):
+    """
+    Make deadline the time budget of what runs inside the with block
+    A deadline set by an enclosing block still applies if it is earlier; None leaves the budget as it is
+    """
+    outer = current_deadline.get()
+    if deadline is None or (outer is not None and outer.expires <= deadline.expires):
+        yield outer
+        return
+    token = current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        current_deadline.reset(token)
+
+
+def remaining():
+    """
+    Return the seconds left of the current deadline, or None if there is none
+    """
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline.remaining()
+
+
+def unbounded(fetch, *args):
+    """
+    Return fetch(*args) run with no deadline, e.g. for background work that outlives the request
+    Only call it in a copied context, as the deadline is not put back
+    """
+    current_deadline.set(None)
+    return fetch(*args)
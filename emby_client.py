@@ -1,14 +1,51 @@
-import logging
+import contextvars
+import os
+import threading
+import time
 import requests
+from contextlib import contextmanager
+from requests.adapters import HTTPAdapter
+from collections import deque, namedtuple, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
 from enum import Enum
 # NEW CODE 
 import json
 import random
 import urllib.parse
-from random import shuffle
-import re
-from .music_info import Music_info
 # END NEW CODE
+try:
+    # this import works when installing/running the skill
+    # note the relative '.'
+    from .music_info import Music_info, TrackUris, TrackIds
+    from .library_index import LibraryIndex, ARTIST_TYPE, ALBUM_TYPE, TRACK_TYPE, PLAYLIST_TYPE
+    from .response_cache import ResponseCache
+    from .music_grammar import parse_play, parse_playlist_command
+    from .fuzzy_index import FuzzyIndex, similarity, FUZZY_MIN_SCORE
+    from .metrics import Metrics
+    from .playlist_index import PlaylistIndex
+    from .structured_log import StructuredLog, redact_logger
+    from .json_codec import decode
+    from .circuit_breaker import CircuitBreaker
+    from .deadline import DeadlineExceeded, within, remaining, unbounded
+except (ImportError, SystemError):
+    # when running unit tests the '.' from above fails so we exclude it
+    from music_info import Music_info, TrackUris, TrackIds
+    from library_index import LibraryIndex, ARTIST_TYPE, ALBUM_TYPE, TRACK_TYPE, PLAYLIST_TYPE
+    from response_cache import ResponseCache
+    from music_grammar import parse_play, parse_playlist_command
+    from fuzzy_index import FuzzyIndex, similarity, FUZZY_MIN_SCORE
+    from metrics import Metrics
+    from playlist_index import PlaylistIndex
+    from structured_log import StructuredLog, redact_logger
+    from json_codec import decode
+    from circuit_breaker import CircuitBreaker
+    from deadline import DeadlineExceeded, within, remaining, unbounded
+
+# urllib3 logs the URL of every request at debug level, tokens included
+redact_logger("urllib3.connectionpool")
+
+# request timeout set by request_timeout(), copied into the worker threads like the deadline
+timeout_override = contextvars.ContextVar("emby_request_timeout", default=None)
 
 # url constants
 AUTHENTICATE_BY_NAME_URL = "/Users/AuthenticateByName"
@@ -21,13 +58,37 @@ ITEMS_ARTIST_KEY = "ArtistIds"
 ITEMS_PARENT_ID_KEY = "ParentId"
 ITEMS_URL = "/Items"
 # NEW CODE
-ITEMS_ARTIST_ID_URL = "/emby/Artists?searchterm="
-ITEMS_SEARCH_URL = "/emby/Items?searchterm="
+ITEMS_QUERY_URL = "/emby/Items"
+ARTISTS_QUERY_URL = "/emby/Artists"
 MAX_TRACKS = 50                            # maximum songs to queue up
 ITEMS_PLAYLIST_URL = "/emby/Items?Recursive=true&IncludeItemTypes=Playlist"
 GET_PLAYLIST_URL = "/emby/Playlists/"
-RECURSIVE_CLAUSE = "Recursive=true"
+NAME_SEARCH_LIMIT = 50                     # hits read by the name searches, which rank them all
+# optional fields always asked for: without Fields the server adds all of them (Genres, Overview, ...)
+# while the skill only reads Id, Name, Type, Album, AlbumArtist, Artists and the other default fields
+MINIMAL_FIELDS = ("SortName",)
 # END NEW CODE
+ITEMS_RANDOM_AUDIO_URL = "/emby/Items?Recursive=true&IncludeItemTypes=Audio&SortBy=Random"
+ITEMS_GENRE_AUDIO_URL = ITEMS_RANDOM_AUDIO_URL + "&GenreIds="
+GENRES_URL = "/emby/MusicGenres?Recursive=true"
+# sources of the local library index and the item types each returns, read a page at a time
+INDEX_SOURCES = [
+    ("/emby/Items?Recursive=true&IncludeItemTypes=Audio,MusicAlbum,Playlist", ("Audio", "MusicAlbum", "Playlist")),
+    ("/emby/Artists?Recursive=true", ("MusicArtist",)),
+    (GENRES_URL, ("MusicGenre",)),
+]
+INDEX_PAGE_SIZE = 1000
+ITEMS_PAGE_SIZE = 200                      # items fetched per request when paging through a query
+COMPACT_ITEM_FIELDS = ("Id", "Name", "Type", "Album", "AlbumArtist", "Artists", "PlaylistItemId")
+SYNC_IDLE_SECONDS = 120                    # background sync waits until no intent ran for this long
+SYNC_STATE_KEY = "last_sync"               # index state holding the time of the last completed sync
+FUZZY_TYPES = (ARTIST_TYPE, ALBUM_TYPE, TRACK_TYPE) # item types whose names are matched loosely
+# name tables fetched into the index when the skill starts, before the first full sync
+WARM_UP_SOURCES = [
+    ("playlists", "/emby/Items?Recursive=true&IncludeItemTypes=Playlist"),
+    ("artists", "/emby/Artists?Recursive=true"),
+    ("albums", "/emby/Items?Recursive=true&IncludeItemTypes=MusicAlbum"),
+]
 ITEMS_ALBUMS_URL = ITEMS_URL + "/?SortBy=SortName&SortOrder=Ascending&IncludeItemTypes=MusicAlbum&Recursive=true&" + ITEMS_ARTIST_KEY + "="
 ITEMS_SONGS_BY_ARTIST_URL = ITEMS_URL + "/?SortBy=SortName&SortOrder=Ascending&IncludeItemTypes=Audio&Recursive=true&" + ITEMS_ARTIST_KEY + "="
 ITEMS_SONGS_BY_ALBUM_URL = ITEMS_URL + "/?SortBy=IndexNumber&" + ITEMS_PARENT_ID_KEY + "="
@@ -37,6 +98,22 @@ SERVER_INFO_PUBLIC_URL = SERVER_INFO_URL + "/Public"
 # auth constants
 AUTH_USERNAME_KEY = "Username"
 AUTH_PASSWORD_KEY = "Pw"
+LOGIN_WINDOW = 3600                        # seconds over which logins are counted
+# transport constants
+POOL_SIZE = 4                              # keep-alive connections kept open to the server
+CONNECT_TIMEOUT = 3.05                     # seconds to establish a connection
+READ_TIMEOUT = 10                          # seconds to wait for the server to answer
+ACCEPT_ENCODING = "gzip, deflate"          # compressions asked for; requests inflates the responses
+SERVER_DOWN_STATUSES = (502, 503, 504)     # a proxy answering for a server that is down
+MATCH_TIMEOUT = (1, 2)                     # (connect, read) timeout while matching common play phrases
+MIN_CALL_TIME = 0.05                       # seconds of a deadline's budget below which no call is started
+RESOLVE_WORKERS = 4                        # threads for parallel lookups and speculative track fetches
+SPECULATIVE_CACHE_SIZE = 8                 # speculative track fetches kept until claimed
+SPECULATIVE_TTL = 60                       # seconds a speculative track fetch stays usable
+# response cache constants
+CACHE_SIZE = 256                           # responses kept by each cache
+NAME_CACHE_TTL = 3600                      # seconds name to ID lookups stay cached
+CONTENTS_CACHE_TTL = 60                    # seconds album and playlist contents stay cached
 
 # query param constants
 AUDIO_STREAM = "stream.mp3"
@@ -47,38 +124,177 @@ class PublicEmbyClient(object):
     """
     Handle the publically exposed emby endpoints
     """
-    def __init__(self, host, device="noDevice", client="NoClient", client_id="1234", version="0.1"):
+    def __init__(self, host, device="noDevice", client="NoClient", client_id="1234", version="0.1",
+                 pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), metrics=None, breaker=None):
         """
         Sets up the connection to the Emby server
+        All requests share one pooled keep-alive session
         :param host:
+        :param pool_size: number of connections kept open to the server
+        :param timeout: (connect, read) timeout in seconds for each request
+        :param metrics: Metrics recording every request, shared with the skill
+        :param breaker: CircuitBreaker failing requests at once while the server is down, shared with the skill
         """
-        self.log = logging.getLogger(__name__)
+        self.log = StructuredLog(__name__)
         self.host = host
         self.auth = None
         self.device = device
         self.client = client
         self.client_id = client_id
         self.version = version
-  
+        self.timeout = timeout
+        self.session = PublicEmbyClient._new_session(pool_size)
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.breaker.set_probe(self.probe_server)
+
+    @staticmethod
+    def _new_session(pool_size):
+        """
+        Return a requests session that reuses up to pool_size connections
+        and asks for compressed responses
+        """
+        session = requests.Session()
+        session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    @contextmanager
+    def request_timeout(self, timeout):
+        """
+        Use a different request timeout for calls made inside the with block, and by the workers it starts
+        """
+        token = timeout_override.set(timeout)
+        try:
+            yield
+        finally:
+            timeout_override.reset(token)
+
+    def get_timeout(self):
+        """
+        Return the (connect, read) timeout for a request, cut down to what is left of the current deadline
+        :raises DeadlineExceeded: if too little of the deadline is left to start a request
+        """
+        timeout = timeout_override.get() or self.timeout
+        left = remaining()
+        if left is None:
+            return timeout
+        if left < MIN_CALL_TIME:
+            raise DeadlineExceeded("deadline passed")
+        connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        return min(connect, left), min(read, left)
+
+    def close(self):
+        """
+        Close the pooled connections
+        """
+        self.session.close()
+
+    def _send(self, verb, url, **kwargs):
+        """
+        Make one HTTP call through the circuit breaker: refused at once while the server is down
+        A timeout caused by a deadline running out is not the server's fault, so it does not count
+        :raises CircuitOpenError: if the circuit is open
+        :raises DeadlineExceeded: if the call timed out at the end of the current deadline
+        """
+        self.breaker.check()
+        try:
+            response = self._call(verb, url, **kwargs)
+        except requests.exceptions.Timeout as e:
+            left = remaining()
+            if left is not None and left < MIN_CALL_TIME:
+                raise DeadlineExceeded("deadline passed during " + verb.upper() + " " + url.split("?", 1)[0]) from e
+            self.breaker.failure()
+            raise
+        except requests.exceptions.ConnectionError:
+            self.breaker.failure()
+            raise
+        if response.status_code in SERVER_DOWN_STATUSES:
+            self.breaker.failure()
+        else:
+            self.breaker.success()
+        return response
+
+    def _call(self, verb, url, **kwargs):
+        """
+        Make one HTTP call with the session method named verb and record it in the metrics
+        """
+        start = time.perf_counter()
+        status = "error"
+        num_bytes = 0
+        try:
+            response = getattr(self.session, verb)(self.host + url, **kwargs)
+            status = response.status_code
+            num_bytes = len(response.content)
+            return response
+        finally:
+            self.metrics.record_call(verb, url, status, num_bytes, time.perf_counter() - start)
+
     def get_server_info_public(self):
-        return requests.get(self.host + SERVER_INFO_PUBLIC_URL)
+        """
+        Not stopped by the circuit breaker, as it is how the breaker finds out the server is back
+        """
+        return self._call("get", SERVER_INFO_PUBLIC_URL, timeout=self.get_timeout())
+
+    def probe_server(self):
+        """
+        Return True if the server answers, for the circuit breaker's background probe
+        """
+        return self.get_server_info_public().status_code == 200
 
 
 class EmbyClient(PublicEmbyClient):
     """
     Handle communication to the Emby server
     """
-    def __init__(self, host, username, password, device="noDevice", client="NoClient", client_id="1234", version="0.1"):
+    def __init__(self, host, username, password, device="noDevice", client="NoClient", client_id="1234", version="0.1",
+                 token_file=None, pool_size=POOL_SIZE, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), index_file=None,
+                 cache_size=CACHE_SIZE, name_ttl=NAME_CACHE_TTL, contents_ttl=CONTENTS_CACHE_TTL, metrics=None,
+                 breaker=None):
         """
         Sets up the connection to the Emby server
+        A token saved in token_file by an earlier session is reused, so a
+        login only happens when there is no token or the server rejects it
         :param host:
         :param username:
         :param password:
+        :param token_file: path to persist the access token across restarts
+        :param pool_size: number of connections kept open to the server
+        :param timeout: (connect, read) timeout in seconds for each request
+        :param index_file: SQLite file of the local library index, None to always search the server
+        :param cache_size: number of responses kept by each response cache, 0 to disable caching
+        :param name_ttl: seconds name to ID lookups are cached
+        :param contents_ttl: seconds album and playlist contents are cached
+        :param metrics: Metrics recording every request, shared with the skill
+        :param breaker: CircuitBreaker failing requests at once while the server is down, shared with the skill
         """
 
-        super().__init__(host, device, client, client_id, version)
-        self.log = logging.getLogger(__name__)
-        self.auth = self._auth_by_user(username, password)
+        super().__init__(host, device, client, client_id, version, pool_size, timeout, metrics, breaker)
+        self.log = StructuredLog(__name__)
+        self.index = LibraryIndex(index_file) if index_file else None
+        self.fuzzy = None                  # trigram index of the names in self.index, built on first use
+        self.fuzzy_lock = threading.Lock()
+        self.name_cache = ResponseCache(cache_size, name_ttl)
+        self.contents_cache = ResponseCache(cache_size, contents_ttl)
+        self.playlist_indexes = ResponseCache(cache_size, contents_ttl) # playlist ID -> PlaylistIndex
+        self.last_active = 0.0             # when an intent last used the client
+        self.executor = None               # created on first use
+        self.speculative = OrderedDict()   # (item type, item ID) -> (start time, future of its tracks)
+        self.speculative_lock = threading.Lock()
+        self.sync_lock = threading.Lock()  # only one library sync at a time
+        self.stopping = threading.Event()  # set by close() to stop a running sync or warm up
+        self.warm_up_progress = {"state": "idle"}
+        self.username = username
+        self.password = password
+        self.token_file = token_file
+        self.login_count = 0
+        self.login_lock = threading.Lock() # one login at a time when parallel requests find the token rejected
+        self.login_times = deque()         # when each login happened
+        self.auth = self._load_token()
+        if self.auth is None:
+            self.auth = self._auth_by_user(username, password)
 
     def _auth_by_user(self, username, password):
         """
@@ -90,23 +306,76 @@ class EmbyClient(PublicEmbyClient):
         """
         auth_payload = \
             {AUTH_USERNAME_KEY: username, AUTH_PASSWORD_KEY: password}
-        response = self._post(AUTHENTICATE_BY_NAME_URL, auth_payload)
+        # never send a stale token to the login endpoint, and keep self.auth usable until the new one is in
+        response = self._send("post", AUTHENTICATE_BY_NAME_URL, json=auth_payload,
+                              headers=self.get_headers(authorized=False), timeout=self.get_timeout())
         assert response.status_code == 200
-        return EmbyAuthorization.from_response(response)
+        auth = EmbyAuthorization.from_response(response)
+        self.login_count += 1
+        self.login_times.append(time.time())
+        self.log.log(20, "_auth_by_user() logged in, %s logins in the last hour", self.logins_per_hour())
+        self._save_token(auth)
+        return auth
 
-    def get_headers(self):
+    def logins_per_hour(self):
+        """
+        Return how many times this client has logged in during the last hour
+        """
+        cutoff = time.time() - LOGIN_WINDOW
+        while self.login_times and self.login_times[0] < cutoff:
+            self.login_times.popleft()
+        return len(self.login_times)
+
+    def _load_token(self):
+        """
+        Return the authorization saved by an earlier session for the same
+        host and user, or None if there is none
+        """
+        if not self.token_file or not os.path.isfile(self.token_file):
+            return None
+        try:
+            with open(self.token_file) as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as e:
+            self.log.log(20, "_load_token() ignoring unreadable token file: %s", e)
+            return None
+        if saved.get("host") != self.host or saved.get("username") != self.username:
+            return None
+        self.log.log(20, "_load_token() reusing saved token for user %s", self.username)
+        return EmbyAuthorization(saved["user_id"], saved["token"])
+
+    def _save_token(self, auth):
+        """
+        Persist the authorization so the next session can skip the login
+        """
+        if not self.token_file:
+            return
+        saved = {"host": self.host, "username": self.username,
+                 "user_id": auth.user_id, "token": auth.token}
+        tmp_file = self.token_file + ".tmp"
+        try:
+            with open(tmp_file, "w") as f:
+                json.dump(saved, f)
+            os.chmod(tmp_file, 0o600)
+            os.replace(tmp_file, self.token_file)
+        except OSError as e:
+            self.log.log(20, "_save_token() failed to save token: %s", e)
+
+    def get_headers(self, authorized=True):
         """
         Return specific Emby headers including auth token if available
+        :param authorized: False to leave out the user and token, e.g. for logging in
         """
         media_browser_header = "MediaBrowser Client="+self.client +\
                                ", Device="+self.device +\
                                ", DeviceId="+self.client_id +\
                                ", Version="+self.version
-        if self.auth and self.auth.user_id:
-            media_browser_header = media_browser_header + ", UserId=" + self.auth.user_id
+        auth = self.auth if authorized else None
+        if auth and auth.user_id:
+            media_browser_header = media_browser_header + ", UserId=" + auth.user_id
         headers = {"X-Emby-Authorization": media_browser_header}
-        if self.auth and self.auth.token:
-            headers["X-Emby-Token"] = self.auth.token
+        if auth and auth.token:
+            headers["X-Emby-Token"] = auth.token
         return headers
 
     def search(self, query, media_types=[]):
@@ -121,7 +390,7 @@ class EmbyClient(PublicEmbyClient):
             types = types[:len(types) - 1]
             query_params = query_params + '&IncludeItemTypes={0}'.format(types)
 
-        self.log.log(20, "search() query_params = "+query_params)
+        self.log.log(20, "search() query_params = %s", query_params)
         return self._get(SEARCH_HINTS_URL + query_params)
 
     def instant_mix(self, item_id):
@@ -146,9 +415,9 @@ class EmbyClient(PublicEmbyClient):
     def get_songs_by_album(self, album_id):
         #url = ITEMS_SONGS_BY_ALBUM_URL + str(album_id)
         url = ITEMS_SONGS_BY_ALBUM_URL+str(album_id)+"&Recursive=true&"+API_KEY+self.auth.token 
-        self.log.log(20, "get_songs_by_album() url = "+str(url))
+        self.log.log(20, "get_songs_by_album() url = %s", url)
         ret_val = self._get(url)
-        self.log.log(20, "get_songs_by_album() ret_val = "+str(ret_val))
+        self.log.log(20, "get_songs_by_album() ret_val = %s", ret_val)
         return ret_val
 
     def get_all_artists(self):
@@ -157,17 +426,96 @@ class EmbyClient(PublicEmbyClient):
     def get_server_info(self):
         return self._get(SERVER_INFO_URL)
 
+    def close(self):
+        """
+        Stop a running library sync or warm up and wait for it to let go of the index,
+        then close the pooled connections, the thread pool and the index
+        Lookups still running finish; one that needs the pool again gets a new one
+        """
+        self.stopping.set()
+        with self.sync_lock:               # held for at most one more page
+            super().close()
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+                self.executor = None
+            if self.index is not None:
+                self.index.close()
+
+    def _request(self, verb, url, **kwargs):
+        """
+        Call the HTTP method named verb with host and headers provided
+        If the server rejects the token, log in again and retry once; when parallel
+        requests are rejected together, only the first logs in and the others reuse its token
+        """
+        kwargs.setdefault("timeout", self.get_timeout())
+        stale_auth = self.auth             # the token this request is sent with
+        response = self._send(verb, url, headers=self.get_headers(), **kwargs)
+        if response.status_code == 401 and stale_auth is not None:
+            with self.login_lock:
+                if self.auth is stale_auth:    # no other thread has logged in since
+                    self.log.log(20, "_request() token rejected, logging in again")
+                    self.auth = self._auth_by_user(self.username, self.password)
+            url = url.replace(stale_auth.token, self.auth.token) # most urls carry the api_key too
+            response = self._send(verb, url, headers=self.get_headers(), **kwargs)
+        return response
+
     def _post(self, url, payload):
         """
         HTTP post method with host and headers provided
         """
-        return requests.post(self.host + url, json=payload, headers=self.get_headers())
+        return self._request("post", url, json=payload)
 
     def _get(self, url):
         """
         HTTP get method with host and headers provided
         """
-        return requests.get(self.host + url, headers=self.get_headers())
+        return self._request("get", url)
+
+    def _get_json(self, url, cache, **kwargs):
+        """
+        HTTP get the JSON of url, answering from cache when the same query was made recently,
+        or at any time while the server is down
+        Only successful responses that found something are cached, so an item added on the
+        server is found at the next lookup; callers must not modify what is returned
+        """
+        key = self.cache_key(url)
+        json_data = cache.get(key, stale=self.breaker.is_open())
+        if json_data is None:
+            response = self._request("get", url, **kwargs)
+            json_data = decode(response)
+            if response.status_code == 200 and json_data.get("Items"):
+                cache.put(key, json_data)
+        return json_data
+
+    def cache_key(self, url):
+        """
+        Key of a query for the response caches: the user, the endpoint and
+        the normalized query parameters without the token
+        """
+        parts = urllib.parse.urlsplit(url)
+        params = tuple(sorted((name.lower(), value.strip().lower())
+                              for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+                              if name.lower() != API_KEY[:-1]))
+        return self.auth.user_id, parts.path.lower(), params
+
+    def invalidate_playlist(self, playlist_id=None):
+        """
+        Forget cached contents of a playlist after changing it, and cached
+        playlist lookups after creating one (playlist_id None)
+        """
+        if playlist_id is None:
+            self.name_cache.invalidate(lambda key: ("includeitemtypes", "playlist") in key[2])
+        else:
+            self.playlist_indexes.invalidate(lambda key: key == playlist_id)
+            playlist_id = str(playlist_id).lower()
+            self.contents_cache.invalidate(lambda key: playlist_id in key[1] or ("parentid", playlist_id) in key[2])
+
+    def cache_stats(self):
+        """
+        Return the hit and miss counters of the response caches
+        """
+        return {"names": self.name_cache.stats(), "contents": self.contents_cache.stats(),
+                "playlists": self.playlist_indexes.stats()}
 
     # NEW CODE
     # Music playing vocabulary:
@@ -182,375 +530,824 @@ class EmbyClient(PublicEmbyClient):
       """
       HTTP delete method with host and headers provided
       """
-      return requests.delete(self.host + url, headers=self.get_headers())
+      return self._request("delete", url)
 
-    def parse_music(self, phrase):
+    def match_music(self, phrase, timeout=MATCH_TIMEOUT, deadline=None):
       """
-      Perform "brute force" parsing of a music play request
-      Returns 4 items:
-      1. match_type: 
+      First phase of a common play request: find what the phrase refers to, quickly
+      Tracks are only fetched if they cost nothing; otherwise the returned Music_info
+      has an entity and no track_ids, and expand_music() fetches them later
       """
-      artist_name = "unknown-artist"
-      found_by = "yes"                     # assume "by" is in the phrase
-      intent = "unknown"                   # album, album-artist, artist, genre, music, playlist,
-                                           #   track, track-artist, unknown-artist or unknown
-      match_type = "unknown"               # album, artist, song or unknown
-      music_name = ""                      # search term of music being sought
-      track_uris = []                      # URIs of songs to be played
+      with self.request_timeout(timeout):
+        return self.parse_music(phrase, resolve_only=True, deadline=deadline)
 
+    def expand_music(self, music_info):
+      """
+      Second phase of a common play request: fetch the tracks of a match_music() result
+      """
+      entity = music_info.entity
+      if entity is None or music_info.track_ids is not None: # nothing left to fetch
+        return music_info
+      self.log.log(20, "expand_music() fetching tracks of %s", entity)
+      match entity["type"]:
+        case "album":
+          ret_val = self.get_album(entity["name"], entity["id"], entity["artist_name"])
+        case "artist":
+          ret_val = self.get_artist(entity["name"], entity["id"])
+        case "playlist":
+          ret_val = self.get_playlist(entity["name"], entity["id"])
+        case "genre":
+          ret_val = self.get_genre(entity["name"], entity["id"])
+        case "music":
+          ret_val = self.get_all_music()
+        case _:                            # unexpected
+          self.log.log(20, "expand_music() INTERNAL ERROR: unexpected entity type: %s", entity["type"])
+          ret_val = Music_info(None, None, None, None)
+      if not ret_val.mesg_file:            # keep what the match phase wanted to say
+        ret_val = ret_val._replace(mesg_file=music_info.mesg_file, mesg_info=music_info.mesg_info)
+      return ret_val
+
+    def deferred_music(self, match_type, item_type, item_id, name, artist_name="unknown-artist", exact=True):
+      """
+      Return a Music_info for music that was found but whose tracks are fetched by expand_music()
+      """
+      entity = {"type": item_type, "id": item_id, "name": name, "artist_name": artist_name}
+      return Music_info(match_type, "", {}, None, self.get_song_file, entity, exact)
+
+    def parse_music(self, phrase, resolve_only=False, deadline=None):
+      """
+      Parse a music play request with the music grammar and find the music
+      With resolve_only, stop once the music is found and leave its tracks to expand_music()
+      With a deadline, see get_music()
+      Returns a Music_info
+      """
       phrase = phrase.lower()
-      self.log.log(20, "parse_music() phrase in lower case: " + phrase)
-
-      # check for a partial request with no music_name
-      match phrase:
-        case "album" | "track" | "song" | "artist" | "genre" | "playlist":
-          self.log.log(20, "parse_music() not enough information in request "+str(phrase))
-          mesg_info = {"phrase": phrase}
-          self.log.log(20, "parse_music() mesg_info = "+str(mesg_info))
-          ret_val = Music_info("song", "not_enough_info", {"phrase": phrase}, None)
-          self.log.log(20, "parse_music() ret_val.mesg_info = "+str(ret_val.mesg_info))
-          return ret_val
-      key = re.split(" by ", phrase)
-      if len(key) == 1:                    # did not find "by"
-        found_by = "no"
-        music_name = str(key[0])           # check for all music, genre and playlist
-        self.log.log(20, "parse_music() music_name = "+music_name)
-        match music_name:
-          case "any music" | "all music" | "my music" | "random music" | "some music" | "music":
-            self.log.log(20, "parse_music() removed keyword "+music_name+" from music_name")
-            track_uris = self.get_music("music", music_name, artist_name)
-            ret_val = Music_info("song", "playing_random", {}, track_uris)
-            return ret_val
-        key = re.split("^genre ", music_name)
-        if len(key) == 2:                  # found first word "genre"
-          genre = str(key[1])
-          self.log.log(20, "parse_music() removed keyword "+music_name+" from music_name")
-          ret_val = self.get_music("genre", genre, artist_name)
-          return ret_val 
-        else:
-          key = re.split("^playlist ", music_name)
-          if len(key) == 2:                # found first word "playlist"
-            playlist = str(key[1])
-            self.log.log(20, "parse_music() removed keyword "+music_name+" from music_name")
-            ret_val = self.get_music("playlist", playlist, artist_name)
-            return ret_val
-      elif len(key) == 2:                  # found one "by"
-        music_name = str(key[0])
-        artist_name = str(key[1])          # artist name follows "by"
-        self.log.log(20, "parse_music() found the word by - music_name = "+music_name+" artist_name = "+artist_name)
-      elif len(key) == 3:                  # found "by" twice - assume first one is in music
-        music_name = str(key[0]) + " by " + str(key[1]) # paste the track or album back together
-        self.log.log(20, "parse_music() found the word by twice: assuming first is music_name")
-        artist_name = str(key[2])
-      else:                                # found more than 2 "by"s - what to do?
-        music_name = str(key[0])
-
-        # look for leading keywords in music_name
-      key = re.split("^album |^record ", music_name)
-      if len(key) == 2:                    # found first word "album" or "record"
-        match_type = "album"
-        music_name = str(key[1])
-        if found_by == "yes":
-          intent = "album-artist"
-        else:
-          intent = "album"
-        self.log.log(20, "parse_music() removed keyword album or record")
-      else:                                # leading "album" not found
-        key = re.split("^track |^song |^title ", music_name)
-        if len(key) == 2:                  # leading "track", "song" or "title" found
-          music_name = str(key[1])
-          match_type = "song"
-          if found_by == "yes":            # assume artist follows 'by'
-            intent = "track-artist"
-          else:                            # assume track
-            intent = "track"
-          self.log.log(20, "parse_music() removed keyword track, song or title")
-        else:                              # leading keyword not found
-          key = re.split("^artist |^band ", music_name) # remove "artist" or "band" if first word
-          if len(key) == 2:                # leading "artist" or "band" found
-            music_name = "all_music"       # play all the songs they have
-            artist_name = str(key[1])
-            match_type = "artist"
-            intent = "artist"
-            self.log.log(20, "parse_music() removed keyword artist or band from music_name")
-          else:                            # no leading keywords found yet
-            self.log.log(20, "parse_music() no keywords found: in last else clause")
-            if found_by == "yes":
-              intent = "unknown-artist"    # found artist but music could be track or album
-      key = re.split("^artist |^band ", artist_name) # remove "artist" or "band" if first word
-      if len(key) == 2:                    # leading "artist" or "band" found in artist name
-        artist_name = str(key[1])
-        self.log.log(20, "parse_music() removed keyword artist or band from artist_name")
-      self.log.log(20, "parse_music() calling get_music with: "+intent+", "+music_name+", "+artist_name)
-      ret_val = self.get_music(intent, music_name, artist_name)
+      self.log.log(20, "parse_music() phrase in lower case: %s", phrase)
+      request = parse_play(phrase)
+      match request.intent:
+        case "partial":                    # a keyword with no music_name
+          self.log.log(20, "parse_music() not enough information in request %s", phrase)
+          return Music_info("song", "not_enough_info", {"phrase": phrase}, None)
+        case "music":
+          music_info = self.get_music("music", request.music_name, request.artist_name, resolve_only, deadline)
+          return Music_info("song", "playing_random", {}, music_info.track_ids, self.get_song_file, music_info.entity)
+      self.log.log(20, "parse_music() calling get_music with: %s, %s, %s", request.intent, request.music_name, request.artist_name)
+      ret_val = self.get_music(request.intent, request.music_name, request.artist_name, resolve_only, deadline)
       return ret_val
 
     def get_track_ids(self, music_json):
       """
       given music JSON, return track IDs
       """
-      track_ids = []
-      num_recs = music_json["TotalRecordCount"]
-      self.log.log(20, "get_track_ids() num_recs = "+str(num_recs))
-      for i in range(num_recs):
-        next_id = music_json["Items"][i]["Id"]
-        track_ids.append(next_id)
+      track_ids = [item["Id"] for item in music_json["Items"]]
+      self.log.log(20, "get_track_ids() num_recs = %s", len(track_ids))
       return track_ids
+
+    def iter_pages(self, url, page_size=ITEMS_PAGE_SIZE):
+      """
+      Yield the items of an item query one page at a time, using StartIndex and Limit,
+      so no more than page_size items are held at once
+      """
+      start_index = 0
+      while True:
+        page_json = decode(self._get(url+"&StartIndex="+str(start_index)+LIMIT+str(page_size)))
+        items = page_json["Items"]
+        if items:
+          yield items
+        start_index += len(items)
+        if not items or start_index >= page_json["TotalRecordCount"]:
+          return
+
+    def iter_items(self, url, page_size=ITEMS_PAGE_SIZE):
+      """
+      Yield compact records (only the COMPACT_ITEM_FIELDS) of an item query page by page
+      """
+      for items in self.iter_pages(url, page_size):
+        for item in items:
+          yield {field: item[field] for field in COMPACT_ITEM_FIELDS if field in item}
+
+    def items_url(self, url, fields=(), limit=None, **params):
+      """
+      Return the URL of an item query that only asks for what the caller reads: url with params,
+      the optional fields it needs, no image tags or user data, at most limit items, and the token
+      """
+      params["Fields"] = ",".join(MINIMAL_FIELDS + tuple(fields))
+      params["EnableImages"] = "false"
+      params["EnableUserData"] = "false"
+      if limit is not None:
+        params["Limit"] = limit
+      params[API_KEY[:-1]] = self.auth.token
+      separator = "&" if "?" in url else "?"
+      return url+separator+urllib.parse.urlencode(params, safe=",", quote_via=urllib.parse.quote)
      
     def get_track_uris(self, music_json, do_shuffle=False):
       """
       given music JSON, return a maximum of MAX_TRACKS track URIs, and optionally shuffle them
       """
-      track_ids = self.get_track_ids(music_json)
-      track_uris = []
-      if do_shuffle:                       # shuffle all tracks
-        self.log.log(20, "get_track_uris() shuffling tracks")
-        shuffle(track_ids)
-      track_ids = track_ids[0:MAX_TRACKS]  # don't return too many
-      self.log.log(20, "get_track_uris() track_ids = "+str(track_ids))
-      for next_id in track_ids:
-        track_uris.append(self.get_song_file(next_id))
-      self.log.log(20, "get_track_uris() track_uris: "+str(track_uris))
-      return track_uris
+      return TrackUris(self.pick_tracks(self.get_track_ids(music_json), do_shuffle), self.get_song_file)
+
+    def pick_tracks(self, track_ids, do_shuffle=False):
+      """
+      given track IDs, return a list of a maximum of MAX_TRACKS of them, and optionally shuffle them
+      """
+      if do_shuffle:                       # same as shuffling all tracks and keeping the first ones
+        self.log.log(20, "pick_tracks() shuffling tracks")
+        track_ids = random.sample(track_ids, min(len(track_ids), MAX_TRACKS))
+      else:
+        track_ids = list(track_ids[0:MAX_TRACKS]) # don't return too many
+      self.log.log(20, "pick_tracks() picked %s tracks", len(track_ids))
+      self.log.log(10, "pick_tracks() track_ids = %s", track_ids)
+      return track_ids
+
+    def mark_active(self):
+      """
+      Note that an intent is using the client so background syncs back off
+      """
+      self.last_active = time.time()
+
+    def is_idle(self):
+      """
+      Return True if no intent has used the client for SYNC_IDLE_SECONDS
+      """
+      return time.time() - self.last_active >= SYNC_IDLE_SECONDS
+
+    def refresh_index(self):
+      """
+      Reload the whole local library index from the server, a page at a time
+      Returns the number of items indexed
+      """
+      return self.sync_library(full=True, idle_only=False)
+
+    def sync_library(self, full=False, idle_only=True):
+      """
+      Bring the local library index up to date
+      Only items saved on the server since the last sync are fetched unless full is True,
+      and deleted items are removed when the server holds fewer items than the index
+      With idle_only the sync does not start while intents are running, and stops if one starts
+      Returns the number of items written or removed, or -1 if the sync did not run to the end
+      """
+      if self.index is None or self.stopping.is_set():
+        return -1
+      if idle_only and not self.is_idle():
+        self.log.log(20, "sync_library() skipped, the skill is busy")
+        return -1
+      if not self.sync_lock.acquire(blocking=False): # another sync is running
+        return -1
+      try:
+        sync_start = time.time()
+        since = None if full else self.index.get_state(SYNC_STATE_KEY)
+        self.log.log(20, "sync_library() syncing items saved since %s", since)
+        num_changes = 0
+        for source_url, item_types in INDEX_SOURCES:
+          url = source_url
+          if since is not None:            # only items changed since the last sync
+            url = url+"&MinDateLastSaved="+since
+          num_upserts = self._sync_pages(url, self._index_upsert, idle_only, sync_start)
+          if num_upserts == -1:
+            return -1
+          num_deletes = self._sync_deletes(source_url, item_types, idle_only, sync_start)
+          if num_deletes == -1:
+            return -1
+          num_changes += num_upserts + num_deletes
+        self.index.set_state(SYNC_STATE_KEY, time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(sync_start)))
+        self._fuzzy_index()                # load it here rather than on the first intent
+        self.log.log(20, "sync_library() applied %s changes in %s seconds", num_changes, round(time.time() - sync_start, 1))
+        return num_changes
+      finally:
+        self.sync_lock.release()
+
+    def warm_up(self):
+      """
+      Get ready for the first phrase: fetch the playlist, artist and album name tables into
+      the local index unless it was synced before, then load the fuzzy name index
+      The tracks come with the next library sync; get_album and get_artist ask the server for them until then
+      Progress is kept in warm_up_progress
+      Returns the number of names fetched, or -1 if there is nothing to warm up or a sync is running
+      """
+      if self.index is None or self.stopping.is_set():
+        self.warm_up_progress = {"state": "skipped"}
+        return -1
+      if not self.sync_lock.acquire(blocking=False): # a sync is filling the index already
+        self.warm_up_progress = {"state": "skipped"}
+        return -1
+      num_items = 0
+      try:
+        if self.index.get_state(SYNC_STATE_KEY) is None: # never synced
+          for stage, source_url in WARM_UP_SOURCES:
+            url = self.items_url(source_url)
+            total = decode(self._get(self.items_url(source_url, limit=0)))["TotalRecordCount"]
+            self.warm_up_progress = {"state": "running", "stage": stage, "items": 0, "total": total}
+            for items in self.iter_pages(url, INDEX_PAGE_SIZE):
+              if self.stopping.is_set():   # the client is being closed
+                self.warm_up_progress = {"state": "stopped"}
+                return -1
+              self._index_upsert(items)
+              self.warm_up_progress["items"] += len(items)
+            num_items += self.warm_up_progress["items"]
+            self.log.log(20, "warm_up() fetched %s %s", self.warm_up_progress["items"], stage)
+        self.warm_up_progress = {"state": "running", "stage": "fuzzy index"}
+        self._fuzzy_index()
+        self.warm_up_progress = {"state": "done", "items": num_items}
+      except Exception as e:
+        self.log.log(20, "warm_up() failed, error: %s", e)
+        self.warm_up_progress = {"state": "failed", "error": str(e)}
+        return -1
+      finally:
+        self.sync_lock.release()
+      return num_items
+
+    def _sync_pages(self, source_url, apply_page, idle_only, sync_start):
+      """
+      Page through an item query with StartIndex and Limit, passing each page of items to apply_page
+      Returns the number of items seen, or -1 if an intent started and idle_only is set
+      """
+      num_items = 0
+      for items in self.iter_pages(self.items_url(source_url), INDEX_PAGE_SIZE):
+        if self.stopping.is_set():         # the client is being closed
+          self.log.log(20, "sync_library() stopped, the client is closing")
+          return -1
+        if idle_only and self.last_active > sync_start: # stay off the intent path
+          self.log.log(20, "sync_library() stopped, an intent started")
+          return -1
+        apply_page(items)
+        num_items += len(items)
+      return num_items
+
+    def _sync_deletes(self, source_url, item_types, idle_only, sync_start):
+      """
+      Remove indexed items of item_types that the server no longer has
+      The full ID scan only happens when the server count is below the index count
+      Returns the number of items removed, or -1 if the sync was stopped
+      """
+      server_count = decode(self._get(self.items_url(source_url, limit=0)))["TotalRecordCount"]
+      index_count = sum(self.index.count(item_type) for item_type in item_types)
+      if server_count >= index_count:      # nothing was deleted
+        return 0
+      server_ids = set()
+      def add_ids(items):
+        server_ids.update(item["Id"] for item in items)
+      if self._sync_pages(source_url, add_ids, idle_only, sync_start) == -1:
+        return -1
+      return self._index_delete(self.index.ids(item_types) - server_ids)
+
+    def _index_upsert(self, items):
+      """
+      Write items to the local index and keep the fuzzy index in step
+      """
+      num_items = self.index.upsert(items)
+      if self.fuzzy is not None:
+        for item in items:
+          if item["Type"] in FUZZY_TYPES:
+            self.fuzzy.add(item["Id"], item["Type"], item.get("Name") or "")
+      return num_items
+
+    def _index_delete(self, item_ids):
+      """
+      Remove items from the local index and the fuzzy index
+      """
+      if self.fuzzy is not None:
+        for item_id in item_ids:
+          self.fuzzy.remove(item_id)
+      return self.index.delete(item_ids)
+
+    def _fuzzy_index(self):
+      """
+      Return the fuzzy name index, loading it from the local index the first time
+      """
+      with self.fuzzy_lock:
+        if self.fuzzy is None:
+          fuzzy = FuzzyIndex()
+          for row in self.index.names(FUZZY_TYPES):
+            fuzzy.add(row["id"], row["type"], row["name"])
+          self.log.log(20, "_fuzzy_index() loaded %s names", len(fuzzy))
+          self.fuzzy = fuzzy
+      return self.fuzzy
+
+    def _index_lookup(self, name, item_type):
+      """
+      Return the first item of item_type named exactly name in the local index, or None
+      """
+      if self.index is None:
+        return None
+      name = name.lower()
+      for row in self.index.find(name, item_type):
+        if row["name"].lower() == name:
+          return row
+      return None
+
+    def _index_lookup_all(self, name, item_type):
+      """
+      Return all items of item_type named exactly name in the local index
+      """
+      if self.index is None:
+        return []
+      name = name.lower()
+      return [row for row in self.index.find(name, item_type) if row["name"].lower() == name]
+
+    def _fuzzy_lookup(self, name, item_types):
+      """
+      Return the indexed item of one of item_types whose name sounds most like name, or None
+      Used when an exact lookup fails, as speech recognition often mangles names
+      """
+      if self.index is None:
+        return None
+      fuzzy = self._fuzzy_index()
+      hits = [(hit, item_type) for item_type in item_types for hit in fuzzy.search(name, item_type, limit=1)]
+      if not hits:
+        return None
+      (score, item_id, item_name), item_type = max(hits, key=lambda hit: hit[0][0])
+      self.log.log(20, "_fuzzy_lookup() %s matched %s %s with score %s", name, item_type, item_name, round(score, 2))
+      return self.index.get(item_id)
+
+    def _executor(self):
+      """
+      Return the thread pool for parallel lookups, creating it on first use
+      """
+      if self.executor is None:
+        self.executor = ThreadPoolExecutor(max_workers=RESOLVE_WORKERS, thread_name_prefix="EmbyResolve")
+      return self.executor
+
+    def _submit(self, fetch, *args):
+      """
+      Run fetch(*args) on the thread pool, in the calling thread's context so its calls stay in the same trace
+      """
+      return self._executor().submit(contextvars.copy_context().run, fetch, *args)
+
+    @staticmethod
+    def _unlimited(fetch, *args):
+      """
+      Return fetch(*args) run with the normal request timeout and no deadline, for fetches that
+      outlive the match they were started by; only call it in a copied context
+      """
+      timeout_override.set(None)
+      return unbounded(fetch, *args)
+
+    def speculate(self, key, fetch, *args):
+      """
+      Start fetch(*args) in the background so its result is ready if claim_speculative(key) asks for it
+      """
+      with self.speculative_lock:
+        if key in self.speculative:
+          return
+        self.log.log(20, "speculate() fetching tracks of %s", key)
+        self.speculative[key] = (time.time(), self._submit(self._unlimited, fetch, *args))
+        while len(self.speculative) > SPECULATIVE_CACHE_SIZE:
+          self.speculative.popitem(last=False)[1][1].cancel()
+
+    def drop_speculative(self):
+      """
+      Forget the speculative fetches, e.g. when another skill was picked to play what they were for
+      Fetches that have not started are cancelled; running ones finish but nothing waits for them
+      """
+      with self.speculative_lock:
+        for started, future in self.speculative.values():
+          future.cancel()
+        self.speculative.clear()
+
+    def claim_speculative(self, key):
+      """
+      Return the result of a speculative fetch, or None if there is no fresh one or the deadline passes first
+      """
+      with self.speculative_lock:
+        started, future = self.speculative.pop(key, (0, None))
+      if future is None or time.time() - started > SPECULATIVE_TTL:
+        return None
+      try:
+        return future.result(timeout=remaining())
+      except Exception as e:
+        if not future.done():              # the deadline passed first, keep it for expand_music()
+          with self.speculative_lock:
+            self.speculative[key] = (started, future)
+          return None
+        self.log.log(20, "claim_speculative() speculative fetch of %s failed: %s", key, e)
+        return None
+
+    def _get_items(self, url):
+      """
+      Return the Items of one query
+      """
+      return self._get_json(url, self.name_cache)["Items"]
+
+    def _album_tracks(self, album_id):
+      """
+      Return the track IDs of an album from the server and the first track's artist
+      """
+      url = self.items_url(ITEMS_SONGS_BY_ALBUM_URL+str(album_id), Recursive="true")
+      tracks_json = self._get_json(url, self.contents_cache)
+      track_ids = TrackIds(self.get_track_ids(tracks_json))
+      artist_found = "none"
+      if track_ids and tracks_json["Items"][0].get("Artists"):
+        artist_found = tracks_json["Items"][0]["Artists"][0].lower()
+      return track_ids, artist_found
+
+    def _artist_tracks(self, artist_id):
+      """
+      Return a random sample of MAX_TRACKS track IDs by an artist from the server
+      """
+      url = self.items_url(ITEMS_SONGS_BY_ARTIST_URL+str(artist_id))
+      self.log.log(20, "_artist_tracks() getting songs by artist with url: %s", url)
+      return reservoir_sample((item["Id"] for item in self.iter_items(url)), MAX_TRACKS)
 
-    def get_album(self, album_name, album_id, artist_name):
+    def get_album(self, album_name, album_id, artist_name, resolve_only=False):
       """
       return URIs for one album by id if it is already found, or by name if not (album_id = -1)
       """
-      track_uris = []
       mesg_file = ""
       mesg_info = {}
-      self.log.log(20, "get_album() album_name = "+album_name+" artist_name = "+artist_name)
-      track_uris = []                      # return value
+      self.log.log(20, "get_album() album_name = %s artist_name = %s", album_name, artist_name)
+      track_ids = []                       # return value
       artist_found = "none"
-      if album_id == -1:                   # no album yet
-        url = ITEMS_SEARCH_URL+str(album_name)+"&IncludeItemTypes=MusicAlbum&Recursive=true&"+API_KEY+self.auth.token
-        self.log.log(20, "get_album(): calling self._get with url: "+str(url))
-        albums = self._get(url)            # search for album
-        albums_json = albums.json()
+      exact = True                         # found under the name asked for
+      if album_id == -1:                   # no album yet - try the local index first
+        row = self._index_lookup(album_name, ALBUM_TYPE)
+        if row is None:                    # maybe the name was misheard
+          row = self._fuzzy_lookup(album_name, (ALBUM_TYPE,))
+          exact = row is None
+        if row is not None:
+          album_id = row["id"]
+          album_name = row["name"].lower()
+          artist_found = str(row["album_artist"]).lower()
+          track_ids = self.index.tracks_for_album(album_id)
+          self.log.log(20, "get_album() found album %s in the local index with ID %s", album_name, album_id)
+      if album_id == -1:                   # not in the index either - search the server
+        url = self.items_url(ITEMS_QUERY_URL, limit=NAME_SEARCH_LIMIT, searchterm=album_name,
+                             IncludeItemTypes="MusicAlbum", Recursive="true")
+        self.log.log(20, "get_album(): calling self._get with url: %s", url)
+        albums_json = self._get_json(url, self.name_cache) # search for album
         num_hits = albums_json["TotalRecordCount"]
-        self.log.log(20, "get_album() num_hits = " + str(num_hits))
+        self.log.log(20, "get_album() num_hits = %s", num_hits)
         if num_hits == 0:                  # album not found
-          self.log.log(20, "get_album() _get() did not find an album matching "+str(album_name))
+          self.log.log(20, "get_album() _get() did not find an album matching %s", album_name)
           ret_val = Music_info(None, None, None, None)
           return ret_val
-        for i in range(num_hits):          # iterate through albums found - could be one
-          album_found = albums_json["Items"][i]["Name"].lower()
-          self.log.log(20, "get_album() comparing album_name "+str(album_name)+" with album_found "+album_found)
-          if album_name == album_found:    # found the album
-            album_id = albums_json["Items"][i]["Id"]
-            artist_found = albums_json["Items"][i]["Artists"][0].lower()
-            self.log.log(20, "get_album() found album "+album_name+" by artist "+str(artist_found)+" with ID "+str(album_id))
-            break
+        best_score = FUZZY_MIN_SCORE       # take the album named most like album_name
+        for album in albums_json["Items"]: # iterate through albums found - could be one
+          album_found = album["Name"].lower()
+          score = similarity(album_name, album_found)
+          self.log.log(10, "get_album() comparing album_name %s with album_found %s score %s", album_name, album_found, round(score, 2))
+          if score >= best_score:
+            best_score = score
+            album_id = album["Id"]
+            artist_found = album["Artists"][0].lower() if album.get("Artists") else "none"
+            exact = album_found == album_name
+            if exact:
+              break
+        if album_id != -1:
+          self.log.log(20, "get_album() found album %s by artist %s with ID %s", album_name, artist_found, album_id)
         if album_id == -1:                 # album has still not been found
-          self.log.log(20, "get_album() album "+str(album_name)+" was not found")
+          self.log.log(20, "get_album() album %s was not found", album_name)
           ret_val = Music_info("album", None, None, None)
           return ret_val
-      tracks = self.get_songs_by_album(album_id)  # get tracks on album, and convert to URIs
-      self.log.log(20, "get_album() tracks = "+str(tracks))
-      tracks_json = tracks.json()          # convert to JSON
-      track_uris = self.get_track_uris(tracks_json)
+      if resolve_only and not track_ids:   # the tracks and artist check come later
+        return self.deferred_music("album", "album", album_id, album_name, artist_name, exact)
+      if not track_ids:                    # tracks are not indexed - get them from the server
+        album_tracks = self.claim_speculative(("album", album_id))
+        try:
+          if album_tracks is None:         # not fetched ahead of time
+            album_tracks = self._album_tracks(album_id)
+        except DeadlineExceeded:           # found the album in time but not its tracks
+          self.log.log(20, "get_album() out of time, returning album %s without its tracks", album_name)
+          return self.deferred_music("album", "album", album_id, album_name, artist_name, exact)
+        track_ids, tracks_artist = album_tracks
+        self.log.log(20, "get_album() number of tracks = %s", len(track_ids))
+        if artist_name != "unknown-artist" and track_ids:
+          artist_found = tracks_artist
+      track_ids = self.pick_tracks(track_ids)
       if artist_name != "unknown-artist":
-        artist_found = tracks_json["Items"][0]["Artists"][0].lower()
         if artist_name != artist_found: # wrong artist - speak which artist is being played 
-          self.log.log(20, "get_album() ====================>: playing album "+str(album_name)+" by "+str(artist_found)+" not by "+str(artist_name))
+          self.log.log(20, "get_album() ====================>: playing album %s by %s not by %s", album_name, artist_found, artist_name)
           mesg_file = "diff_album_artist"
           mesg_info = {"album_name": album_name, "artist_found": artist_found, "artist_name": artist_name}
-      ret_val = Music_info("album", mesg_file, mesg_info, track_uris)
+      entity = {"type": "album", "id": album_id, "name": album_name, "artist_name": artist_name}
+      ret_val = Music_info("album", mesg_file, mesg_info, track_ids, self.get_song_file, entity, exact)
       return ret_val
 
-    def get_artist(self, artist_name, artist_id):
+    def get_artist(self, artist_name, artist_id, resolve_only=False):
       """
       return track URIs for artist either by ID if passed or by artist_name
       """
-      track_uris = []                      # return value
-      self.log.log(20, "get_artist() called with artist_name "+str(artist_name))
+      self.log.log(20, "get_artist() called with artist_name %s", artist_name)
+      exact = True                         # found under the name asked for
+      if artist_id == -1:                  # try the local index first
+        row = self._index_lookup(artist_name, ARTIST_TYPE)
+        if row is None:                    # maybe the name was misheard
+          row = self._fuzzy_lookup(artist_name, (ARTIST_TYPE,))
+          exact = row is None
+        if row is not None:
+          artist_id = row["id"]
+          artist_name = row["name"].lower()
+          track_ids = self.index.tracks_for_artist(artist_id)
+          self.log.log(20, "get_artist() found artist ID %s and %s tracks in the local index", artist_id, len(track_ids))
+          if track_ids:
+            return Music_info("artist", "", {}, self.pick_tracks(track_ids, True), self.get_song_file, None, exact)
       if artist_id == -1:                  # need to find it
-        artist_encoded = urllib.parse.quote(artist_name) # encode artist name
-        url = '{0}{1}&{2}{3}'.format(ITEMS_ARTIST_ID_URL, artist_encoded, API_KEY, self.auth.token)
-        self.log.log(20, "get_artist() getting artist ID with emby API: "+str(url))
-        artist = self._get(url)            # search for artist
-        artist_json = artist.json()        # convert to JSON
+        url = self.items_url(ARTISTS_QUERY_URL, limit=NAME_SEARCH_LIMIT, searchterm=artist_name)
+        self.log.log(20, "get_artist() getting artist ID with emby API: %s", url)
+        artist_json = self._get_json(url, self.name_cache) # search for artist
         num_artists = artist_json["TotalRecordCount"]
-        self.log.log(20, "get_artist() num_artists = "+str(num_artists))
+        self.log.log(20, "get_artist() num_artists = %s", num_artists)
         if num_artists == 0:               # artist not found
-          self.log.log(20, "get_artist() did not find music for artist "+str(artist))
+          self.log.log(20, "get_artist() did not find music for artist %s", artist_name)
           ret_val = Music_info("Artist", None, None, None)
           return ret_val
-        artist_id = artist_json["Items"][0]["Id"]
-        self.log.log(20, "get_artist() found artist ID "+artist_id+" with emby API: "+str(url))
+        best = max(artist_json["Items"], key=lambda artist: similarity(artist_name, artist["Name"]))
+        artist_id = best["Id"]             # the artist named most like artist_name
+        exact = best["Name"].lower() == artist_name
+        self.log.log(20, "get_artist() found artist ID %s with emby API: %s", artist_id, url)
+
+      if resolve_only:                     # the tracks come later
+        return self.deferred_music("artist", "artist", artist_id, artist_name, exact=exact)
 
       # have artist ID, get the tracks
-      url = ITEMS_SONGS_BY_ARTIST_URL + str(artist_id) + "&" + API_KEY + self.auth.token
-      self.log.log(20, "get_artist() getting songs by artist with url: "+str(url))
-      tracks = self._get(url)
-      self.log.log(20, "get_artist() found tracks: "+str(tracks))
-      tracks_json = tracks.json()
-      num_recs = tracks_json["TotalRecordCount"]
-      self.log.log(20, "get_artist() number of records found = "+str(num_recs))
-      track_uris = self.get_track_uris(tracks_json, True) # do shuffle tracks
-      ret_val = Music_info("artist", "", {}, track_uris)
+      track_ids = self.claim_speculative(("artist", artist_id))
+      try:
+        if track_ids is None:              # not fetched ahead of time
+          track_ids = self._artist_tracks(artist_id)
+      except DeadlineExceeded:             # found the artist in time but not the tracks
+        self.log.log(20, "get_artist() out of time, returning artist %s without tracks", artist_name)
+        return self.deferred_music("artist", "artist", artist_id, artist_name, exact=exact)
+      self.log.log(20, "get_artist() number of records kept = %s", len(track_ids))
+      track_ids = self.pick_tracks(track_ids, True) # do shuffle tracks
+      ret_val = Music_info("artist", "", {}, track_ids, self.get_song_file, None, exact)
       return ret_val
  
-    def get_all_music(self):
+    def get_all_music(self, resolve_only=False):
       """
       Return random tracks URIs from all music
+      The server picks MAX_TRACKS random audio items, so the library is never downloaded;
+      if it cannot, fall back to sampling the whole library client side
       """
-      track_uris = []                      # return value
+      if resolve_only:                     # always a match, the tracks come later
+        return self.deferred_music("song", "music", None, "music")
       self.log.log(20, "get_all_music() play full random music")
-      # searching with no search clause returns all tracks
-      url = ITEMS_SEARCH_URL+'&'+RECURSIVE_CLAUSE+'&'+API_KEY+self.auth.token
-      self.log.log(20, "get_all_music() all track IDs with Emby API: " + url)
-      tracks = self._get(url)              # search for music
-      tracks_json = tracks.json()
-      num_recs = tracks_json["TotalRecordCount"]
-      self.log.log(20, "get_all_music() number of records found = "+str(num_recs))
-      if num_recs == 0:                    # music not found
-        self.log.log(20, "Did not find music with emby API: "+str(url))
+      url = self.items_url(ITEMS_RANDOM_AUDIO_URL, limit=MAX_TRACKS)
+      self.log.log(20, "get_all_music() random track IDs with Emby API: %s", url)
+      try:
+        tracks = self._get(url)            # ask the server for a random sample
+      except DeadlineExceeded:             # the tracks come later
+        return self.deferred_music("song", "music", None, "music")
+      if tracks.status_code == 200:
+        items = decode(tracks)["Items"]
+        if len(items) > MAX_TRACKS:        # server ignored the Limit
+          self.log.log(20, "get_all_music() server returned %s items, sampling them", len(items))
+          items = reservoir_sample(items, MAX_TRACKS)
+      else:                                # searching with no search clause returns all items
+        self.log.log(20, "get_all_music() random sort failed with status %s, sampling all music", tracks.status_code)
+        url = self.items_url(ITEMS_QUERY_URL, Recursive="true", IncludeItemTypes="Audio")
+        items = reservoir_sample(self.iter_items(url), MAX_TRACKS)
+      track_ids = [item["Id"] for item in items]
+      self.log.log(20, "get_all_music() number of tracks found = %s", len(track_ids))
+      if len(track_ids) == 0:              # music not found
+        self.log.log(20, "Did not find music with emby API: %s", url)
         ret_val = Music_info("song", None, None, None)
         return ret_val
-      track_uris = self.get_track_uris(tracks_json, True) # shuffle tracks too
-      ret_val = Music_info("song", "", {}, track_uris)
+      track_ids = self.pick_tracks(track_ids, True) # shuffle tracks too
+      ret_val = Music_info("song", "", {}, track_ids, self.get_song_file)
       return ret_val
-      
-    def get_genre(self, genre):
+
+    def get_genre_table(self):
       """
-      Given a genre name, return track URIs 
+      Return a dict of lower case genre name -> (genre ID, genre name) of all music genres,
+      fetched in one paged query and cached as long as other name lookups, unless it is empty
       """
-      self.log.log(20, "TODO: finish code in get_genre() play genre: "+genre)
-      ret_val = Music_info("song", None, None, None)
-      return ret_val
+      url = self.items_url(GENRES_URL)
+      key = self.cache_key(url)
+      genres = self.name_cache.get(key, stale=self.breaker.is_open())
+      if genres is None:                   # not fetched recently
+        genres = {item["Name"].lower(): (item["Id"], item["Name"]) for item in self.iter_items(url, INDEX_PAGE_SIZE)}
+        self.log.log(20, "get_genre_table() found %s genres", len(genres))
+        if genres:                         # like _get_json(), a lookup that found nothing is not kept
+          self.name_cache.put(key, genres)
+      return genres
+
+    def get_genre_id(self, genre):
+      """
+      Given a genre name, return (genre ID, genre name) of the genre that sounds most like it,
+      or (-1, genre) if none is close enough
+      """
+      genres = self.get_genre_table()
+      found = genres.get(genre.lower())
+      if found is not None:
+        return found
+      score, found = max(((similarity(genre, name), (genre_id, name)) for genre_id, name in genres.values()),
+                         default=(0.0, None))
+      if score < FUZZY_MIN_SCORE:          # nothing close enough
+        return -1, genre
+      self.log.log(20, "get_genre_id() %s matched %s with score %s", genre, found[1], round(score, 2))
+      return found
+
+    def get_genre(self, genre, genre_id=-1, resolve_only=False):
+      """
+      Given a genre name, return MAX_TRACKS random tracks of it
+      The server filters by genre and picks the random tracks, so only they are transferred
+      """
+      self.log.log(20, "get_genre() called with genre: %s", genre)
+      exact = True                         # found under the name asked for
+      if genre_id == -1:                   # need to find it
+        genre_id, found = self.get_genre_id(genre)
+        exact = found.lower() == genre.lower()
+        genre = found
+      if genre_id == -1:                   # genre not found
+        self.log.log(20, "get_genre() did not find genre %s", genre)
+        return Music_info("song", None, None, None)
+      if resolve_only:                     # the tracks come later
+        return self.deferred_music("song", "genre", genre_id, genre, exact=exact)
+      url = self.items_url(ITEMS_GENRE_AUDIO_URL+str(genre_id), limit=MAX_TRACKS)
+      self.log.log(20, "get_genre() random track IDs with Emby API: %s", url)
+      try:
+        items = decode(self._get(url))["Items"]
+      except DeadlineExceeded:             # found the genre in time but not the tracks
+        return self.deferred_music("song", "genre", genre_id, genre, exact=exact)
+      if len(items) > MAX_TRACKS:          # server ignored the Limit
+        items = reservoir_sample(items, MAX_TRACKS)
+      track_ids = self.pick_tracks([item["Id"] for item in items], True) # shuffle tracks too
+      self.log.log(20, "get_genre() number of tracks = %s", len(track_ids))
+      if not track_ids:
+        return Music_info("song", None, None, None)
+      return Music_info("song", "", {}, track_ids, self.get_song_file, None, exact)
       
     def get_playlist_id(self, playlist):
       """
       Given a playlist name, return its Id or -1 if not found
       """
-      self.log.log(20, "get_playlist_id() called with playlist: "+str(playlist))
-      encoded_playlist = urllib.parse.quote(playlist) # encode playlist name for URL
-      url = ITEMS_PLAYLIST_URL+'&searchterm='+encoded_playlist+'&'+API_KEY+self.auth.token
-      self.log.log(20, "get_playlist_id() getting playlist ID with url: " + url)
-      playlists = self._get(url)           # search for playlist
-      playlists_json = playlists.json()
+      self.log.log(20, "get_playlist_id() called with playlist: %s", playlist)
+      row = self._index_lookup(playlist, PLAYLIST_TYPE) # try the local index first
+      if row is not None:
+        return row["id"]
+      url = self.items_url(ITEMS_PLAYLIST_URL, limit=1, searchterm=playlist) # only the first one is used
+      self.log.log(20, "get_playlist_id() getting playlist ID with url: %s", url)
+      playlists_json = self._get_json(url, self.name_cache) # search for playlist
       num_recs = playlists_json["TotalRecordCount"]
-      self.log.log(20, "get_playlist_id() number of records found = "+str(num_recs))
+      self.log.log(20, "get_playlist_id() number of records found = %s", num_recs)
       if num_recs == 0:                    # music not found
-        self.log.log(20, "get_playlist_id() Did not find playlist "+playlist) 
+        self.log.log(20, "get_playlist_id() Did not find playlist %s", playlist) 
         return -1 
       elif num_recs > 1:                   # more than one found
         self.log.log(20, "get_playlist_id() Ignoring multiple playlists") 
       playlist_id = playlists_json["Items"][0]["Id"]
-      self.log.log(20, "get_playlist_id() playlist_id = "+str(playlist_id))
+      self.log.log(20, "get_playlist_id() playlist_id = %s", playlist_id)
       return playlist_id
 
-    def get_playlist(self, playlist):
+    def get_playlist(self, playlist, playlist_id=-1, resolve_only=False):
       """
       Search for playlist and if found, return all tracks
       """
-      track_uris = []    
-      self.log.log(20, "get_playlist() called with playlist: "+playlist)
-      playlist_id = self.get_playlist_id(playlist)
+      self.log.log(20, "get_playlist() called with playlist: %s", playlist)
+      if playlist_id == -1:                # need to find it
+        playlist_id = self.get_playlist_id(playlist)
       if playlist_id == -1:                # playlist not found
         return Music_info("song", "playlist_not_found", {"playlist": playlist}, None)
-      url = GET_PLAYLIST_URL+'/'+str(playlist_id)+'/Items?'+API_KEY+self.auth.token
-      tracks = self._get(url)  
-      tracks_json = tracks.json()
-      num_recs = tracks_json["TotalRecordCount"]
-      track_uris = self.get_track_uris(tracks_json, True) # shuffle tracks too
-      self.log.log(20, "get_playlist() type of track_uris = "+str(type(track_uris)))
-      return Music_info("song", "", {}, track_uris)
+      if resolve_only:                     # the tracks come later
+        return self.deferred_music("song", "playlist", playlist_id, playlist)
+      url = self.items_url(GET_PLAYLIST_URL+str(playlist_id)+"/Items")
+      try:
+        track_ids = reservoir_sample((item["Id"] for item in self.iter_items(url)), MAX_TRACKS)
+      except DeadlineExceeded:             # found the playlist in time but not all of its tracks
+        return self.deferred_music("song", "playlist", playlist_id, playlist)
+      track_ids = self.pick_tracks(track_ids, True) # shuffle tracks too
+      self.log.log(20, "get_playlist() number of tracks = %s", len(track_ids))
+      return Music_info("song", "", {}, track_ids, self.get_song_file)
       
     def get_track(self, track_name, artist_name):
       """
       Get track by id if passed, but if -1, get track by name
       """
-      track_uris = []
+      self.log.log(20, "get_track() called with track_name %s artist_name %s", track_name, artist_name)
+      rows = self._index_lookup_all(track_name, TRACK_TYPE) # try the local index first
+      fuzzy = False
+      if not rows:                         # maybe the name was misheard
+        row = self._fuzzy_lookup(track_name, (TRACK_TYPE,))
+        if row is not None:
+          track_name = row["name"].lower()
+          rows = self._index_lookup_all(track_name, TRACK_TYPE)
+          fuzzy = True
+      if rows:
+        self.log.log(20, "get_track() found %s tracks in the local index", len(rows))
+        tracks = [{"Id": row["id"], "Name": row["name"], "AlbumArtist": row["album_artist"], "Album": row["album"]}
+                  for row in rows]
+      else:                                # search the server
+        url = self.items_url(ITEMS_QUERY_URL, searchterm=track_name, Recursive="true")
+        self.log.log(20, "get_track() getting track ID with Emby API: %s", url)
+        tracks = self._get_json(url, self.name_cache)["Items"] # search for music
+        self.log.log(20, "get_track() number of records found = %s", len(tracks))
+        if len(tracks) == 0:               # music not found
+          self.log.log(20, "Did not find music with emby API: %s", url)
+          return Music_info("song", None, None, None)
+      ret_val = self._track_from_candidates(track_name, artist_name, tracks)
+      return ret_val._replace(exact=False) if fuzzy else ret_val
+
+    def _track_from_candidates(self, track_name, artist_name, tracks):
+      """
+      Pick one of the tracks found for track_name and say which one if there was a choice
+      The match is exact if the track picked is named track_name, not just found by searching for it
+      """
       mesg_file = ""
       mesg_info = {}
-      self.log.log(20, "get_track() called with track_name "+track_name+" artist_name "+artist_name)
-      encoded_track_name = urllib.parse.quote(track_name) # encode track name for URL
-      url = '{0}{1}&{2}&{3}{4}'.format(ITEMS_SEARCH_URL, encoded_track_name, RECURSIVE_CLAUSE, API_KEY, self.auth.token)
-      self.log.log(20, "get_track() getting track ID with Emby API: " + url)
-      tracks = self._get(url)              # search for music
-      tracks_json = tracks.json()
-      num_recs = tracks_json["TotalRecordCount"]
-      self.log.log(20, "get_track() number of records found = "+str(num_recs))
-      if num_recs == 0:                    # music not found
-        self.log.log(20, "Did not find music with emby API: "+str(url))
-        return None
-      if num_recs > 1:                     # multiple tracks with same name found
-        index = random.randrange(num_recs) # pick random track/record/artist if multiple returned
-      else:                                # only one track
-        index = 0
-      artist_found = tracks_json["Items"][index]["AlbumArtist"].lower()
-      album_found = tracks_json["Items"][index]["Album"].lower()
-      type_found = tracks_json["Items"][index]["Type"]
-      self.log.log(20, "get_track() type_found = "+str(type_found))
+      num_recs = len(tracks)
+      track = random.choice(tracks)        # pick random track if multiple returned
+      artist_found = str(track.get("AlbumArtist")).lower()
+      album_found = str(track.get("Album")).lower()
+      track_id = track["Id"]
       if num_recs > 1:                     # speak which track was chosen
-        self.log.log(20, "get_track(): ====================>: playing track "+str(track_name)+" by artist "+artist_found+" from album "+album_found)
+        self.log.log(20, "get_track(): ====================>: playing track %s by artist %s from album %s", track_name, artist_found, album_found)
         mesg_file = "playing_track"
         mesg_info = {"track_name": track_name, "artist_name": artist_found, "album_name": album_found}
-      track_id = tracks_json["Items"][index]["Id"]
-      track_uris.append(self.get_song_file(track_id))
-      self.log.log(20, "get_track() track_uris = "+str(track_uris))
+      self.log.log(20, "get_track() track_id = %s", track_id)
 
       # if artist was specified, verify it is correct
       if artist_name != "unknown-artist" and artist_name != artist_found: # wrong artist - speak correct artist before playing 
-        self.log.log(20, "get_track() ====================>: playing album "+str(album_found)+" by "+str(artist_found)+" not by "+str(artist_name))
+        self.log.log(20, "get_track() ====================>: playing album %s by %s not by %s", album_found, artist_found, artist_name)
         mesg_file = "diff_artist"
         mesg_info = {"track_name": track_name, "album_name": album_found, "artist_found": artist_found, "artist_name": artist_name}
-      ret_val = Music_info("song", mesg_file, mesg_info, track_uris)
+      exact = str(track.get("Name", track_name)).lower() == track_name
+      ret_val = Music_info("song", mesg_file, mesg_info, [track_id], self.get_song_file, None, exact)
       return ret_val 
 
-    def get_unknown_music(self, music_name, artist_name):
+    def get_unknown_music(self, music_name, artist_name, resolve_only=False):
       """
       Search on a music search term  - could be album, artist or track
+      The artist, album and track searches run in parallel and their hits are ranked together;
+      the tracks of a likely album or artist start downloading as soon as it is seen
       """
-      match_type = ""
-      track_uris = []
-      mesg_file = ""
-      mesg_info = {}
-      self.log.log(20, "get_unknown_music() music_name = "+music_name+" artist_name = "+artist_name)
-      encoded_music_name = urllib.parse.quote(music_name) # encode track name for URL
-      url = '{0}{1}&{2}&{3}{4}'.format(ITEMS_SEARCH_URL, encoded_music_name, RECURSIVE_CLAUSE, API_KEY, self.auth.token)
-      self.log.log(20, "get_unknown_music() getting track ID with emby API: " + url)
-      tracks = self._get(url)              # search for music
-      tracks_json = tracks.json()  
-      num_recs = tracks_json["TotalRecordCount"]
-      self.log.log(20, "get_unknown_music() number of records found = "+str(num_recs))
-      if num_recs == 0:                    # music not found
-        self.log.log(20, "get_unknown_music() did not find music with emby API: "+str(url))
+      self.log.log(20, "get_unknown_music() music_name = %s artist_name = %s", music_name, artist_name)
+      row = None
+      fuzzy = False
+      for item_type in FUZZY_TYPES:        # try the local index first
+        row = self._index_lookup(music_name, item_type)
+        if row is not None:
+          break
+      else:                                # maybe the name was misheard
+        row = self._fuzzy_lookup(music_name, FUZZY_TYPES)
+        fuzzy = row is not None
+      if row is not None:                  # the get_ functions read the tracks from the index too
+        indexed_name = row["name"].lower()
+        if row["type"] == ARTIST_TYPE:
+          ret_val = self.get_artist(indexed_name, -1, resolve_only)
+        elif row["type"] == ALBUM_TYPE:
+          ret_val = self.get_album(indexed_name, -1, artist_name, resolve_only)
+        else:
+          ret_val = self.get_track(indexed_name, artist_name)
+        return ret_val._replace(exact=False) if fuzzy else ret_val
+      lookup_urls = [
+        self.items_url(ARTISTS_QUERY_URL, limit=NAME_SEARCH_LIMIT, searchterm=music_name),
+        self.items_url(ITEMS_QUERY_URL, limit=NAME_SEARCH_LIMIT, searchterm=music_name,
+                       IncludeItemTypes="MusicAlbum", Recursive="true"),
+        self.items_url(ITEMS_QUERY_URL, limit=NAME_SEARCH_LIMIT, searchterm=music_name,
+                       IncludeItemTypes="Audio", Recursive="true"),
+      ]
+      futures = [self._submit(self._get_items, url) for url in lookup_urls]
+      candidates = []
+      try:
+        for future in as_completed(futures, timeout=remaining()):
+          try:
+            items = future.result()
+          except DeadlineExceeded:         # rank the hits of the searches that finished in time
+            continue
+          candidates.extend(items)
+          for item in items:               # an exact album or artist is the likely winner
+            if item["Type"] in ("MusicAlbum", "MusicArtist") and item["Name"].lower() == music_name:
+              self._speculate_tracks(item)
+      except FuturesTimeoutError:          # the deadline passed with searches still running
+        self.log.log(20, "get_unknown_music() out of time, ranking the %s hits found so far", len(candidates))
+      ranked = rank_candidates(candidates, music_name, artist_name)
+      self.log.log(20, "get_unknown_music() number of records found = %s", len(ranked))
+      if len(ranked) == 0:                 # music not found
+        self.log.log(20, "get_unknown_music() did not find music named %s", music_name)
         ret_val = Music_info("song", None, None, None)
         return ret_val
-      type_found = tracks_json["Items"][0]["Type"]
-      self.log.log(20, "get_unknown_music() type_found = "+str(type_found))
+      best = ranked[0]
+      type_found = best["Type"]
+      self.log.log(20, "get_unknown_music() type_found = %s", type_found)
       match type_found:
-        case "Audio":                    
-          ret_val = self.get_track(music_name, artist_name)
+        case "Audio":
+          tracks = [item for item in ranked if item["Type"] == "Audio" and item["Name"].lower() == best["Name"].lower()]
+          ret_val = self._track_from_candidates(music_name, artist_name, tracks)
         case "MusicAlbum": 
-          # we have an album ID - if artist was specified, be sure it is correct
-          if artist_name != "unknown-artist":  # artist was requested
-            self.log.log(20, "get_unknown_music() checking for correct artist")
-            artist_found = tracks_json["Items"][0]["AlbumArtist"].lower() 
-          album_name = tracks_json["Items"][0]["Name"].lower()
-          album_id = tracks_json["Items"][0]["Id"]
-          artist_found = tracks_json["Items"][0]["Name"][0].lower()
+          self._speculate_tracks(best)
           self.log.log(20, "get_unknown_music() type is MusicAlbum: calling get_album()")
-          ret_val = self.get_album(album_name, album_id, artist_name) 
+          ret_val = self.get_album(best["Name"].lower(), best["Id"], artist_name, resolve_only)
         case "MusicArtist": 
-          artist_found = tracks_json["Items"][0]["Name"][0].lower()
-          artist_name = tracks_json["Items"][0]["Name"].lower()
-          artist_id = tracks_json["Items"][0]["Id"]
+          self._speculate_tracks(best)
           self.log.log(20, "get_unknown_music() type is MusicArtist: calling get_artist()")
-          ret_val = self.get_artist(artist_name, artist_id) 
+          ret_val = self.get_artist(best["Name"].lower(), best["Id"], resolve_only)
         case _:  
-          self.log.log(20, "get_unknown_music() WARNING unexpected type_found: "+type_found)
-          track_uris = None
-      return ret_val
+          self.log.log(20, "get_unknown_music() WARNING unexpected type_found: %s", type_found)
+          ret_val = Music_info("song", None, None, None)
+      return ret_val._replace(exact=ret_val.exact and best["Name"].lower() == music_name) # not just a search hit
+
+    def _speculate_tracks(self, item):
+      """
+      Start fetching the tracks of an album or artist item in the background
+      """
+      if item["Type"] == "MusicAlbum":
+        self.speculate(("album", item["Id"]), self._album_tracks, item["Id"])
+      else:
+        self.speculate(("artist", item["Id"]), self._artist_tracks, item["Id"])
       
-    def get_music(self, intent, music_name, artist_name):
+    def get_music(self, intent, music_name, artist_name, resolve_only=False, deadline=None):
       """
       Search for track_uris with one search terms and an optional artist name
-      intent can be: album, album-artist, artist, music, track, track-artist, unknown-artist or unknown
+      intent can be: album, album-artist, artist, genre, music, playlist, track, track-artist, unknown-artist or unknown
       call one of:
         get_album()         play an album
         get_artist()        play an artist
@@ -559,49 +1356,54 @@ class EmbyClient(PublicEmbyClient):
         get_playlist()      play a saved playlist
         get_track()         play a specific track
         get_unknown_music() play something that might be a album, artist or track 
+      with resolve_only, album, artist, genre, playlist and random music are returned without their tracks
+      with a deadline, each call gets what is left of it as its timeout, and music found without
+      its tracks when it runs out is returned as with resolve_only
       """
-      self.log.log(20, "get_music() intent = "+intent+" music_name = "+music_name+" artist_name = "+artist_name) 
-      match intent:
-        case "album":
-          ret_val = self.get_album(music_name, -1, "unknown-artist") # no album id
-        case "album-artist":
-          ret_val = self.get_album(music_name, -1, artist_name) # no album id
-        case "artist":
-          ret_val = self.get_artist(artist_name, -1) # no artist_id 
-        case "genre":                   
-          ret_val = self.get_genre(music_name) 
-        case "music":                      # full random
-          ret_val = self.get_all_music()
-        case "playlist": 
-          ret_val = self.get_playlist(music_name)  
-        case "track":                      # call get_track with unknown track ID
-          ret_val = self.get_track(music_name, "unknown-artist")
-        case "track-artist":           
-          ret_val = self.get_track(music_name, artist_name)
-        case "unknown-artist":
-          ret_val = self.get_unknown_music(music_name, artist_name)
-        case "unknown":
-          ret_val = self.get_unknown_music(music_name, "unknown-artist")
-        case _:                            # unexpected
-          self.log.log(20, "get_music() INTERNAL ERROR: intent is not supposed to be: "+str(intent))
-          ret_val = Music_info(None, None, None, None) 
+      self.log.log(20, "get_music() intent = %s music_name = %s artist_name = %s", intent, music_name, artist_name) 
+      with within(deadline):
+        match intent:
+          case "album":
+            ret_val = self.get_album(music_name, -1, "unknown-artist", resolve_only) # no album id
+          case "album-artist":
+            ret_val = self.get_album(music_name, -1, artist_name, resolve_only) # no album id
+          case "artist":
+            ret_val = self.get_artist(artist_name, -1, resolve_only) # no artist_id 
+          case "genre":                   
+            ret_val = self.get_genre(music_name, -1, resolve_only)
+          case "music":                    # full random
+            ret_val = self.get_all_music(resolve_only)
+          case "playlist": 
+            ret_val = self.get_playlist(music_name, -1, resolve_only)
+          case "track":                    # call get_track with unknown track ID
+            ret_val = self.get_track(music_name, "unknown-artist")
+          case "track-artist":           
+            ret_val = self.get_track(music_name, artist_name)
+          case "unknown-artist":
+            ret_val = self.get_unknown_music(music_name, artist_name, resolve_only)
+          case "unknown":
+            ret_val = self.get_unknown_music(music_name, "unknown-artist", resolve_only)
+          case _:                          # unexpected
+            self.log.log(20, "get_music() INTERNAL ERROR: intent is not supposed to be: %s", intent)
+            ret_val = Music_info(None, None, None, None) 
     #  track_uris = ret_val.track_uris  
     #  ret_val = Music_info(match_type, mesg_file, mesg_info, track_uris)
-      self.log.log(20, "get_music() - ret_val.track_uris of type "+str(type(ret_val.track_uris))) 
       return ret_val
-    
-    def get_id_from_uri(self, track_uris):
+
+    def get_item_ids(self, music_name):
       """
-      Given a track URI, return the track Id
+      Return the IDs of every track a phrase refers to, in order and not capped at MAX_TRACKS,
+      for adding to playlists: all tracks of an album, otherwise the tracks parse_music() picks
       """
-      self.log.log(20, "get_id_from_uri() track_uris = "+str(track_uris))
-      key = re.split("/Audio/", str(track_uris)) # track ID is to the right
-      if len(key) == 1:                    # unexpected 
-        self.log.log(20, "get_id_from_uri() UNEXPECTED: '/Audio/' not found in track_uris")
-        return None
-      uri_suffix = key[1]
-      key = re.split("/", uri_suffix)
-      return key[0]
+      music_info = self.parse_music(music_name, resolve_only=True)
+      entity = music_info.entity
+      if entity is not None and entity["type"] == "album":
+        track_ids = self.index.tracks_for_album(entity["id"]) if self.index is not None else []
+        if not track_ids:                  # not indexed
+          track_ids = self._album_tracks(entity["id"])[0]
+        return TrackIds(track_ids)
+      music_info = self.expand_music(music_info)
+      return TrackIds(music_info.track_ids or [])
 
     def create_playlist(self, phrase):
       """
@@ -609,47 +1411,44 @@ class EmbyClient(PublicEmbyClient):
       Vocabulary:  (create|make) playlist {playlist} from (track|song|title) {track}
       """
       phrase = " ".join(phrase)            # convert list back to string
-      phrase_encoded = urllib.parse.quote(phrase) # encode playlist name
-      self.log.log(20, "create_playlist() called with phrase: "+phrase)
-      key = re.split("from track |from song |from title ", phrase)
-      if len(key) == 1:                    # unexpected 
+      self.log.log(20, "create_playlist() called with phrase: %s", phrase)
+      request = parse_playlist_command("create", phrase)
+      if request is None:                  # unexpected 
         self.log.log(20, "create_playlist() 'from track' not found in phrase")
         mesg_info = {"phrase": phrase} 
         return 'missing_from', mesg_info
-      playlist_name = key[0]
-      music_name = key[1]
-      self.log.log(20, "create_playlist() playlist_name = "+playlist_name+" music_name = "+music_name)
+      playlist_name = request.playlist_name
+      music_name = request.music_name
+      self.log.log(20, "create_playlist() playlist_name = %s music_name = %s", playlist_name, music_name)
 
       # check if playlist already exists
       playlist_id = self.get_playlist_id(playlist_name) # search for playlist first
       if playlist_id != -1:                # it exists
-        self.log.log(20, "create_playlist() playlist already exists: "+playlist_name)
+        self.log.log(20, "create_playlist() playlist already exists: %s", playlist_name)
         mesg_info = {"playlist_name": playlist_name} 
         return "playlist_exists", mesg_info
 
-      # parse_music() returns URIs from which the track ID can be obtained (yes, a bit kludgy)
-      # sample URI: ['http://192.168.1.229:8096/Audio/3329/stream.mp3?api_key=API_KEY']
-      music_info = self.parse_music(music_name) 
-      if music_info.track_uris == None:       # did not find track/album
-        self.log.log(20, "create_playlist() did not find track "+music_name)
+      track_ids = self.get_item_ids(music_name) 
+      if not track_ids:                    # did not find track/album
+        self.log.log(20, "create_playlist() did not find track %s", music_name)
         mesg_file = "cannot_create_playlist"
         mesg_info = {"playlist_name": playlist_name, "music_name": music_name} 
         return mesg_file, mesg_info
-      self.log.log(20, "create_playlist() music_info.track_uris = "+str(music_info.track_uris))
-      track_id = self.get_id_from_uri(music_info.track_uris)
-      self.log.log(20, "create_playlist() track_id = "+track_id)
-      payload = {'Name': playlist_name, 'Ids': track_id, 'MediaType': 'Playlists'}
+      track_ids = list(dict.fromkeys(track_ids)) # drop duplicates, keep the order
+      self.log.log(20, "create_playlist() number of tracks = %s", len(track_ids))
+      payload = {'Name': playlist_name, 'Ids': ",".join(track_ids), 'MediaType': 'Playlists'}
       payload.update(self.get_headers())
       url = GET_PLAYLIST_URL+"?"+API_KEY+self.auth.token
-      self.log.log(20, "create_playlist() url = "+url)
-      self.log.log(20, "create_playlist() payload = "+str(payload))
+      self.log.log(20, "create_playlist() url = %s", url)
+      self.log.log(20, "create_playlist() payload = %s", payload)
       response = self._post(url, payload)
-      self.log.log(20, "create_playlist() response.status_code = "+str(response.status_code))
+      self.log.log(20, "create_playlist() response.status_code = %s", response.status_code)
+      self.invalidate_playlist()
       if 200 <= response.status_code < 300:
         mesg_info = {'playlist_name': playlist_name}
         return "created_playlist", mesg_info
       else:
-        mesg_info = {'status_code': status_code}
+        mesg_info = {'status_code': response.status_code}
         return "bad_emby_api", mesg_info
 
     def delete_playlist(self, playlist_name):
@@ -657,20 +1456,30 @@ class EmbyClient(PublicEmbyClient):
       Delete a playlist
       Vocabulary: (delete|remove) playlist {playlist}
       """
-      self.log.log(20, "delete_playlist() called with phrase: "+str(playlist_name))
+      self.log.log(20, "delete_playlist() called with phrase: %s", playlist_name)
 
       return False
 
+    def get_playlist_index(self, playlist_id):
+      """
+      Given a playlist ID, return its PlaylistIndex, fetched in one paged query
+      if not fetched recently; callers update it as they change the playlist
+      """
+      playlist_index = self.playlist_indexes.get(playlist_id)
+      if playlist_index is None:           # not fetched recently
+        url = self.items_url(GET_PLAYLIST_URL+playlist_id+"/Items", UserId=self.auth.user_id)
+        self.log.log(20, "get_playlist_index() url = %s", url)
+        playlist_index = PlaylistIndex(self.iter_items(url, INDEX_PAGE_SIZE))
+        self.playlist_indexes.put(playlist_id, playlist_index)
+      return playlist_index
+
     def get_playlist_track_ids(self, playlist_id):
       """
       Given a playlist ID, return all associated track IDs  
       """
-      url = ITEMS_URL+"?"+ITEMS_PARENT_ID_KEY+"="+playlist_id+"&recursive=true&"+API_KEY+self.auth.token
-      self.log.log(20, "get_playlist_track_ids() url = "+str(url)) 
-      track_uris = self._get(url)
-      tracks_json = track_uris.json()
-      track_ids = self.get_track_ids(tracks_json) 
-      self.log.log(20, "get_playlist_track_ids() track_ids = "+str(track_ids))
+      track_ids = TrackIds(self.get_playlist_index(playlist_id).item_ids())
+      self.log.log(20, "get_playlist_track_ids() found %s tracks", len(track_ids))
+      self.log.log(10, "get_playlist_track_ids() track_ids = %s", track_ids)
       return track_ids  
       
     def add_to_playlist(self, phrase):
@@ -681,49 +1490,49 @@ class EmbyClient(PublicEmbyClient):
         add (album|record) {album} to playlist {playlist}
       """
       phrase = " ".join(phrase)            # convert list back to string
-      self.log.log(20, "add_to_playlist() called with phrase: "+phrase)
-      key = re.split(" to playlist| two playlist| 2 playlist ", phrase)
-      if len(key) == 1:                    # did not find "to playlist"
+      self.log.log(20, "add_to_playlist() called with phrase: %s", phrase)
+      request = parse_playlist_command("add", phrase)
+      if request is None:                  # did not find "to playlist"
         self.log.log(20, "add_to_playlist() ERROR 'to playlist' not found in phrase")
         return "to_playlist_missing", {} 
-      music_name = key[0]
-      playlist_name = key[1] 
-      self.log.log(20, "add_to_playlist() music_name = "+music_name+" playlist_name = "+playlist_name)
+      music_name = request.music_name
+      playlist_name = request.playlist_name
+      self.log.log(20, "add_to_playlist() music_name = %s playlist_name = %s", music_name, playlist_name)
 
       # verify playlist exists
       playlist_id = self.get_playlist_id(playlist_name) 
       if playlist_id == -1:                # not found
-        self.log.log(20, "add_to_playlist() did not find playlist_name "+playlist_name)
+        self.log.log(20, "add_to_playlist() did not find playlist_name %s", playlist_name)
         mesg_info = {'playlist_name': playlist_name}
         return "missing_playlist", mesg_info
       
-      # verify track or album exists - parse_music() returns URIs but we want track IDs 
-      music_info = self.parse_music(music_name) 
-      if music_info.track_uris == None:
-        self.log.log(20, "add_to_playlist() did not find track or album "+music_name)
+      # verify track or album exists
+      track_ids = self.get_item_ids(music_name) 
+      if not track_ids:
+        self.log.log(20, "add_to_playlist() did not find track or album %s", music_name)
         mesg_info = {"playlist_name": playlist_name, "music_name": music_name} 
         return "playlist_missing_track", mesg_info
-      self.log.log(20, "add_to_playlist() music_info.track_uris = "+str(music_info.track_uris))
-      track_id = self.get_id_from_uri(music_info.track_uris)
-      self.log.log(20, "add_to_playlist() track_id = "+track_id)
-
-      # verify track is not already in playlist
-      track_ids = self.get_playlist_track_ids(playlist_id)
-      self.log.log(20, "add_to_playlist() track_ids in playlist = "+str(track_ids))
-      if track_id in track_ids:            # track is already in playlist
-        self.log.log(20, "add_to_playlist() track_id = "+track_id)
+
+      # only add tracks that are not already in the playlist
+      playlist_index = self.get_playlist_index(playlist_id)
+      new_track_ids = [track_id for track_id in dict.fromkeys(track_ids) if track_id not in playlist_index]
+      self.log.log(20, "add_to_playlist() adding %s of %s tracks", len(new_track_ids), len(track_ids))
+      if not new_track_ids:                # all tracks are already in playlist
         mesg_info = {'music_name': music_name, 'playlist_name': playlist_name}
         return "track_in_playlist", mesg_info
 
-      # add track to playlist  
-      payload = {'Ids': track_id, 'UserId': self.auth.user_id}
+      # add all tracks to playlist in one request
+      payload = {'Ids': ",".join(new_track_ids), 'UserId': self.auth.user_id}
       payload.update(self.get_headers())
       url = GET_PLAYLIST_URL+playlist_id+'/Items?'+API_KEY+self.auth.token
-      self.log.log(20, "add_to_playlist() url = "+url)
-      self.log.log(20, "add_to_playlist() payload = "+str(payload))
+      self.log.log(20, "add_to_playlist() url = %s", url)
+      self.log.log(20, "add_to_playlist() payload = %s", payload)
       response = self._post(url, payload)
-      self.log.log(20, "add_to_playlist() response.status_code = "+str(response.status_code))
+      self.log.log(20, "add_to_playlist() response.status_code = %s", response.status_code)
+      self.invalidate_playlist(playlist_id)
       if 200 <= response.status_code < 300:
+        playlist_index.added(new_track_ids)
+        self.playlist_indexes.put(playlist_id, playlist_index)
         mesg_info = {'music_name': music_name, 'playlist_name': playlist_name}
         return "ok_its_done", mesg_info
       else:
@@ -732,55 +1541,105 @@ class EmbyClient(PublicEmbyClient):
       
     def delete_from_playlist(self, phrase):
       """
-      Delete a track from a playlist
+      Delete a track or album from a playlist
       Vocabulary:
         (remove|delete) (track|song|title) {track} from playlist {playlist}
         (remove|delete) (album|record) {album} from playlist {playlist}
       """
-      self.log.log(20, "delete_from_playlist() called with phrase: "+str(phrase))
+      self.log.log(20, "delete_from_playlist() called with phrase: %s", phrase)
       phrase = " ".join(phrase)            # convert list back to string
-      key = re.split(" from playlist ", phrase)
-      if len(key) == 1:                    # did not find "from playlist"
+      request = parse_playlist_command("delete", phrase)
+      if request is None:                  # did not find "from playlist"
         self.log.log(20, "delete_from_playlist() ERROR 'from playlist' not found in phrase")
         return "to_playlist_missing", {} 
-      music_name = key[0]
-      playlist_name = key[1] 
-      self.log.log(20, "delete_from_playlist() music_name = "+music_name+" playlist_name = "+playlist_name)
+      music_name = request.music_name
+      playlist_name = request.playlist_name
+      self.log.log(20, "delete_from_playlist() music_name = %s playlist_name = %s", music_name, playlist_name)
 
       # verify playlist exists
       playlist_id = self.get_playlist_id(playlist_name) 
       if playlist_id == -1:                # not found
-        self.log.log(20, "delete_from_playlist() did not find playlist_name "+playlist_name)
+        self.log.log(20, "delete_from_playlist() did not find playlist_name %s", playlist_name)
         mesg_info = {'playlist_name': playlist_name}
         return "missing_playlist", mesg_info
       
-      # verify track or album exists - parse_music() returns URIs but we want track IDs 
-      music_info = self.parse_music(music_name) 
-      if music_info.track_uris == None:
-        self.log.log(20, "delete_from_playlist() did not find track or album "+music_name)
+      # verify track or album exists
+      track_ids = self.get_item_ids(music_name)
+      if not track_ids:
+        self.log.log(20, "delete_from_playlist() did not find track or album %s", music_name)
         mesg_info = {"playlist_name": playlist_name, "music_name": music_name} 
         return "playlist_missing_track", mesg_info
-      self.log.log(20, "delete_from_playlist() music_info.track_uris = "+str(music_info.track_uris))
-      track_id = self.get_id_from_uri(music_info.track_uris)
-      self.log.log(20, "delete_from_playlist() track_id = "+track_id)
 
-      # remove track from playlist  
-    # payload = {'Id': track_id, 'UserId': self.auth.user_id}
-      payload = {'Id': track_id, 'EntryId': "1_810ne0fn"}
-      payload.update(self.get_headers())
-      url = ITEMS_URL+"/"+playlist_id+"?"+API_KEY+self.auth.token
-      self.log.log(20, "delete_from_playlist() url = "+url)
-      self.log.log(20, "delete_from_playlist() payload = "+str(payload))
-      response = self._delete(url, payload)
-      self.log.log(20, "delete_from_playlist() response.status_code = "+str(response.status_code))
-      self.log.log(20, "delete_from_playlist() response.url = "+str(response.url))
+      # look up the playlist entries of all tracks
+      track_ids = list(dict.fromkeys(track_ids))
+      playlist_index = self.get_playlist_index(playlist_id)
+      entry_ids = playlist_index.entry_ids(track_ids)
+      if entry_ids is None:                # added by us since the fetch, entry IDs unknown
+        self.invalidate_playlist(playlist_id)
+        playlist_index = self.get_playlist_index(playlist_id)
+        entry_ids = playlist_index.entry_ids(track_ids)
+      if not entry_ids:                    # none of the tracks are in the playlist
+        mesg_info = {"playlist_name": playlist_name, "music_name": music_name} 
+        return "playlist_missing_track", mesg_info
+      self.log.log(20, "delete_from_playlist() removing %s entries", len(entry_ids))
+
+      # remove all entries from playlist in one request
+      url = GET_PLAYLIST_URL+playlist_id+"/Items?EntryIds="+",".join(entry_ids)+"&"+API_KEY+self.auth.token
+      self.log.log(20, "delete_from_playlist() url = %s", url)
+      response = self._delete(url, None)
+      self.log.log(20, "delete_from_playlist() response.status_code = %s", response.status_code)
+      self.invalidate_playlist(playlist_id)
       if 200 <= response.status_code < 300:
+        playlist_index.removed(track_ids)
+        self.playlist_indexes.put(playlist_id, playlist_index)
         return "ok_its_done", {}
       else:                                # not a 2xx return code
         mesg_info = {'status_code': response.status_code}
         return "bad_emby_api", mesg_info
     # END NEW CODE
     
+def reservoir_sample(items, k):
+    """
+    Return k items picked at random from an iterable of any length,
+    holding no more than k items at a time
+    """
+    sample = []
+    for i, item in enumerate(items):
+        if i < k:
+            sample.append(item)
+        else:
+            j = random.randrange(i + 1)
+            if j < k:
+                sample[j] = item
+    return sample
+
+
+def rank_candidates(items, music_name, artist_name):
+    """
+    Order search hits of any type by how well their name matches music_name:
+    exact, then prefix, then substring; hits by the requested artist come first,
+    and ties go to artists, then albums, then tracks
+    """
+    type_rank = {"MusicArtist": 0, "MusicAlbum": 1, "Audio": 2}
+
+    def rank(item):
+        name = item["Name"].lower()
+        if name == music_name:
+            name_rank = 0
+        elif name.startswith(music_name):
+            name_rank = 1
+        elif music_name in name:
+            name_rank = 2
+        else:
+            name_rank = 3
+        artist_rank = 0
+        if artist_name != "unknown-artist" and item["Type"] != "MusicArtist":
+            artist_rank = 0 if str(item.get("AlbumArtist")).lower() == artist_name else 1
+        return name_rank, artist_rank, type_rank.get(item["Type"], 3)
+
+    return sorted((item for item in items if item["Type"] in type_rank), key=rank)
+
+
 class EmbyAuthorization(object):
 
     def __init__(self, user_id, token):
@@ -801,28 +1660,20 @@ class EmbyAuthorization(object):
             auth_content["User"]["Id"], auth_content["AccessToken"])
 
 
-class EmbyMediaItem(object):
+class EmbyMediaItem(namedtuple("EmbyMediaItem", ["id", "name", "type"])):
     """
-    Stripped down representation of a media item in Emby
+    Stripped down, immutable representation of a media item in Emby
     """
-
-    def __init__(self, id, name, type):
-        self.id = id
-        self.name = name
-        self.type = type
+    __slots__ = ()
 
     @classmethod
     def from_item(cls, item):
-        media_item_type = MediaItemType.from_string(item["Type"])
-        return EmbyMediaItem(item["Id"], item["Name"], media_item_type)
-
-    @staticmethod
-    def from_list(items):
-        media_items = []
-        for item in items:
-            media_items.append(EmbyMediaItem.from_item(item))
+        return cls(item["Id"], item["Name"], MEDIA_ITEM_TYPES.get(item["Type"], MediaItemType.OTHER))
 
-        return media_items
+    @classmethod
+    def from_list(cls, items):
+        other = MediaItemType.OTHER
+        return [cls(item["Id"], item["Name"], MEDIA_ITEM_TYPES.get(item["Type"], other)) for item in items]
 
 class MediaItemType(Enum):
     ARTIST = "MusicArtist"
@@ -832,7 +1683,7 @@ class MediaItemType(Enum):
 
     @staticmethod
     def from_string(enum_string):
-        for item_type in MediaItemType:
-            if item_type.value == enum_string:
-                return item_type
-        return MediaItemType.OTHER
+        return MEDIA_ITEM_TYPES.get(enum_string, MediaItemType.OTHER)
+
+
+MEDIA_ITEM_TYPES = {item_type.value: item_type for item_type in MediaItemType} # Emby item type -> MediaItemType
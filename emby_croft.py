@@ -1,19 +1,21 @@
-import logging
-import subprocess
+import os
 from enum import Enum
 from random import shuffle
-from collections import defaultdict
 import json
-import re
-from .music_info import Music_info
 
 try:
     # this import works when installing/running the skill
     # note the relative '.'
+    from .music_info import Music_info
     from .emby_client import EmbyClient, MediaItemType, EmbyMediaItem, PublicEmbyClient
+    from .structured_log import StructuredLog
+    from .json_codec import decode
 except (ImportError, SystemError):
     # when running unit tests the '.' from above fails so we exclude it
+    from music_info import Music_info
     from emby_client import EmbyClient, MediaItemType, EmbyMediaItem, PublicEmbyClient
+    from structured_log import StructuredLog
+    from json_codec import decode
 
 class IntentType(Enum):
     MEDIA = "media"
@@ -24,23 +26,32 @@ class IntentType(Enum):
     @staticmethod
     def from_string(enum_string):
         assert enum_string is not None
-        for item_type in IntentType:
-            if item_type.value == enum_string.lower():
-                return item_type
+        return INTENT_TYPES.get(enum_string.lower())
+
+
+INTENT_TYPES = {intent_type.value: intent_type for intent_type in IntentType} # intent name -> IntentType
+
+# written at install time by "make version" so loading the skill does not run git
+VERSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "VERSION")
+
 
 class EmbyCroft(object):
 
-    def __init__(self, host, username, password, client_id='12345', diagnostic=False):
+    cached_version = None                  # the version is only resolved once per process
+
+    def __init__(self, host, username, password, client_id='12345', diagnostic=False, token_file=None,
+                 index_file=None, metrics=None, breaker=None):
         self.host = EmbyCroft.normalize_host(host)
-        self.log = logging.getLogger(__name__)
+        self.log = StructuredLog(__name__)
         self.version = "UNKNOWN"
         self.set_version()
         if not diagnostic:
             self.client = EmbyClient(
                 self.host, username, password,
-                device="Mycroft", client="Emby Skill", client_id=client_id, version=self.version)
+                device="Mycroft", client="Emby Skill", client_id=client_id, version=self.version,
+                token_file=token_file, index_file=index_file, metrics=metrics, breaker=breaker)
         else:
-            self.client = PublicEmbyClient(self.host, client_id=client_id)
+            self.client = PublicEmbyClient(self.host, client_id=client_id, metrics=metrics, breaker=breaker)
 
     @staticmethod
     def determine_intent(intent: dict):
@@ -67,6 +78,7 @@ class EmbyCroft(object):
         :return:
         """
 
+        self.client.mark_active()
         songs = []
         if intent == IntentType.MEDIA:
             # default to instant mix
@@ -166,7 +178,7 @@ class EmbyCroft(object):
 
         songs = []
         for item in items:
-            self.log.log(20, 'instant_mix_for_media() instant Mix potential match: ' + item.name)
+            self.log.log(20, "instant_mix_for_media() instant Mix potential match: %s", item.name, sample=10)
             if len(songs) == 0:
                 songs = self.get_instant_mix_songs(item.id)
             else:
@@ -196,6 +208,15 @@ class EmbyCroft(object):
     def get_server_info_public(self):
         return self.client.get_server_info_public()
 
+    def refresh_index(self):
+        return self.client.refresh_index()
+
+    def sync_library(self):
+        return self.client.sync_library()
+
+    def warm_up(self):
+        return self.client.warm_up()
+
     def get_server_info(self):
         return self.client.get_server_info()
 
@@ -214,7 +235,7 @@ class EmbyCroft(object):
     @staticmethod
     def parse_search_hints_from_response(response):
         if response.text:
-            response_json = response.json()
+            response_json = decode(response)
             return response_json["SearchHints"]
 
     @staticmethod
@@ -222,7 +243,7 @@ class EmbyCroft(object):
         if response is None:
           return None 
         elif response.text:
-          response_json = response.json()
+          response_json = decode(response)
           return response_json["Items"]
 
   #  OLD CODE - commented out
@@ -257,10 +278,11 @@ class EmbyCroft(object):
   #      return phrase, intent
    
 
-    def parse_common_phrase(self, phrase: str):
+    def parse_common_phrase(self, phrase: str, deadline=None):
         """
         Attempts to match emby items with phrase
         :param phrase:
+        :param deadline: Deadline by which to answer, with what was found so far if need be
         :return:
         """
 
@@ -315,11 +337,32 @@ class EmbyCroft(object):
         #         return None, None
 
     # NEW CODE
-        ret_val = self.client.parse_music(phrase)
-        self.log.log(20, "parse_common_phrase() - returning Music_info object of type "+str(type(ret_val))) 
-        self.log.log(20, "parse_common_phrase() - ret_val.track_uris of type "+str(type(ret_val.track_uris))) 
+        self.client.mark_active()
+        ret_val = self.client.parse_music(phrase, deadline=deadline)
+        self.log.log(20, "parse_common_phrase() - returning Music_info object of type %s", type(ret_val)) 
+        self.log.log(20, "parse_common_phrase() - ret_val.track_ids of type %s", type(ret_val.track_ids)) 
         return ret_val
 
+    def match_common_phrase(self, phrase: str, deadline=None):
+        """
+        Quickly decides whether phrase names music in the library, for the
+        common play match phase. The tracks are fetched by expand_music()
+        :param phrase:
+        :param deadline: Deadline by which to answer, with what was found so far if need be
+        :return:
+        """
+        self.client.mark_active()
+        return self.client.match_music(phrase, deadline=deadline)
+
+    def expand_music(self, music_info):
+        """
+        Fetches the tracks of a match_common_phrase() result
+        :param music_info:
+        :return:
+        """
+        self.client.mark_active()
+        return self.client.expand_music(music_info)
+
     # Vocabulary for manipulating playlists:
     #   (create|make) playlist {playlist} from track {track}
     #   (delete|remove) playlist {playlist}
@@ -330,7 +373,8 @@ class EmbyCroft(object):
     #
     # return value is file name of .dialog file (str) to speak and any info to be added (dict)
     def manipulate_playlists(self, utterance):
-      self.log.log(20, "manipulate_playlists() called with: "+utterance) 
+      self.log.log(20, "manipulate_playlists() called with: %s", utterance) 
+      self.client.mark_active()
       words = utterance.split()            # split request into words
       match words[0]:                      
         case "create" | "make":         
@@ -342,19 +386,30 @@ class EmbyCroft(object):
             mesg_file, mesg_info = self.client.delete_from_playlist(words[1:]) 
         case "add":                  
           mesg_file, mesg_info = self.client.add_to_playlist(words[1:]) 
-      self.log.log(20, "manipulate_playlists() returned: "+mesg_file+" and "+str(mesg_info))
+      self.log.log(20, "manipulate_playlists() returned: %s and %s", mesg_file, mesg_info)
       return mesg_file, mesg_info
     # END NEW CODE
 
     def set_version(self):
         """
-        Attempts to get version based on the git hash
+        Attempts to get version from the VERSION file, or else from the git hash
+        The result is cached so only the first EmbyCroft pays for reading it
         :return:
         """
-        try:
-            self.version = subprocess.check_output(["git", "describe", "--always"]).strip().decode()
-        except Exception as e:
-            self.log.log(20, "set_version() failed to determine version with error: {}".format(str(e)))
+        if EmbyCroft.cached_version is None:
+            EmbyCroft.cached_version = self.version
+            try:
+                with open(VERSION_FILE) as version_file:
+                    EmbyCroft.cached_version = version_file.read().strip()
+            except OSError:                # not installed with "make version"
+                import subprocess
+                try:
+                    EmbyCroft.cached_version = subprocess.check_output(
+                        ["git", "describe", "--always"], cwd=os.path.dirname(VERSION_FILE),
+                        stderr=subprocess.DEVNULL).strip().decode()
+                except (OSError, subprocess.CalledProcessError) as e: # no git, or not a git checkout
+                    self.log.log(20, "set_version() failed to determine version with error: %s", e)
+        self.version = EmbyCroft.cached_version
 
     @staticmethod
     def normalize_host(host: str):
@@ -385,14 +440,14 @@ class EmbyCroft(object):
             return connection_success, server_info
 
         if response.status_code != 200:
-            logging.log(20, 'Non 200 status code returned when fetching public server info: ' + str(response.status_code))
+            self.log.log(20, 'Non 200 status code returned when fetching public server info: %s', response.status_code)
         else:
             connection_success = True
         try:
             server_info = json.loads(response.text)
         except Exception as e:
             details = 'diag_public_server_info() failed to parse server details, error: ' + str(e)
-            logging.log(20, details)
+            self.log.log(20, details)
             server_info['Error'] = details
 
         return connection_success, server_info
@@ -0,0 +1,83 @@
+import re
+import threading
+from collections import Counter
+
+FUZZY_MIN_SCORE = 0.6                      # similarity below which a name is not a match
+WORD = re.compile(r"[^\W_]+")
+
+
+def trigrams(name):
+    """
+    Return the set of letter trigrams of a name, ignoring case, punctuation and word spacing
+    """
+    text = " " + " ".join(WORD.findall(name.lower())) + " "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def similarity(name1, name2):
+    """
+    Return the Dice similarity of the trigrams of two names, from 0 (nothing shared) to 1
+    """
+    grams1 = trigrams(name1)
+    grams2 = trigrams(name2)
+    if not grams1 or not grams2:
+        return 0.0
+    return 2.0 * len(grams1 & grams2) / (len(grams1) + len(grams2))
+
+
+class FuzzyIndex(object):
+    """
+    In-memory trigram index of item names that tolerates speech recognition errors
+    """
+
+    def __init__(self):
+        self.names = {}                    # item ID -> (item type, name, number of trigrams)
+        self.postings = {}                 # (item type, trigram) -> set of item IDs
+        self.lock = threading.Lock()       # shared by the intent threads and the sync
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, item_id, item_type, name):
+        grams = trigrams(name)
+        with self.lock:
+            self._remove(item_id)
+            self.names[item_id] = (item_type, name, len(grams))
+            for gram in grams:
+                self.postings.setdefault((item_type, gram), set()).add(item_id)
+
+    def remove(self, item_id):
+        with self.lock:
+            self._remove(item_id)
+
+    def _remove(self, item_id):
+        entry = self.names.pop(item_id, None)
+        if entry is None:
+            return
+        item_type, name, _ = entry
+        for gram in trigrams(name):
+            item_ids = self.postings.get((item_type, gram))
+            if item_ids is not None:
+                item_ids.discard(item_id)
+                if not item_ids:
+                    del self.postings[(item_type, gram)]
+
+    def search(self, name, item_type, limit=5, min_score=FUZZY_MIN_SCORE):
+        """
+        Return up to limit (score, item ID, name) tuples of item_type, best first
+        """
+        grams = trigrams(name)
+        if not grams:
+            return []
+        with self.lock:
+            shared = Counter()
+            for gram in grams:
+                shared.update(self.postings.get((item_type, gram), ()))
+            hits = []
+            for item_id, num_shared in shared.items():
+                _, item_name, num_grams = self.names[item_id]
+                score = 2.0 * num_shared / (len(grams) + num_grams)
+                if score >= min_score:
+                    hits.append((score, item_id, item_name))
+        hits.sort(key=lambda hit: (-hit[0], hit[2]))
+        return hits[:limit]
@@ -0,0 +1,29 @@
+"""
+JSON decoding of the server's responses with the fastest decoder installed:
+orjson, then ujson, then the standard library, which is always there
+"""
+import json
+
+try:
+    import orjson
+
+    DECODER = "orjson"
+    loads = orjson.loads
+except ImportError:
+    try:
+        import ujson
+
+        DECODER = "ujson"
+        loads = ujson.loads
+    except ImportError:
+        DECODER = "json"
+        loads = json.loads
+
+
+def decode(response):
+    """
+    Return the JSON body of a requests response
+    Decodes the raw bytes, skipping the text decoding and charset guessing of response.json()
+    :raises ValueError: if the body is not JSON
+    """
+    return loads(response.content)
@@ -0,0 +1,206 @@
+import re
+import sqlite3
+import threading
+
+try:
+    from .structured_log import StructuredLog
+except (ImportError, SystemError):
+    from structured_log import StructuredLog
+
+# item types kept in the index
+ARTIST_TYPE = "MusicArtist"
+ALBUM_TYPE = "MusicAlbum"
+TRACK_TYPE = "Audio"
+GENRE_TYPE = "MusicGenre"
+PLAYLIST_TYPE = "Playlist"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    album_artist TEXT,
+    album TEXT,
+    album_id TEXT,
+    disc_number INTEGER,
+    track_number INTEGER
+);
+CREATE INDEX IF NOT EXISTS items_type_name ON items (type, name_lower);
+CREATE INDEX IF NOT EXISTS items_album ON items (album_id, disc_number, track_number);
+CREATE TABLE IF NOT EXISTS item_artists (
+    item_id TEXT NOT NULL,
+    artist_id TEXT NOT NULL,
+    PRIMARY KEY (item_id, artist_id)
+);
+CREATE INDEX IF NOT EXISTS item_artists_artist ON item_artists (artist_id);
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS names USING fts5(id UNINDEXED, type UNINDEXED, name)"
+ITEM_FIELDS = ("id", "type", "name", "album_artist", "album", "album_id", "disc_number", "track_number")
+ITEM_COLUMNS = ", ".join(ITEM_FIELDS)
+JOINED_ITEM_COLUMNS = ", ".join("items." + field for field in ITEM_FIELDS)
+
+
+class LibraryIndex(object):
+    """
+    On-disk SQLite copy of the music library names and IDs so that phrases
+    can be resolved without asking the Emby server
+    """
+
+    def __init__(self, path):
+        """
+        Open (or create) the index
+        :param path: SQLite file, or ":memory:"
+        """
+        self.log = StructuredLog(__name__)
+        self.path = path
+        self.lock = threading.Lock()       # shared by the intent threads and the sync
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.execute(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            self.log.log(20, "LibraryIndex() FTS5 not available, using LIKE lookups: %s", e)
+            self.fts = False
+        self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def count(self, item_type=None):
+        """
+        Return the number of items in the index, optionally of one type only
+        """
+        with self.lock:
+            if item_type is None:
+                row = self.conn.execute("SELECT COUNT(*) FROM items").fetchone()
+            else:
+                row = self.conn.execute("SELECT COUNT(*) FROM items WHERE type = ?", (item_type,)).fetchone()
+        return row[0]
+
+    def ids(self, item_types):
+        """
+        Return the set of indexed IDs of the given item types
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id FROM items WHERE type IN (" + ", ".join("?" * len(item_types)) + ")",
+                tuple(item_types)).fetchall()
+        return {row[0] for row in rows}
+
+    def get(self, item_id):
+        """
+        Return the item with this ID as a sqlite3.Row with the ITEM_COLUMNS fields, or None
+        """
+        with self.lock:
+            return self.conn.execute("SELECT " + ITEM_COLUMNS + " FROM items WHERE id = ?", (item_id,)).fetchone()
+
+    def names(self, item_types):
+        """
+        Return (id, type, name) of every indexed item of the given item types
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, type, name FROM items WHERE type IN (" + ", ".join("?" * len(item_types)) + ")",
+                tuple(item_types)).fetchall()
+
+    def get_state(self, key, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_state(self, key, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO state (key, value) VALUES (?, ?)", (key, value))
+
+    def upsert(self, items):
+        """
+        Insert or update Emby items given as the JSON dicts returned by /Items
+        :param items: iterable of item dicts
+        :return: number of items written
+        """
+        num_items = 0
+        with self.lock, self.conn:
+            for item in items:
+                item_id = item["Id"]
+                name = item.get("Name") or ""
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO items (" + ITEM_COLUMNS + ", name_lower) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (item_id, item["Type"], name, item.get("AlbumArtist"), item.get("Album"),
+                     item.get("AlbumId"), item.get("ParentIndexNumber"), item.get("IndexNumber"), name.lower()))
+                self.conn.execute("DELETE FROM item_artists WHERE item_id = ?", (item_id,))
+                artist_ids = {artist["Id"] for artist in item.get("ArtistItems", []) + item.get("AlbumArtists", [])}
+                self.conn.executemany("INSERT INTO item_artists (item_id, artist_id) VALUES (?, ?)",
+                                      [(item_id, artist_id) for artist_id in artist_ids])
+                if self.fts:
+                    self.conn.execute("DELETE FROM names WHERE id = ?", (item_id,))
+                    self.conn.execute("INSERT INTO names (id, type, name) VALUES (?, ?, ?)",
+                                      (item_id, item["Type"], name))
+                num_items += 1
+        return num_items
+
+    def delete(self, item_ids):
+        """
+        Remove items by ID
+        """
+        rows = [(item_id,) for item_id in item_ids]
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM items WHERE id = ?", rows)
+            self.conn.executemany("DELETE FROM item_artists WHERE item_id = ?", rows)
+            if self.fts:
+                self.conn.executemany("DELETE FROM names WHERE id = ?", rows)
+        return len(rows)
+
+    def find(self, name, item_type, limit=10):
+        """
+        Look up items of one type by name
+        Exact (case-insensitive) matches come first, then full text matches by rank
+        :return: list of sqlite3.Row with the ITEM_COLUMNS fields
+        """
+        name_lower = name.lower().strip()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT " + ITEM_COLUMNS + " FROM items WHERE type = ? AND name_lower = ? LIMIT ?",
+                (item_type, name_lower, limit)).fetchall()
+            if rows:
+                return rows
+            words = re.findall(r"\w+", name_lower)
+            if not words:
+                return []
+            if self.fts:
+                match = " ".join('"' + word + '"' for word in words)
+                return self.conn.execute(
+                    "SELECT " + JOINED_ITEM_COLUMNS + " FROM names JOIN items ON items.id = names.id"
+                    " WHERE names MATCH ? AND names.type = ? ORDER BY bm25(names) LIMIT ?",
+                    (match, item_type, limit)).fetchall()
+            return self.conn.execute(
+                "SELECT " + ITEM_COLUMNS + " FROM items WHERE type = ? AND name_lower LIKE ? LIMIT ?",
+                (item_type, "%" + "%".join(words) + "%", limit)).fetchall()
+
+    def tracks_for_album(self, album_id):
+        """
+        Return the track IDs of an album in disc and track order
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id FROM items WHERE type = ? AND album_id = ? ORDER BY disc_number, track_number, name_lower",
+                (TRACK_TYPE, album_id)).fetchall()
+        return [row[0] for row in rows]
+
+    def tracks_for_artist(self, artist_id):
+        """
+        Return the IDs of all tracks by an artist or on albums by that artist
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT items.id FROM item_artists JOIN items ON items.id = item_artists.item_id"
+                " WHERE item_artists.artist_id = ? AND items.type = ?",
+                (artist_id, TRACK_TYPE)).fetchall()
+        return [row[0] for row in rows]
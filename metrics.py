@@ -0,0 +1,170 @@
+import contextvars
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+try:
+    from .structured_log import StructuredLog
+except (ImportError, SystemError):
+    from structured_log import StructuredLog
+
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # seconds
+BACKGROUND = "background"                  # intent of calls made outside of any intent
+ID_SEGMENT = re.compile(r"/(?:[0-9a-fA-F]{16,}|\d+)(?=/|$)")
+
+# one HTTP call made while handling an intent
+Span = namedtuple("Span", ["method", "endpoint", "status", "bytes", "seconds"])
+
+# the trace of the intent being handled, copied into the worker threads it starts
+current_trace = contextvars.ContextVar("emby_trace", default=None)
+
+
+def endpoint_of(url):
+    """
+    Return the path of a url with item IDs replaced by {id}, so calls group by endpoint
+    """
+    path = url.split("?", 1)[0]
+    return ID_SEGMENT.sub("/{id}", path)
+
+
+class Histogram(object):
+    """
+    Counts of observed values by LATENCY_BUCKETS upper bound
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1) # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = 0
+        while i < len(LATENCY_BUCKETS) and value > LATENCY_BUCKETS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def as_dict(self):
+        cumulative = []
+        total = 0
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return {"buckets": dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"], cumulative)),
+                "sum": round(self.sum, 6), "count": self.count}
+
+
+class Trace(object):
+    """
+    The HTTP calls made while handling one intent
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.spans = []
+
+    def __str__(self):
+        return self.summary()
+
+    def summary(self):
+        return ", ".join("{0} {1} {2} {3}B {4}ms".format(span.method, span.endpoint, span.status, span.bytes,
+                                                         round(span.seconds * 1000)) for span in self.spans)
+
+
+class Metrics(object):
+    """
+    Counters and latency histograms of the Emby HTTP calls, grouped by the intent that caused them
+    Kept by the skill so they survive reconnects; exported as a dict for the message bus
+    or as a Prometheus text file for scraping
+    """
+
+    def __init__(self):
+        self.log = StructuredLog(__name__)
+        self.lock = threading.Lock()
+        self.calls = {}                    # (intent, method, endpoint, status) -> [count, bytes, Histogram]
+        self.intents = {}                  # intent -> Histogram of its duration
+
+    @contextmanager
+    def intent(self, name):
+        """
+        Group the HTTP calls made in the with block, and the worker threads it starts, under intent name
+        """
+        trace = Trace(name)
+        token = current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            yield trace
+        finally:
+            seconds = time.perf_counter() - start
+            current_trace.reset(token)
+            with self.lock:
+                self.intents.setdefault(name, Histogram()).observe(seconds)
+            self.log.timing("intent %s took %sms in %s calls", name, round(seconds * 1000), len(trace.spans))
+            self.log.log(20, "intent %s calls: %s", name, trace)
+
+    def record_call(self, method, url, status, num_bytes, seconds):
+        """
+        Record one HTTP call under the current intent
+        """
+        span = Span(method.upper(), endpoint_of(url), str(status), num_bytes, seconds)
+        trace = current_trace.get()
+        if trace is not None:
+            trace.spans.append(span)
+        key = (BACKGROUND if trace is None else trace.name, span.method, span.endpoint, span.status)
+        with self.lock:
+            stats = self.calls.get(key)
+            if stats is None:
+                stats = self.calls[key] = [0, 0, Histogram()]
+            stats[0] += 1
+            stats[1] += num_bytes
+            stats[2].observe(seconds)
+
+    def snapshot(self):
+        """
+        Return the metrics as a JSON-serialisable dict
+        """
+        with self.lock:
+            calls = [{"intent": intent, "method": method, "endpoint": endpoint, "status": status,
+                      "count": count, "bytes": num_bytes, "seconds": histogram.as_dict()}
+                     for (intent, method, endpoint, status), (count, num_bytes, histogram) in sorted(self.calls.items())]
+            intents = {intent: histogram.as_dict() for intent, histogram in sorted(self.intents.items())}
+        return {"calls": calls, "intents": intents}
+
+    def to_prometheus(self):
+        """
+        Return the metrics in the Prometheus text exposition format
+        """
+        snapshot = self.snapshot()
+        lines = ["# TYPE emby_http_requests_total counter",
+                 "# TYPE emby_http_response_bytes_total counter",
+                 "# TYPE emby_http_request_seconds histogram"]
+        for call in snapshot["calls"]:
+            labels = 'intent="{intent}",method="{method}",endpoint="{endpoint}",status="{status}"'.format(**call)
+            lines.append("emby_http_requests_total{%s} %d" % (labels, call["count"]))
+            lines.append("emby_http_response_bytes_total{%s} %d" % (labels, call["bytes"]))
+            lines.extend(histogram_lines("emby_http_request_seconds", labels, call["seconds"]))
+        lines.append("# TYPE emby_intent_seconds histogram")
+        for intent, histogram in snapshot["intents"].items():
+            lines.extend(histogram_lines("emby_intent_seconds", 'intent="%s"' % intent, histogram))
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """
+        Write the Prometheus text to path, replacing it in one step so a scraper never reads half a file
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def histogram_lines(name, labels, histogram):
+    lines = ['%s_bucket{%s,le="%s"} %d' % (name, labels, bound, count)
+             for bound, count in histogram["buckets"].items()]
+    lines.append("%s_sum{%s} %s" % (name, labels, histogram["sum"]))
+    lines.append("%s_count{%s} %d" % (name, labels, histogram["count"]))
+    return lines
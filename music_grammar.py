@@ -0,0 +1,91 @@
+import re
+from collections import namedtuple
+
+# A parsed music request
+# intent: album, album-artist, artist, genre, music, playlist, track, track-artist,
+#         unknown-artist, unknown or partial (a keyword with no music name)
+MusicRequest = namedtuple("MusicRequest", ["intent", "music_name", "artist_name", "playlist_name"])
+
+UNKNOWN_ARTIST = "unknown-artist"
+PARTIAL_PHRASES = frozenset(["album", "track", "song", "artist", "genre", "playlist"])
+RANDOM_PHRASES = frozenset(["any music", "all music", "my music", "random music", "some music", "music"])
+
+# the optional leading keyword and the rest of a play phrase
+PLAY_GRAMMAR = re.compile(r"(?:(?P<album>album|record)|(?P<track>track|song|title)|(?P<artist>artist|band)"
+                          r"|(?P<genre>genre)|(?P<playlist>playlist)) (?P<rest>.*)")
+ARTIST_KEYWORD = re.compile(r"(?:artist|band) ")
+BY = " by "
+
+# playlist commands, each splitting on the first separator
+PLAYLIST_GRAMMARS = {
+    "create": re.compile(r"(?P<playlist>.+?) from (?:track|song|title) (?P<music>.+)"),
+    "add": re.compile(r"(?P<music>.+?) (?:to|two|2) playlist (?P<playlist>.+)"),
+    "delete": re.compile(r"(?P<music>.+?) from playlist (?P<playlist>.+)"),
+}
+
+
+def parse_play(phrase):
+    """
+    Parse a lower case play phrase into a MusicRequest in one pass
+    Vocabulary:
+      play {music_name}
+      play (track|song|title|) {track} by (artist|band|) {artist}
+      play (album|record) {album} by (artist|band) {artist}
+      play (any|all|my|random|some|) music
+      play (playlist) {playlist}
+      play (genre) {genre}
+    """
+    if phrase in PARTIAL_PHRASES:
+        return MusicRequest("partial", phrase, UNKNOWN_ARTIST, None)
+    if phrase in RANDOM_PHRASES:
+        return MusicRequest("music", phrase, UNKNOWN_ARTIST, None)
+    keyword = PLAY_GRAMMAR.match(phrase)
+    body = phrase if keyword is None else keyword.group("rest")
+    parts = body.split(BY)
+    found_by = len(parts) > 1
+    artist_name = UNKNOWN_ARTIST
+    if len(parts) == 1:
+        music_name = body
+    elif len(parts) == 2:
+        music_name, artist_name = parts
+    elif len(parts) == 3:                  # "by" twice - assume the first one is in the music name
+        music_name = parts[0] + BY + parts[1]
+        artist_name = parts[2]
+    else:                                  # more than two - keep the music name only
+        music_name = parts[0]
+
+    if keyword is None:
+        intent = "unknown-artist" if found_by else "unknown"
+    elif keyword.group("album"):
+        intent = "album-artist" if found_by else "album"
+    elif keyword.group("track"):
+        intent = "track-artist" if found_by else "track"
+    elif keyword.group("artist"):
+        intent = "artist"
+        artist_name = music_name
+        music_name = "all_music"           # play all the songs they have
+    elif not found_by:                     # genre or playlist
+        kind = "genre" if keyword.group("genre") else "playlist"
+        return MusicRequest(kind, music_name, UNKNOWN_ARTIST, music_name if kind == "playlist" else None)
+    else:                                  # a leading genre or playlist is part of the music name
+        intent = "unknown-artist"
+        music_name = phrase[:keyword.start("rest")] + music_name
+    prefix = ARTIST_KEYWORD.match(artist_name)
+    if prefix is not None:                 # remove "artist" or "band" if first word
+        artist_name = artist_name[prefix.end():]
+    return MusicRequest(intent, music_name, artist_name, None)
+
+
+def parse_playlist_command(command, phrase):
+    """
+    Parse the phrase of a playlist command into a MusicRequest
+    Vocabulary:
+      create: {playlist} from (track|song|title) {music}
+      add:    {music} to playlist {playlist}
+      delete: {music} from playlist {playlist}
+    :return: MusicRequest with intent command, or None if the phrase has no separator
+    """
+    match = PLAYLIST_GRAMMARS[command].fullmatch(phrase)
+    if match is None:
+        return None
+    return MusicRequest(command, match.group("music").strip(), UNKNOWN_ARTIST, match.group("playlist").strip())
@@ -1,10 +1,100 @@
-class Music_info:
-  match_type = ""                  # album, artist or song
-  mesg_file = ""                   # if mycroft has to speak first
-  mesg_info = {}                   # values to plug in
-  track_uris = []                  # list of URIs to play
-  def __init__(self, match_type, mesg_file, mesg_info, track_uris):
-    self.match_type = match_type
-    self.mesg_file = mesg_file
-    self.mesg_info = mesg_info
-    self.track_uris = track_uris 
\ No newline at end of file
+import re
+from array import array
+from collections import namedtuple
+from collections.abc import Sequence
+
+DECIMAL_ID = re.compile(r"0|[1-9][0-9]{0,18}")  # Emby item IDs, small enough for an unsigned 64 bit int
+GUID_ID = re.compile(r"[0-9a-f]{32}")          # item IDs in GUID form
+GUID_BYTES = 16
+
+class TrackIds(Sequence):
+  """
+  Read-only list of track IDs packed into one buffer instead of a string object each:
+  decimal IDs in an array of 64 bit ints, GUIDs as 16 bytes each, anything else in a tuple
+  """
+  __slots__ = ("ids", "kind")
+
+  def __init__(self, track_ids):
+    track_ids = track_ids if isinstance(track_ids, (list, tuple)) else list(track_ids)
+    if all(isinstance(track_id, str) and DECIMAL_ID.fullmatch(track_id) for track_id in track_ids):
+      self.ids = array("Q", map(int, track_ids))
+      self.kind = "decimal"
+    elif all(isinstance(track_id, str) and GUID_ID.fullmatch(track_id) for track_id in track_ids):
+      self.ids = b"".join(bytes.fromhex(track_id) for track_id in track_ids)
+      self.kind = "guid"
+    else:
+      self.ids = tuple(track_ids)
+      self.kind = "other"
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    if self.kind == "decimal":
+      return str(self.ids[index])
+    if self.kind == "guid":
+      index = range(len(self))[index]    # negative indexes and bounds check
+      return self.ids[index * GUID_BYTES:(index + 1) * GUID_BYTES].hex()
+    return self.ids[index]
+
+  def __len__(self):
+    if self.kind == "guid":
+      return len(self.ids) // GUID_BYTES
+    return len(self.ids)
+
+  def __iter__(self):
+    if self.kind == "decimal":
+      return map(str, self.ids)
+    if self.kind == "guid":
+      return (self.ids[i:i + GUID_BYTES].hex() for i in range(0, len(self.ids), GUID_BYTES))
+    return iter(self.ids)
+
+  def __eq__(self, other):
+    if not isinstance(other, Sequence) or isinstance(other, str):
+      return NotImplemented
+    return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+  __hash__ = None
+
+  def __repr__(self):
+    return "TrackIds(" + repr(list(self)) + ")"
+
+class TrackUris(Sequence):
+  """
+  Read-only list of stream URLs that are only built when they are read
+  """
+  __slots__ = ("track_ids", "get_song_file")
+
+  def __init__(self, track_ids, get_song_file):
+    self.track_ids = track_ids       # IDs of the tracks to play
+    self.get_song_file = get_song_file # builds the stream URL of one track ID
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self.get_song_file(track_id) for track_id in self.track_ids[index]]
+    return self.get_song_file(self.track_ids[index])
+
+  def __len__(self):
+    return len(self.track_ids)
+
+class Music_info(namedtuple("Music_info", ["match_type", "mesg_file", "mesg_info", "track_ids", "get_song_file", "entity",
+                                           "exact"], defaults=(None, None, True))):
+  """
+  Result of a music request, immutable - use _replace() to change a field
+  match_type:    album, artist or song
+  mesg_file:     if mycroft has to speak first
+  mesg_info:     values to plug in
+  track_ids:     IDs of tracks to play
+  get_song_file: builds the stream URL of one track ID
+  entity:        dict of type, id, name and artist_name of what was matched when the tracks are fetched later
+  exact:         False if the music was found under a name that only sounds like the one asked for
+  """
+  __slots__ = ()
+
+  @property
+  def track_uris(self):
+    """
+    URIs to play, built from track_ids as they are read; None if no music was found
+    """
+    if self.track_ids is None:
+      return None
+    return TrackUris(self.track_ids, self.get_song_file)
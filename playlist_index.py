@@ -0,0 +1,57 @@
+import threading
+
+
+class PlaylistIndex(object):
+    """
+    Which items a playlist holds, and under which playlist entry IDs
+    An item can be in a playlist more than once, each time with its own entry ID
+    """
+
+    def __init__(self, items=()):
+        """
+        :param items: playlist entries with Id and PlaylistItemId, as returned by /Playlists/{id}/Items
+        """
+        self.entries = {}                  # item ID -> list of entry IDs, None where not known yet
+        self.lock = threading.Lock()       # shared by the intent threads
+        for item in items:
+            self.entries.setdefault(item["Id"], []).append(item.get("PlaylistItemId"))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, item_id):
+        return item_id in self.entries
+
+    def item_ids(self):
+        with self.lock:
+            return list(self.entries)
+
+    def entry_ids(self, item_ids):
+        """
+        Return the entry IDs of the items that are in the playlist,
+        or None if one of them was added without learning its entry ID
+        """
+        found = []
+        with self.lock:
+            for item_id in item_ids:
+                for entry_id in self.entries.get(item_id, ()):
+                    if entry_id is None:
+                        return None
+                    found.append(entry_id)
+        return found
+
+    def added(self, item_ids):
+        """
+        Record items added to the playlist; the server does not return their entry IDs
+        """
+        with self.lock:
+            for item_id in item_ids:
+                self.entries.setdefault(item_id, []).append(None)
+
+    def removed(self, item_ids):
+        """
+        Record items whose entries were all removed from the playlist
+        """
+        with self.lock:
+            for item_id in item_ids:
+                self.entries.pop(item_id, None)
@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache(object):
+    """
+    Size-bounded LRU cache of server responses whose entries expire after a fixed time
+    """
+
+    def __init__(self, max_size, ttl):
+        """
+        :param max_size: number of entries kept, the least recently used go first
+        :param ttl: seconds an entry stays valid
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()       # key -> (expiry time, value)
+        self.lock = threading.Lock()       # shared by the intent and resolver threads
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, stale=False):
+        """
+        Return the cached value of key, or default if it is missing or expired
+        :param stale: return expired values too, e.g. while the server cannot be asked
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (entry[0] < time.monotonic() and not stale):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if self.max_size <= 0 or self.ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, match=None):
+        """
+        Drop the entries whose key satisfies match(key), or all entries
+        :return: number of entries dropped
+        """
+        with self.lock:
+            if match is None:
+                num_keys = len(self.entries)
+                self.entries.clear()
+                return num_keys
+            keys = [key for key in self.entries if match(key)]
+            for key in keys:
+                del self.entries[key]
+        return len(keys)
+
+    def stats(self):
+        with self.lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self.entries)}
@@ -0,0 +1,109 @@
+import logging
+import re
+
+# credentials that must never reach a log: query parameters, headers and JSON fields
+SECRET = re.compile(r"((?:api_key|token|pw|password)[\"']?\s*[=:]\s*[\"']?)[^&\s\"',}]+",
+                    re.IGNORECASE)
+REDACTED = "***"
+
+
+def redact(text):
+    """
+    Return text with the values of tokens and passwords replaced by REDACTED
+    """
+    return SECRET.sub(r"\g<1>" + REDACTED, text)
+
+
+class RedactingFilter(logging.Filter):
+    """
+    Redact the message of every record passed on by a logger
+    Filters only run for records that are emitted, so the message is still only formatted when needed
+    """
+
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        return True
+
+
+REDACTING_FILTER = RedactingFilter()
+
+
+def redact_logger(name):
+    """
+    Redact the records of the named logger, e.g. urllib3 which logs every URL it requests
+    """
+    logger = logging.getLogger(name)
+    if REDACTING_FILTER not in logger.filters:
+        logger.addFilter(REDACTING_FILTER)
+    return logger
+
+
+class LazyMessage(object):
+    """
+    A log message and its key=value fields, only formatted if a handler writes it
+    """
+    __slots__ = ("msg", "args", "fields")
+
+    def __init__(self, msg, args, fields):
+        self.msg = msg
+        self.args = args
+        self.fields = fields
+
+    def __str__(self):
+        text = self.msg % self.args if self.args else self.msg
+        if self.fields:
+            text += " " + " ".join("{0}={1}".format(name, value) for name, value in self.fields.items())
+        return text
+
+
+class StructuredLog(object):
+    """
+    Logger for the request paths: messages are formatted lazily and redacted,
+    call sites that run for every track can be sampled, and quiet mode keeps
+    only warnings and the timings and counts logged with timing()
+    """
+    quiet = False                          # shared by all loggers, set from the skill settings
+
+    def __init__(self, name):
+        self.logger = redact_logger(name)
+        self.calls = {}                    # call site (message format) -> number of calls
+
+    @classmethod
+    def set_quiet(cls, quiet):
+        cls.quiet = bool(quiet)
+
+    def log(self, level, msg, *args, sample=1, **fields):
+        """
+        Log msg % args with fields appended as key=value
+        :param sample: only log every sample-th call of this call site
+        """
+        if level < logging.WARNING and StructuredLog.quiet:
+            return
+        if not self.logger.isEnabledFor(level):
+            return
+        if sample > 1:                     # counted without a lock, so sampling is approximate across threads
+            count = self.calls.get(msg, 0)
+            self.calls[msg] = count + 1
+            if count % sample:
+                return
+        self.logger.log(level, LazyMessage(msg, args, fields))
+
+    def debug(self, msg, *args, **fields):
+        self.log(logging.DEBUG, msg, *args, **fields)
+
+    def info(self, msg, *args, **fields):
+        self.log(logging.INFO, msg, *args, **fields)
+
+    def warning(self, msg, *args, **fields):
+        self.log(logging.WARNING, msg, *args, **fields)
+
+    def error(self, msg, *args, **fields):
+        self.log(logging.ERROR, msg, *args, **fields)
+
+    def timing(self, msg, *args, **fields):
+        """
+        Log a timing or count at INFO, also in quiet mode
+        """
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.log(logging.INFO, LazyMessage(msg, args, fields))
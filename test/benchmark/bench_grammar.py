@@ -0,0 +1,38 @@
+"""
+Micro-benchmark of the music grammar over the phrases in test/unit/common_phrases.json
+Run from the skill directory: python test/benchmark/bench_grammar.py
+"""
+import json
+import os
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from music_grammar import parse_play, parse_playlist_command
+
+PHRASES_FILE = os.path.join(ROOT, "test", "unit", "common_phrases.json")
+PLAYLIST_PHRASES = [("create", "road trip from song the skeptic"),
+                    ("add", "album the skeptic to playlist road trip"),
+                    ("delete", "track stitch from playlist road trip")]
+NUMBER = 20000
+REPEAT = 5
+
+
+def bench(name, func):
+    best = min(timeit.repeat(func, number=NUMBER, repeat=REPEAT)) / NUMBER
+    print("%-20s %8.2f us per pass" % (name, best * 1e6))
+
+
+def main():
+    with open(PHRASES_FILE) as phrases_file:
+        phrases = [phrase.lower() for phrase in json.load(phrases_file)]
+    print("%d play phrases, %d playlist phrases, best of %d x %d passes" %
+          (len(phrases), len(PLAYLIST_PHRASES), REPEAT, NUMBER))
+    bench("parse_play", lambda: [parse_play(phrase) for phrase in phrases])
+    bench("parse_playlist", lambda: [parse_playlist_command(command, phrase) for command, phrase in PLAYLIST_PHRASES])
+
+
+if __name__ == "__main__":
+    main()
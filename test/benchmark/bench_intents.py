@@ -0,0 +1,118 @@
+"""
+End-to-end benchmark of the skill's intents against a local fake Emby server
+Reports wall time, HTTP requests and bytes transferred per intent type and library size
+Run from the skill directory:
+  python test/benchmark/bench_intents.py --tracks 1000 100000 --json after.json --compare before.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from emby_croft import EmbyCroft
+from fake_emby import FakeLibrary, FakeEmbyServer
+
+# intent type -> (EmbyCroft method, utterance), seeded names from fake_emby.SEED_ALBUMS
+INTENTS = [
+    ("album", "parse_common_phrase", "album deadweight"),
+    ("artist", "parse_common_phrase", "artist wage war"),
+    ("track", "parse_common_phrase", "track two years"),
+    ("unknown", "parse_common_phrase", "the skeptic"),
+    ("playlist", "parse_common_phrase", "playlist workout"),
+    ("random", "parse_common_phrase", "random music"),
+    ("genre", "parse_common_phrase", "genre ghosts"),
+    ("playlist add", "manipulate_playlists", "add track stitch to playlist road trip"),
+    ("playlist remove", "manipulate_playlists", "remove track stitch from playlist road trip"),
+]
+
+
+def run_intents(server, croft, repeat):
+    """
+    Run every intent repeat times; the first run is cold, the rest hit whatever the client cached
+    """
+    results = {}
+    for intent_type, method, utterance in INTENTS:
+        runs = []
+        for _ in range(repeat):
+            before = server.stats()
+            start = time.perf_counter()
+            getattr(croft, method)(utterance)
+            elapsed = time.perf_counter() - start
+            after = server.stats()
+            runs.append((elapsed, after["requests"] - before["requests"], after["bytes"] - before["bytes"]))
+        warm = runs[1:] or runs
+        results[intent_type] = {
+            "cold_ms": round(runs[0][0] * 1000, 2),
+            "cold_requests": runs[0][1],
+            "cold_bytes": runs[0][2],
+            "warm_ms": round(statistics.median(run[0] for run in warm) * 1000, 2),
+            "warm_requests": statistics.median(run[1] for run in warm),
+            "warm_bytes": statistics.median(run[2] for run in warm),
+        }
+    return results
+
+
+def bench_library(num_tracks, repeat, use_index):
+    library = FakeLibrary(num_tracks)
+    server = FakeEmbyServer(library).start()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index_file = os.path.join(tmp_dir, "library.db") if use_index else None
+        try:
+            croft = EmbyCroft(server.url, "user", "password", index_file=index_file)
+            if use_index:
+                start = time.perf_counter()
+                croft.refresh_index()
+                print("%d tracks: indexed in %.1f s" % (num_tracks, time.perf_counter() - start))
+            results = run_intents(server, croft, repeat)
+            croft.client.close()
+        finally:
+            server.stop()
+    return results
+
+
+def print_report(report, baseline=None):
+    columns = ("cold_ms", "cold_requests", "cold_bytes", "warm_ms", "warm_requests", "warm_bytes")
+    print("%-9s %-16s" % ("tracks", "intent") + "".join("%14s" % column for column in columns))
+    for num_tracks, results in report.items():
+        for intent_type, result in results.items():
+            cells = []
+            for column in columns:
+                cell = "%g" % result[column]
+                old = (baseline or {}).get(num_tracks, {}).get(intent_type, {}).get(column)
+                if old:                    # change against the baseline run
+                    cell += " %+d%%" % round(100.0 * (result[column] - old) / old)
+                cells.append("%14s" % cell)
+            print("%-9s %-16s" % (num_tracks, intent_type) + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, nargs="+", default=[1000, 10000], help="library sizes")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per intent")
+    parser.add_argument("--index", action="store_true", help="sync a local library index first")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--compare", help="show changes against a report written with --json")
+    args = parser.parse_args()
+
+    report = {}
+    for num_tracks in args.tracks:
+        report[str(num_tracks)] = bench_library(num_tracks, args.repeat, args.index)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+    print_report(report, baseline)
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Decode time of Items responses from 1 MB to 50 MB, the size of a full library listing
+The payloads are built from the recorded track items of the test fixtures, with every field as
+a query without a projection returns them, and decoded with response.json() as the client did,
+with json_codec.decode() and with each decoder installed; gzip shows the compressed size and
+the time to inflate it (generated items repeat the fixture's fields, so they compress better than a real library)
+Run from the skill directory: python test/benchmark/bench_json.py --sizes 1,5,10,25,50
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import requests
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import json_codec
+from fake_emby import FakeLibrary, GZIP_LEVEL
+
+MB = 1000000
+
+
+def items_payload(library, size):
+    """
+    Return the JSON bytes of an Items response of at least size bytes, cycling through the library's tracks
+    """
+    items = []
+    total = 0
+    while total < size:
+        item = library.track_item(len(items) % len(library.track_names))
+        items.append(item)
+        total += len(json.dumps(item)) + 1
+    return json.dumps({"Items": items, "TotalRecordCount": len(items)}).encode(), len(items)
+
+
+def as_response(data):
+    response = requests.models.Response()
+    response._content = data
+    response.status_code = 200
+    return response
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(best * 1000, 1)
+
+
+def decoders():
+    """
+    Return (name, loads) of the standard library and every optional decoder that is installed
+    """
+    found = [("json.loads", json.loads)]
+    for module_name in ("ujson", "orjson"):
+        try:
+            found.append((module_name + ".loads", __import__(module_name).loads))
+        except ImportError:
+            pass
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1,5,10,25,50", help="payload sizes in MB")
+    parser.add_argument("--tracks", type=int, default=10000, help="library size the items are taken from")
+    parser.add_argument("--repeat", type=int, default=3, help="runs of each decode")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    library = FakeLibrary(args.tracks)
+    report = {}
+    print("json_codec uses " + json_codec.DECODER)
+    print("%6s %8s %10s %10s %-16s %10s" % ("MB", "items", "gzip MB", "inflate ms", "decoder", "ms"))
+    for size in [float(size) for size in args.sizes.split(",")]:
+        data, num_items = items_payload(library, int(size * MB))
+        compressed = gzip.compress(data, GZIP_LEVEL)
+        rows = {"response.json()": best_time(lambda: as_response(data).json(), args.repeat),
+                "json_codec.decode": best_time(lambda: json_codec.decode(as_response(data)), args.repeat)}
+        for name, loads in decoders():
+            rows[name] = best_time(lambda: loads(data), args.repeat)
+        inflate_ms = best_time(lambda: gzip.decompress(compressed), args.repeat)
+        report[str(size)] = {"bytes": len(data), "items": num_items, "gzip_bytes": len(compressed),
+                             "inflate_ms": inflate_ms, "decode_ms": rows}
+        for i, (name, ms) in enumerate(rows.items()):
+            if i == 0:
+                print("%6g %8d %10.2f %10g %-16s %10g" % (size, num_items, len(compressed) / MB, inflate_ms, name, ms))
+            else:
+                print("%6s %8s %10s %10s %-16s %10g" % ("", "", "", "", name, ms))
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cost of the client's logging per intent, against a local fake Emby server
+Runs every intent with logging off (WARNING), at INFO, at INFO in quiet mode and at DEBUG,
+writing to a file as Mycroft does, and reports the time per intent and the bytes logged
+Run from the skill directory: python test/benchmark/bench_logging.py --tracks 10000
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bench_intents import INTENTS
+from emby_croft import EmbyCroft
+from fake_emby import FakeLibrary, FakeEmbyServer
+from structured_log import StructuredLog
+
+# mode -> (level of the skill's loggers, quiet)
+MODES = [
+    ("off", logging.WARNING, False),
+    ("info", logging.INFO, False),
+    ("quiet", logging.INFO, True),
+    ("debug", logging.DEBUG, False),
+]
+LOGGERS = ["emby_client", "emby_croft", "library_index", "metrics", "urllib3"]
+
+
+def configure(log_file, level, quiet):
+    handler = logging.FileHandler(log_file)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+    for name in LOGGERS:
+        logger = logging.getLogger(name)
+        logger.handlers[:] = [handler]
+        logger.setLevel(level)
+        logger.propagate = False
+    StructuredLog.set_quiet(quiet)
+    return handler
+
+
+def bench_mode(croft, log_file, level, quiet, repeat):
+    handler = configure(log_file, level, quiet)
+    results = {}
+    try:
+        for intent_type, method, utterance in INTENTS:
+            runs = []
+            for _ in range(repeat):
+                before = os.path.getsize(log_file)
+                start = time.perf_counter()
+                with croft.client.metrics.intent(intent_type):
+                    getattr(croft, method)(utterance)
+                elapsed = time.perf_counter() - start
+                handler.flush()
+                runs.append((elapsed, os.path.getsize(log_file) - before))
+            results[intent_type] = {
+                "ms": round(statistics.median(run[0] for run in runs) * 1000, 3),
+                "log_bytes": statistics.median(run[1] for run in runs),
+            }
+    finally:
+        handler.close()
+        StructuredLog.set_quiet(False)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000, help="library size")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per intent")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    server = FakeEmbyServer(FakeLibrary(args.tracks)).start()
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        try:
+            croft = EmbyCroft(server.url, "user", "password")
+            for mode, level, quiet in MODES:
+                report[mode] = bench_mode(croft, os.path.join(tmp_dir, mode + ".log"), level, quiet, args.repeat)
+            croft.client.close()
+        finally:
+            server.stop()
+
+    print("%-16s" % "intent" + "".join("%12s ms %10s B" % (mode, mode) for mode, _, _ in MODES))
+    for intent_type, _, _ in INTENTS:
+        print("%-16s" % intent_type + "".join("%15g %12g" % (report[mode][intent_type]["ms"],
+                                                             report[mode][intent_type]["log_bytes"])
+                                              for mode, _, _ in MODES))
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Memory and throughput of the item records: EmbyMediaItem.from_list over 100k search results
+and TrackIds against a list of the same track IDs, each compared with the plain classes they replaced
+Run from the skill directory: python test/benchmark/bench_media_items.py --items 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from emby_client import EmbyMediaItem, MediaItemType
+from music_info import TrackIds
+
+TYPES = ["Audio", "MusicAlbum", "MusicArtist", "Playlist"]
+
+
+class PlainMediaItem(object):
+    """
+    EmbyMediaItem as it was: an instance dict per item and a linear scan of the enum per type
+    """
+
+    def __init__(self, id, name, type):
+        self.id = id
+        self.name = name
+        self.type = type
+
+    @staticmethod
+    def from_list(items):
+        media_items = []
+        for item in items:
+            media_item_type = MediaItemType.OTHER
+            for item_type in MediaItemType:
+                if item_type.value == item["Type"]:
+                    media_item_type = item_type
+                    break
+            media_items.append(PlainMediaItem(item["Id"], item["Name"], media_item_type))
+        return media_items
+
+
+def measure(build, repeat):
+    """
+    Return the best time of build() in ms and the memory held by its result in MB
+    """
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return round(best * 1000, 1), round(size / 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000, help="number of items")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of each measurement")
+    args = parser.parse_args()
+
+    items = [{"Id": str(1000000 + i), "Name": "Item %d" % i, "Type": TYPES[i % len(TYPES)]}
+             for i in range(args.items)]
+    decimal_ids = [item["Id"] for item in items]
+    guid_ids = ["%032x" % (i * 7919 + 1) for i in range(args.items)]
+
+    # the list rows build new strings, as decoding a response does, so their memory is counted
+    rows = [
+        ("PlainMediaItem.from_list", lambda: PlainMediaItem.from_list(items)),
+        ("EmbyMediaItem.from_list", lambda: EmbyMediaItem.from_list(items)),
+        ("list of decimal IDs", lambda: [str(int(track_id)) for track_id in decimal_ids]),
+        ("TrackIds of decimal IDs", lambda: TrackIds(decimal_ids)),
+        ("list of GUIDs", lambda: [track_id.upper().lower() for track_id in guid_ids]),
+        ("TrackIds of GUIDs", lambda: TrackIds(guid_ids)),
+    ]
+    print("%d items" % args.items)
+    print("%-26s %12s %12s" % ("", "ms", "MB held"))
+    for name, build in rows:
+        print("%-26s %12g %12g" % ((name,) + measure(build, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Bytes saved per endpoint by the field projection of EmbyClient.items_url()
+Runs every intent of bench_intents against a local fake Emby server twice, with the projected
+queries and with the same queries asking for the full payload (no Fields, images and user data),
+and reports the response bytes of each endpoint from the client's metrics
+Run from the skill directory: python test/benchmark/bench_payloads.py --tracks 10000
+"""
+import argparse
+import json
+import os
+import sys
+import urllib.parse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(__file__))
+
+import emby_client
+from bench_intents import INTENTS
+from emby_croft import EmbyCroft
+from fake_emby import FakeLibrary, FakeEmbyServer
+from metrics import Metrics
+
+
+def full_payload_url(client, url, fields=(), limit=None, **params):
+    """
+    items_url() without the projection: the same query and limit, every field
+    """
+    if limit is not None:
+        params["Limit"] = limit
+    params[emby_client.API_KEY[:-1]] = client.auth.token
+    separator = "&" if "?" in url else "?"
+    return url + separator + urllib.parse.urlencode(params, safe=",", quote_via=urllib.parse.quote)
+
+
+def bytes_per_endpoint(server, repeat):
+    """
+    Run the intents on a fresh client and return {"METHOD endpoint": response bytes}
+    """
+    metrics = Metrics()
+    croft = EmbyCroft(server.url, "user", "password", metrics=metrics)
+    try:
+        for _ in range(repeat):
+            for intent_type, method, utterance in INTENTS:
+                with metrics.intent(intent_type):
+                    getattr(croft, method)(utterance)
+    finally:
+        croft.client.close()
+    endpoints = {}
+    for call in metrics.snapshot()["calls"]:
+        key = call["method"] + " " + call["endpoint"]
+        endpoints[key] = endpoints.get(key, 0) + call["bytes"]
+    return endpoints
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10000, help="library size")
+    parser.add_argument("--repeat", type=int, default=1, help="runs of every intent")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args()
+
+    server = FakeEmbyServer(FakeLibrary(args.tracks)).start()
+    try:
+        projected = bytes_per_endpoint(server, args.repeat)
+        items_url = emby_client.EmbyClient.items_url
+        emby_client.EmbyClient.items_url = full_payload_url
+        try:
+            full = bytes_per_endpoint(server, args.repeat)
+        finally:
+            emby_client.EmbyClient.items_url = items_url
+    finally:
+        server.stop()
+
+    report = {}
+    print("%-44s %12s %12s %8s" % ("endpoint", "full B", "projected B", "saved"))
+    for endpoint in sorted(set(full) | set(projected)):
+        before, after = full.get(endpoint, 0), projected.get(endpoint, 0)
+        saved = round(100.0 * (before - after) / before) if before else 0
+        report[endpoint] = {"full_bytes": before, "projected_bytes": after, "saved_percent": saved}
+        print("%-44s %12d %12d %7d%%" % (endpoint, before, after, saved))
+    if args.json:
+        with open(args.json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Startup benchmark: import time of the skill's modules and the time to the first intent
+Each measurement runs in a fresh interpreter, as when Mycroft loads the skill
+Run from the skill directory: python test/benchmark/bench_startup.py
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+BENCH = os.path.dirname(os.path.abspath(__file__))
+
+IMPORT_CODE = """
+import sys, time
+sys.path.insert(0, %r)
+start = time.perf_counter()
+import %s
+print((time.perf_counter() - start) * 1000)
+"""
+
+FIRST_INTENT_CODE = """
+import json, sys, time
+sys.path[:0] = [%r, %r]
+from fake_emby import FakeLibrary, FakeEmbyServer
+server = FakeEmbyServer(FakeLibrary(1000)).start()
+start = time.perf_counter()
+from emby_croft import EmbyCroft
+imported = time.perf_counter()
+croft = EmbyCroft(server.url, "user", "password")
+connected = time.perf_counter()
+croft.parse_common_phrase("album deadweight")
+done = time.perf_counter()
+print(json.dumps({"import_ms": (imported - start) * 1000, "connect_ms": (connected - imported) * 1000,
+                  "first_intent_ms": (done - connected) * 1000}))
+"""
+
+
+def run(code):
+    return subprocess.check_output([sys.executable, "-c", code], cwd=ROOT).decode().strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per measurement")
+    args = parser.parse_args()
+
+    for module in ("music_info", "metrics", "emby_croft"):
+        times = [float(run(IMPORT_CODE % (ROOT, module))) for _ in range(args.repeat)]
+        print("import %-26s %8.1f ms" % (module, statistics.median(times)))
+    runs = [json.loads(run(FIRST_INTENT_CODE % (ROOT, BENCH))) for _ in range(args.repeat)]
+    for key in ("import_ms", "connect_ms", "first_intent_ms"):
+        print("%-33s %8.1f ms" % (key, statistics.median(result[key] for result in runs)))
+
+
+if __name__ == "__main__":
+    main()
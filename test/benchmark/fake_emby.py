@@ -0,0 +1,383 @@
+"""
+Local stand-in for an Emby server, for benchmarks
+The item shapes and the seed names come from test/unit/test_responses.json;
+the rest of the library is generated, from a thousand to a million tracks
+Only the endpoints the skill calls are served, and only playlist entry deletes change anything
+"""
+import copy
+import gzip
+import json
+import os
+import random
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+RESPONSES_FILE = os.path.join(os.path.dirname(__file__), "..", "unit", "test_responses.json")
+TRACKS_PER_ALBUM = 10
+ALBUMS_PER_ARTIST = 5
+NUM_GENRES = 20
+WORDS = ["afraid", "years", "wind", "shifts", "mind", "games", "dance", "war", "wage", "star", "explode",
+         "deadweight", "skeptic", "rather", "see", "your", "night", "fire", "river", "ghost", "summer",
+         "stone", "electric", "paper", "heart", "city", "silver", "ocean", "broken", "golden", "shadow",
+         "winter", "wild", "echo", "empire", "glass", "thunder", "velvet", "neon", "hollow"]
+# (artist, album, tracks) that benchmarks can ask for by name
+SEED_ALBUMS = [
+    ("Dance Gavin Dance", "Mothership", ["Chucky vs. The Giant Tortoise", "Young Robot"]),
+    ("Wage War", "Deadweight", ["Two Years", "Stitch", "Witness"]),
+    ("Palisades", "Mind Games", ["Afraid", "Mind Games"]),
+    ("Thrice", "The Skeptic", ["I'd Rather See Your Star Explode", "Deadweight"]),
+]
+SEED_PLAYLISTS = ["Workout", "Road Trip", "Xmas Music"]
+PLAYLIST_SIZE = 50
+GZIP_LEVEL = 5                             # bodies are compressed on the fly, so not at the slowest level
+# fields of the recorded items only returned when a query has no Fields or asks for them,
+# and those dropped by EnableImages=false and EnableUserData=false
+OPTIONAL_FIELDS = frozenset(["Genres", "GenreItems", "PrimaryImageAspectRatio"])
+IMAGE_FIELDS = frozenset(["ImageTags", "BackdropImageTags", "AlbumPrimaryImageTag", "PrimaryImageTag",
+                          "BackdropImageTag", "BackdropImageItemId"])
+
+
+def project(item, params):
+    """
+    Return item with only the fields an item query asked for
+    """
+    dropped = set()
+    if "fields" in params:
+        dropped.update(OPTIONAL_FIELDS.difference(params["fields"].split(",")))
+    if params.get("enableimages", "").lower() == "false":
+        dropped.update(IMAGE_FIELDS)
+    if params.get("enableuserdata", "").lower() == "false":
+        dropped.add("UserData")
+    return {name: value for name, value in item.items() if name not in dropped}
+
+
+def load_templates():
+    """
+    Return one Emby item dict per item type, taken from the recorded responses
+    """
+    with open(RESPONSES_FILE) as responses_file:
+        responses = json.load(responses_file)["emby"]["3.5.2.0"]
+    track = responses["get_songs_response"]["Items"][0]
+    album = responses["album_search"]["search_response"]["SearchHints"][0]
+    artist = responses["artist_search"]["search_response"]["SearchHints"][0]
+    return responses["auth_server_response"], track, album, artist
+
+
+class FakeLibrary(object):
+    """
+    Generated music library, stored as parallel lists so a million tracks fit in memory
+    Item dicts are only built when they are served
+    """
+
+    def __init__(self, num_tracks, seed=0):
+        self.auth, self.track_template, self.album_template, self.artist_template = load_templates()
+        rand = random.Random(seed)
+        self.artist_names = []
+        self.artist_index = {}             # artist name -> artist index
+        self.album_names = []
+        self.album_artist = []             # album index -> artist index
+        self.album_first = []              # album index -> index of its first track
+        self.track_names = []
+        self.track_album = []              # track index -> album index
+        for artist_name, album_name, track_names in SEED_ALBUMS:
+            self._add_album(artist_name, album_name, track_names)
+        while len(self.track_names) < num_tracks:
+            artist_name = " ".join(rand.sample(WORDS, 2)).title()
+            for _ in range(ALBUMS_PER_ARTIST):
+                tracks = [" ".join(rand.sample(WORDS, rand.randint(1, 3))).title()
+                          for _ in range(TRACKS_PER_ALBUM)]
+                self._add_album(artist_name, " ".join(rand.sample(WORDS, 2)).title(), tracks)
+        del self.track_names[num_tracks:]
+        del self.track_album[num_tracks:]
+        self.genre_names = [word.title() for word in WORDS[:NUM_GENRES]]
+        self.lower = {"artist": [name.lower() for name in self.artist_names],
+                      "album": [name.lower() for name in self.album_names],
+                      "track": [name.lower() for name in self.track_names],
+                      "genre": [name.lower() for name in self.genre_names]}
+        self.playlists = {}                # playlist ID -> {"name": ..., "entries": [(entry ID, track index)]}
+        self.next_entry = 0
+        self.lock = threading.Lock()
+        for playlist_name in SEED_PLAYLISTS:
+            self.create_playlist(playlist_name, [self.track_id(i) for i in rand.sample(
+                range(len(self.track_names)), min(PLAYLIST_SIZE, len(self.track_names)))])
+
+    def _add_album(self, artist_name, album_name, track_names):
+        artist = self.artist_index.get(artist_name)
+        if artist is None:
+            artist = self.artist_index[artist_name] = len(self.artist_names)
+            self.artist_names.append(artist_name)
+        self.album_artist.append(artist)
+        self.album_first.append(len(self.track_names))
+        self.album_names.append(album_name)
+        for track_name in track_names:
+            self.track_names.append(track_name)
+            self.track_album.append(len(self.album_names) - 1)
+
+    # IDs carry the item kind in their first character and are 32 characters long like Emby's
+    @staticmethod
+    def track_id(index):
+        return "1" + format(index, "031x")
+
+    @staticmethod
+    def album_id(index):
+        return "2" + format(index, "031x")
+
+    @staticmethod
+    def artist_id(index):
+        return "3" + format(index, "031x")
+
+    @staticmethod
+    def genre_id(index):
+        return "4" + format(index, "031x")
+
+    @staticmethod
+    def parse_id(item_id):
+        return item_id[0], int(item_id[1:], 16)
+
+    def track_item(self, index, entry_id=None):
+        album = self.track_album[index]
+        artist = self.album_artist[album]
+        genre = album % NUM_GENRES
+        item = copy.deepcopy(self.track_template)
+        artist_ref = [{"Name": self.artist_names[artist], "Id": self.artist_id(artist)}]
+        item.update({"Name": self.track_names[index], "Id": self.track_id(index),
+                     "IndexNumber": index - self.album_first[album] + 1,
+                     "Album": self.album_names[album], "AlbumId": self.album_id(album),
+                     "AlbumArtist": self.artist_names[artist], "Artists": [self.artist_names[artist]],
+                     "ArtistItems": artist_ref, "AlbumArtists": artist_ref,
+                     "Genres": [self.genre_names[genre]],
+                     "GenreItems": [{"Name": self.genre_names[genre], "Id": self.genre_id(genre)}]})
+        if entry_id is not None:
+            item["PlaylistItemId"] = entry_id
+        return item
+
+    def album_item(self, index):
+        artist = self.album_artist[index]
+        item = copy.deepcopy(self.album_template)
+        item.update({"Name": self.album_names[index], "Id": self.album_id(index), "ItemId": self.album_id(index),
+                     "AlbumArtist": self.artist_names[artist], "Artists": [self.artist_names[artist]],
+                     "AlbumArtists": [{"Name": self.artist_names[artist], "Id": self.artist_id(artist)}]})
+        return item
+
+    def artist_item(self, index):
+        item = copy.deepcopy(self.artist_template)
+        item.update({"Name": self.artist_names[index], "Id": self.artist_id(index), "ItemId": self.artist_id(index)})
+        return item
+
+    def genre_item(self, index):
+        return {"Name": self.genre_names[index], "Id": self.genre_id(index), "Type": "MusicGenre"}
+
+    def playlist_item(self, playlist_id):
+        return {"Name": self.playlists[playlist_id]["name"], "Id": playlist_id, "Type": "Playlist",
+                "ChildCount": len(self.playlists[playlist_id]["entries"])}
+
+    def create_playlist(self, name, track_ids):
+        with self.lock:
+            playlist_id = "5" + format(len(self.playlists), "031x")
+            self.playlists[playlist_id] = {"name": name, "entries": []}
+        self.add_to_playlist(playlist_id, track_ids)
+        return playlist_id
+
+    def add_to_playlist(self, playlist_id, track_ids):
+        with self.lock:
+            for track_id in track_ids:
+                self.next_entry += 1
+                self.playlists[playlist_id]["entries"].append(
+                    (format(self.next_entry, "x"), self.parse_id(track_id)[1]))
+
+    def remove_from_playlist(self, playlist_id, entry_ids):
+        with self.lock:
+            entry_ids = set(entry_ids)
+            playlist = self.playlists[playlist_id]
+            playlist["entries"] = [entry for entry in playlist["entries"] if entry[0] not in entry_ids]
+
+    def matching(self, kind, searchterm):
+        """
+        Return the indexes of the items of one kind whose name contains searchterm
+        """
+        if searchterm is None:
+            return range(len(self.lower[kind]))
+        searchterm = searchterm.lower()
+        return [i for i, name in enumerate(self.lower[kind]) if searchterm in name]
+
+    def items(self, params):
+        """
+        Return the items of an /Items query as a lazy list of (kind, index) pairs
+        """
+        include = params.get("includeitemtypes", "Audio,MusicAlbum,MusicArtist,Playlist").split(",")
+        searchterm = params.get("searchterm")
+        found = []
+        if "parentid" in params:           # album or playlist contents
+            kind, index = self.parse_id(params["parentid"])
+            if kind == "2":                # an album's tracks are stored together
+                end = self.album_first[index + 1] if index + 1 < len(self.album_first) else len(self.track_names)
+                found = [("track", i) for i in range(self.album_first[index], min(end, len(self.track_names)))]
+            elif params["parentid"] in self.playlists:
+                found = [("entry", entry) for entry in self.playlists[params["parentid"]]["entries"]]
+            return found
+        if "artistids" in params:
+            artist = self.parse_id(params["artistids"])[1]
+            albums = {i for i, album_artist in enumerate(self.album_artist) if album_artist == artist}
+            return [("track", i) for i, album in enumerate(self.track_album) if album in albums]
+        if "genreids" in params:
+            genre = self.parse_id(params["genreids"])[1]
+            return [("track", i) for i, album in enumerate(self.track_album) if album % NUM_GENRES == genre]
+        if "MusicArtist" in include:
+            found += [("artist", i) for i in self.matching("artist", searchterm)]
+        if "MusicAlbum" in include:
+            found += [("album", i) for i in self.matching("album", searchterm)]
+        if "Audio" in include:
+            found += [("track", i) for i in self.matching("track", searchterm)]
+        if "Playlist" in include:
+            found += [("playlist", playlist_id) for playlist_id, playlist in self.playlists.items()
+                      if searchterm is None or searchterm.lower() in playlist["name"].lower()]
+        return found
+
+    def render(self, kind, key):
+        if kind == "track":
+            return self.track_item(key)
+        if kind == "entry":
+            return self.track_item(key[1], key[0])
+        if kind == "album":
+            return self.album_item(key)
+        if kind == "artist":
+            return self.artist_item(key)
+        if kind == "genre":
+            return self.genre_item(key)
+        return self.playlist_item(key)
+
+
+class FakeEmbyServer(ThreadingHTTPServer):
+    """
+    HTTP server answering Emby API calls from a FakeLibrary and counting what it transfers
+    Like Emby, it gzips responses for clients that accept it, unless compress is False
+    """
+    daemon_threads = True
+
+    def __init__(self, library, port=0, compress=True):
+        super().__init__(("127.0.0.1", port), FakeEmbyHandler)
+        self.library = library
+        self.compress = compress
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:" + str(self.server_address[1])
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def stats(self):
+        with self.stats_lock:
+            return {"requests": self.requests, "bytes": self.bytes_in + self.bytes_out}
+
+    def count(self, bytes_in, bytes_out):
+        with self.stats_lock:
+            self.requests += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+
+class FakeEmbyHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"          # keep-alive, like the real server
+    disable_nagle_algorithm = True         # headers and body go out in separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def _route(self):
+        parts = urllib.parse.urlsplit(self.path)
+        path = parts.path.lower().rstrip("/")
+        if path.startswith("/emby/"):
+            path = path[len("/emby"):]
+        params = {name.lower(): value for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        return path, params, body
+
+    def _reply(self, status, payload, bytes_in):
+        data = b"" if payload is None else json.dumps(payload).encode()
+        gzipped = data and self.server.compress and "gzip" in self.headers.get("Accept-Encoding", "")
+        if gzipped:
+            data = gzip.compress(data, GZIP_LEVEL)
+        self.server.count(bytes_in + len(self.requestline), len(data)) # before the client can see the reply
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _page(self, found, params):
+        library = self.server.library
+        if params.get("sortby", "").lower() == "random":
+            found = random.sample(found, len(found))
+        start = int(params.get("startindex", 0))
+        limit = int(params["limit"]) if "limit" in params else len(found)
+        items = [project(library.render(kind, key), params) for kind, key in found[start:start + limit]]
+        return {"Items": items, "TotalRecordCount": len(found)}
+
+    def do_GET(self):
+        path, params, body = self._route()
+        library = self.server.library
+        if path in ("/system/info", "/system/info/public"):
+            return self._reply(200, {"Version": "4.7.0.0", "ServerName": "fake"}, len(body))
+        if path == "/artists":
+            found = [("artist", i) for i in library.matching("artist", params.get("searchterm"))]
+            return self._reply(200, self._page(found, params), len(body))
+        if path == "/musicgenres":
+            found = [("genre", i) for i in library.matching("genre", params.get("searchterm"))]
+            return self._reply(200, self._page(found, params), len(body))
+        if path == "/items":
+            return self._reply(200, self._page(library.items(params), params), len(body))
+        if path.startswith("/playlists/") and path.endswith("/items"):
+            playlist_id = path.split("/")[2]
+            if playlist_id not in library.playlists:
+                return self._reply(404, None, len(body))
+            found = [("entry", entry) for entry in library.playlists[playlist_id]["entries"]]
+            return self._reply(200, self._page(found, params), len(body))
+        return self._reply(404, None, len(body))
+
+    def do_POST(self):
+        path, params, body = self._route()
+        library = self.server.library
+        payload = json.loads(body) if body else {}
+        if path == "/users/authenticatebyname":
+            return self._reply(200, library.auth, len(body))
+        ids = str(payload.get("Ids") or params.get("ids") or "")
+        track_ids = [track_id for track_id in ids.split(",") if track_id]
+        if path == "/playlists":
+            name = payload.get("Name") or params.get("name")
+            return self._reply(200, {"Id": library.create_playlist(name, track_ids)}, len(body))
+        if path.startswith("/playlists/") and path.endswith("/items"):
+            playlist_id = path.split("/")[2]
+            if playlist_id not in library.playlists:
+                return self._reply(404, None, len(body))
+            library.add_to_playlist(playlist_id, track_ids)
+            return self._reply(204, None, len(body))
+        return self._reply(404, None, len(body))
+
+    def do_DELETE(self):
+        path, params, body = self._route()
+        library = self.server.library
+        if path.startswith("/playlists/") and path.endswith("/items"):
+            playlist_id = path.split("/")[2]
+            if playlist_id not in library.playlists:
+                return self._reply(404, None, len(body))
+            library.remove_from_playlist(playlist_id, params.get("entryids", "").split(","))
+            return self._reply(204, None, len(body))
+        if path.startswith("/items/"):     # deleting whole items is not modelled
+            return self._reply(204, None, len(body))
+        return self._reply(404, None, len(body))
@@ -0,0 +1,58 @@
+import pytest
+from unittest import mock
+
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+
+
+def open_breaker(probe_result):
+    breaker = CircuitBreaker(threshold=2, delay=1, max_delay=4)
+    breaker.set_probe(lambda: probe_result)
+    breaker.failure()
+    breaker.failure()
+    return breaker
+
+
+class TestCircuitBreaker(object):
+
+    @pytest.mark.mocked
+    def test_opens_after_failures_in_a_row(self):
+        with mock.patch('threading.Timer'):
+            breaker = CircuitBreaker(threshold=2)
+            breaker.failure()
+            breaker.success()
+            breaker.failure()
+            breaker.check()
+
+            breaker.failure()
+
+            assert breaker.is_open()
+            with pytest.raises(CircuitOpenError):
+                breaker.check()
+
+    @pytest.mark.mocked
+    def test_probe_backs_off_then_closes(self):
+        with mock.patch('threading.Timer') as MockTimer:
+            breaker = open_breaker(False)
+            delays = [MockTimer.call_args[0][0]]
+            for _ in range(3):
+                breaker._run_probe()
+                delays.append(MockTimer.call_args[0][0])
+
+            assert [round(delay) for delay in delays] == [1, 2, 4, 4]
+            assert breaker.is_open()
+
+            breaker.set_probe(lambda: True)
+            breaker._run_probe()
+
+            assert not breaker.is_open()
+            assert MockTimer.call_count == 4
+            breaker.check()
+
+    @pytest.mark.mocked
+    def test_reset_stops_probing(self):
+        with mock.patch('threading.Timer') as MockTimer:
+            breaker = open_breaker(False)
+            breaker.reset()
+
+            assert not breaker.is_open()
+            MockTimer.return_value.cancel.assert_called_once()
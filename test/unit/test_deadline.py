@@ -0,0 +1,28 @@
+import contextvars
+
+import pytest
+
+from deadline import Deadline, within, remaining, unbounded
+
+
+class TestDeadline(object):
+
+    @pytest.mark.mocked
+    def test_earlier_deadline_wins(self):
+        assert remaining() is None
+        outer = Deadline(1)
+        with within(outer):
+            with within(Deadline(60)) as inner:
+                assert inner is outer
+            with within(Deadline(0.5)) as inner:
+                assert inner is not outer
+                assert remaining() <= 0.5
+            with within(None):
+                assert 0.5 < remaining() <= 1
+        assert remaining() is None
+
+    @pytest.mark.mocked
+    def test_unbounded_in_copied_context(self):
+        with within(Deadline(1)):
+            assert contextvars.copy_context().run(unbounded, remaining) is None
+            assert remaining() is not None
@@ -1,6 +1,13 @@
+import json
+import threading
+import time
 import pytest
+import requests
+from unittest import mock
 
-from emby_client import EmbyClient, PublicEmbyClient, MediaItemType, EmbyMediaItem
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline import Deadline, DeadlineExceeded
+from emby_client import EmbyClient, PublicEmbyClient, MediaItemType, EmbyMediaItem, MAX_TRACKS
 from emby_croft import EmbyCroft
 
 HOST = "http://emby:8096"
@@ -10,6 +17,104 @@ PASSWORD = ""
 
 class TestEmbyClient(object):
 
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_sync_library_incremental_mock(self):
+        client = mocked_client(index_file=":memory:")
+        client.index.upsert([{"Id": "1", "Type": "Audio", "Name": "Stitch"},
+                             {"Id": "2", "Type": "Audio", "Name": "Gone"}])
+        client.index.set_state("last_sync", "2022-10-01T00:00:00Z")
+
+        def server(url, **kwargs):
+            if "/emby/Items" not in url:   # artists and genres are unchanged and empty
+                return MockResponse(200, {"Items": [], "TotalRecordCount": 0})
+            if "MinDateLastSaved=2022-10-01T00:00:00Z" in url:
+                return MockResponse(200, {"Items": [{"Id": "3", "Type": "Audio", "Name": "New"}],
+                                          "TotalRecordCount": 1})
+            if "Limit=0" in url:
+                return MockResponse(200, {"Items": [], "TotalRecordCount": 2})
+            return MockResponse(200, {"Items": [{"Id": "1", "Type": "Audio", "Name": "Stitch"},
+                                                {"Id": "3", "Type": "Audio", "Name": "New"}],
+                                      "TotalRecordCount": 2})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = server
+            assert client.sync_library() == 2
+
+        assert client.index.ids(["Audio"]) == {"1", "3"}
+        assert client.index.get_state("last_sync") != "2022-10-01T00:00:00Z"
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_sync_library_skipped_when_busy_mock(self):
+        client = mocked_client(index_file=":memory:")
+        client.mark_active()
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            assert client.sync_library() == -1
+            assert not MockRequestsGet.called
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_close_stops_running_sync_mock(self):
+        client = mocked_client(index_file=":memory:")
+        fetching = threading.Event()
+        release = threading.Event()
+
+        def server(url, **kwargs):
+            fetching.set()
+            release.wait(5)                # a slow page, the sync holds the index meanwhile
+            return MockResponse(200, {"Items": [{"Id": "1", "Type": "Audio", "Name": "Stitch"}],
+                                      "TotalRecordCount": 2})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = server
+            synced = []
+            sync = threading.Thread(target=lambda: synced.append(client.sync_library(idle_only=False)))
+            sync.start()
+            assert fetching.wait(5)
+            closing = threading.Thread(target=client.close)
+            closing.start()
+            closing.join(0.2)
+            assert closing.is_alive()      # waits for the page being applied
+            release.set()
+            sync.join(5)
+            closing.join(5)
+
+        assert synced == [-1]
+        assert not closing.is_alive()
+        assert client.sync_library() == -1
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_all_music_random_sample_mock(self):
+        client = mocked_client()
+        items = [{"Id": str(i), "Type": "Audio", "Name": "track"} for i in range(MAX_TRACKS)]
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.return_value = MockResponse(200, {"Items": items, "TotalRecordCount": 5000})
+            music_info = client.get_all_music()
+
+            url = MockRequestsGet.call_args[0][0]
+            assert "SortBy=Random" in url and "Limit=" + str(MAX_TRACKS) in url
+            assert MockRequestsGet.call_count == 1
+            assert len(music_info.track_uris) == MAX_TRACKS
+            track_id = music_info.track_ids[0]
+            assert music_info.track_uris[0] == client.get_song_file(track_id)
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_all_music_falls_back_to_sampling_mock(self):
+        client = mocked_client()
+        items = [{"Id": str(i), "Type": "Audio" if i % 2 else "Folder", "Name": "item"} for i in range(1000)]
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(500, ""),
+                                           MockResponse(200, {"Items": items, "TotalRecordCount": 1000})]
+            music_info = client.get_all_music()
+
+            assert len(music_info.track_uris) == MAX_TRACKS
+
     @pytest.mark.client
     @pytest.mark.live
     def test_songs_by_artist(self):
@@ -80,3 +185,378 @@ class TestEmbyClient(object):
         assert server_info['ServerName'] is not None
         assert server_info['Version'] is not None
         assert server_info['Id'] is not None
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_iter_items_pages_mock(self):
+        client = mocked_client()
+        pages = [MockResponse(200, {"Items": [{"Id": str(i), "Type": "Audio", "Name": "t", "Path": "/x"}
+                                              for i in range(start, min(start + 2, 5))],
+                                    "TotalRecordCount": 5}) for start in range(0, 5, 2)]
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = pages
+            items = list(client.iter_items("/emby/Items?Recursive=true", page_size=2))
+
+            assert [item["Id"] for item in items] == ["0", "1", "2", "3", "4"]
+            assert "Path" not in items[0]
+            assert "StartIndex=4&Limit=2" in MockRequestsGet.call_args[0][0]
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_match_then_expand_album_mock(self):
+        client = mocked_client()
+        album_search = {"Items": [{"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic",
+                                   "Artists": ["Thrice"]}], "TotalRecordCount": 1}
+        album_tracks = {"Items": [{"Id": "t1", "Type": "Audio", "Name": "One", "Artists": ["Thrice"]},
+                                  {"Id": "t2", "Type": "Audio", "Name": "Two", "Artists": ["Thrice"]}],
+                        "TotalRecordCount": 2}
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(200, album_search), MockResponse(200, album_tracks)]
+            music_info = client.match_music("album the skeptic")
+
+            assert MockRequestsGet.call_count == 1
+            assert music_info.match_type == "album"
+            assert music_info.track_ids is None
+            assert music_info.entity["id"] == "a1"
+
+            music_info = client.expand_music(music_info)
+
+            assert MockRequestsGet.call_count == 2
+            assert music_info.track_ids == ["t1", "t2"]
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_unknown_music_resolved_in_parallel_mock(self):
+        client = mocked_client()
+        album = {"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic", "AlbumArtist": "Thrice"}
+        track = {"Id": "t9", "Type": "Audio", "Name": "The Skeptic Intro", "AlbumArtist": "Thrice", "Album": "Live"}
+        album_tracks = [{"Id": "t1", "Type": "Audio", "Name": "One", "Artists": ["Thrice"]},
+                        {"Id": "t2", "Type": "Audio", "Name": "Two", "Artists": ["Thrice"]}]
+
+        def get(url, **kwargs):
+            if "Artists?searchterm" in url:
+                return MockResponse(200, {"Items": []})
+            if "IncludeItemTypes=MusicAlbum" in url:
+                return MockResponse(200, {"Items": [album]})
+            if "IncludeItemTypes=Audio" in url:
+                return MockResponse(200, {"Items": [track]})
+            return MockResponse(200, {"Items": album_tracks})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = get
+            music_info = client.get_unknown_music("the skeptic", "unknown-artist")
+
+            assert MockRequestsGet.call_count == 4
+            assert music_info.match_type == "album"
+            assert music_info.track_ids == ["t1", "t2"]
+            assert client.speculative == {}
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_playlist_lookups_cached_mock(self):
+        client = mocked_client()
+        playlists = {"Items": [{"Id": "p1", "Type": "Playlist", "Name": "Workout"}], "TotalRecordCount": 1}
+        tracks = {"Items": [{"Id": "t1", "Type": "Audio", "Name": "One"}], "TotalRecordCount": 1}
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(200, playlists), MockResponse(200, tracks),
+                                           MockResponse(200, tracks)]
+            assert client.get_playlist_id("workout") == "p1"
+            assert client.get_playlist_id("Workout ") == "p1"
+            assert client.get_playlist_track_ids("p1") == ["t1"]
+            assert client.get_playlist_track_ids("p1") == ["t1"]
+            assert MockRequestsGet.call_count == 2
+
+            client.invalidate_playlist("p1")
+            assert client.get_playlist_track_ids("p1") == ["t1"]
+            assert MockRequestsGet.call_count == 3
+            assert client.cache_stats()["names"]["hits"] == 1
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_misheard_album_found_in_index_mock(self):
+        client = mocked_client(index_file=":memory:")
+        client.index.upsert([
+            {"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic", "AlbumArtist": "Thrice"},
+            {"Id": "t1", "Type": "Audio", "Name": "Deadweight", "AlbumId": "a1", "IndexNumber": 1},
+        ])
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            music_info = client.get_album("the sceptic", -1, "unknown-artist")
+
+            assert MockRequestsGet.call_count == 0
+            assert music_info.track_ids == ["t1"]
+            assert not music_info.exact    # only sounds like what was asked for
+            assert not client.get_unknown_music("the sceptic", "unknown-artist").exact
+            assert client.get_album("the skeptic", -1, "unknown-artist").exact
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_warm_up_fetches_name_tables_mock(self):
+        client = mocked_client(index_file=":memory:")
+        tables = {"IncludeItemTypes=Playlist": [{"Id": "p1", "Type": "Playlist", "Name": "Workout"}],
+                  "/emby/Artists": [{"Id": "r1", "Type": "MusicArtist", "Name": "Thrice"}],
+                  "IncludeItemTypes=MusicAlbum": [{"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic"}]}
+
+        def get(url, **kwargs):
+            items = next(items for key, items in tables.items() if key in url)
+            if "Limit=0" in url:
+                items = []
+            return MockResponse(200, {"Items": items, "TotalRecordCount": 1})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = get
+            assert client.warm_up() == 3
+            assert client.warm_up_progress["state"] == "done"
+            assert client.get_playlist_id("workout") == "p1"
+            assert MockRequestsGet.call_count == 6
+            assert len(client.fuzzy) == 2
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_add_album_to_playlist_in_one_post_mock(self):
+        client = mocked_client()
+        responses = {"IncludeItemTypes=Playlist": [{"Id": "p1", "Type": "Playlist", "Name": "Road Trip"}],
+                     "IncludeItemTypes=MusicAlbum": [{"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic",
+                                                      "Artists": ["Thrice"]}],
+                     "ParentId=a1": [{"Id": track_id, "Type": "Audio", "Name": track_id, "Artists": ["Thrice"]}
+                                     for track_id in ("t1", "t2", "t3")],
+                     "Playlists/p1/Items": [{"Id": "t1", "Type": "Audio", "Name": "t1", "PlaylistItemId": "e1"}]}
+
+        def get(url, **kwargs):
+            items = next(items for key, items in responses.items() if key in url)
+            return MockResponse(200, {"Items": items, "TotalRecordCount": len(items)})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet, \
+                mock.patch('requests.Session.post') as MockRequestsPost:
+            MockRequestsGet.side_effect = get
+            MockRequestsPost.return_value = MockResponse(204, {})
+            mesg_file, _ = client.add_to_playlist("album the skeptic to playlist road trip".split())
+
+            assert mesg_file == "ok_its_done"
+            assert MockRequestsPost.call_count == 1
+            assert MockRequestsPost.call_args[1]["json"]["Ids"] == "t2,t3"
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_remove_album_from_playlist_in_one_delete_mock(self):
+        client = mocked_client()
+        responses = {"IncludeItemTypes=Playlist": [{"Id": "p1", "Type": "Playlist", "Name": "Road Trip"}],
+                     "IncludeItemTypes=MusicAlbum": [{"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic",
+                                                      "Artists": ["Thrice"]}],
+                     "ParentId=a1": [{"Id": track_id, "Type": "Audio", "Name": track_id, "Artists": ["Thrice"]}
+                                     for track_id in ("t1", "t2")],
+                     "Playlists/p1/Items": [{"Id": "t1", "Type": "Audio", "Name": "t1", "PlaylistItemId": "e1"},
+                                            {"Id": "t9", "Type": "Audio", "Name": "t9", "PlaylistItemId": "e2"},
+                                            {"Id": "t2", "Type": "Audio", "Name": "t2", "PlaylistItemId": "e3"},
+                                            {"Id": "t1", "Type": "Audio", "Name": "t1", "PlaylistItemId": "e4"}]}
+
+        def get(url, **kwargs):
+            items = next(items for key, items in responses.items() if key in url)
+            return MockResponse(200, {"Items": items, "TotalRecordCount": len(items)})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet, \
+                mock.patch('requests.Session.delete') as MockRequestsDelete:
+            MockRequestsGet.side_effect = get
+            MockRequestsDelete.return_value = MockResponse(204, {})
+            mesg_file, _ = client.delete_from_playlist("album the skeptic from playlist road trip".split())
+
+            assert mesg_file == "ok_its_done"
+            assert MockRequestsDelete.call_count == 1
+            assert "/emby/Playlists/p1/Items?EntryIds=e1,e4,e3&" in MockRequestsDelete.call_args[0][0]
+            assert client.get_playlist_track_ids("p1") == ["t9"]
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_genre_filtered_by_server_mock(self):
+        client = mocked_client()
+        genres = {"Items": [{"Id": "g1", "Type": "MusicGenre", "Name": "Hip-Hop"},
+                            {"Id": "g2", "Type": "MusicGenre", "Name": "Jazz"}], "TotalRecordCount": 2}
+        tracks = {"Items": [{"Id": "t1", "Type": "Audio"}, {"Id": "t2", "Type": "Audio"}], "TotalRecordCount": 2}
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(200, genres), MockResponse(200, tracks),
+                                           MockResponse(200, tracks)]
+            music_info = client.parse_music("genre hip hop")
+            client.parse_music("genre jazz")
+
+            assert sorted(music_info.track_ids) == ["t1", "t2"]
+            assert MockRequestsGet.call_count == 3
+            url = MockRequestsGet.call_args_list[1][0][0]
+            assert "GenreIds=g1" in url and "SortBy=Random" in url and "Limit=" in url
+
+    @pytest.mark.mocked
+    def test_empty_genre_table_not_cached_mock(self):
+        client = mocked_client()
+        genres = {"Items": [{"Id": "g2", "Type": "MusicGenre", "Name": "Jazz"}], "TotalRecordCount": 1}
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(200, {"Items": [], "TotalRecordCount": 0}),
+                                           MockResponse(200, genres)]
+            assert client.get_genre_id("jazz") == (-1, "jazz") # the server has not scanned its genres yet
+            assert client.get_genre_id("jazz") == ("g2", "Jazz")
+            assert client.get_genre_id("jazz") == ("g2", "Jazz")
+            assert MockRequestsGet.call_count == 2
+
+    @pytest.mark.client
+    @pytest.mark.mocked
+    def test_items_url_projects_fields_mock(self):
+        client = mocked_client()
+        url = client.items_url("/emby/Items?Recursive=true", limit=1, searchterm="road trip")
+
+        assert url.startswith("/emby/Items?Recursive=true&searchterm=road%20trip&Fields=")
+        assert "EnableImages=false&EnableUserData=false&Limit=1&api_key=token1" in url
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.return_value = MockResponse(200, {"Items": [{"Id": "p1", "Type": "Playlist"}],
+                                                              "TotalRecordCount": 3})
+            assert client.get_playlist_id("road trip") == "p1"
+            assert "&Limit=1&" in MockRequestsGet.call_args[0][0]
+
+    @pytest.mark.mocked
+    def test_compressed_responses_mock(self):
+        client = mocked_client()
+
+        assert client.session.headers["Accept-Encoding"] == "gzip, deflate"
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            response = MockResponse(200, {"Items": [{"Id": "p1", "Type": "Playlist"}], "TotalRecordCount": 1})
+            response.json = None           # decoded from the body bytes, not with response.json()
+            MockRequestsGet.return_value = response
+            assert client.get_playlist_id("road trip") == "p1"
+
+    @pytest.mark.mocked
+    def test_open_circuit_answers_from_cache_mock(self):
+        with mock.patch('threading.Timer'):
+            client = mocked_client(breaker=CircuitBreaker(threshold=1))
+            artists = {"Items": [{"Id": "a1", "Name": "Wage War", "Type": "MusicArtist"}], "TotalRecordCount": 1}
+
+            with mock.patch('requests.Session.get') as MockRequestsGet:
+                MockRequestsGet.return_value = MockResponse(200, artists)
+                assert client.get_artist("wage war", -1, True).entity["id"] == "a1"
+
+                MockRequestsGet.side_effect = requests.exceptions.ConnectionError("refused")
+                with pytest.raises(requests.exceptions.ConnectionError):
+                    client.get_artist("thrice", -1, True)
+                assert client.breaker.is_open()
+                num_calls = MockRequestsGet.call_count
+
+                with mock.patch('time.monotonic', return_value=time.monotonic() + 86400): # cached lookups expired
+                    assert client.get_artist("wage war", -1, True).entity["id"] == "a1"
+                    with pytest.raises(CircuitOpenError):
+                        client.get_artist("thrice", -1, True)
+                assert MockRequestsGet.call_count == num_calls
+
+                MockRequestsGet.side_effect = None # the probe finds the server back
+                client.breaker._run_probe()
+                assert not client.breaker.is_open()
+
+    @pytest.mark.mocked
+    def test_deadline_returns_album_without_tracks_mock(self):
+        client = mocked_client()
+        deadline = Deadline(2)
+        albums = {"Items": [{"Id": "a1", "Type": "MusicAlbum", "Name": "Deadweight", "Artists": ["Wage War"]}],
+                  "TotalRecordCount": 1}
+
+        def get(url, timeout=None, **kwargs):
+            assert max(timeout) <= 2        # every call gets what is left of the deadline
+            if "IncludeItemTypes=MusicAlbum" in url:
+                return MockResponse(200, albums)
+            deadline.expires = time.monotonic() # the track fetch uses up the budget
+            raise requests.exceptions.ReadTimeout("read timed out")
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = get
+            music_info = client.parse_music("album deadweight", deadline=deadline)
+
+            assert music_info.match_type == "album"
+            assert music_info.track_ids is None
+            assert music_info.entity["id"] == "a1"
+            assert client.breaker.state()["failures"] == 0 # the server was not at fault
+
+            with pytest.raises(DeadlineExceeded):  # no time left to start another call
+                client.get_music("artist", None, "thrice", deadline=deadline)
+
+    @pytest.mark.mocked
+    def test_parallel_lookups_log_in_once_mock(self):
+        client = mocked_client()
+        logins = client.login_count
+        barrier = threading.Barrier(3, timeout=5)
+
+        def get(url, headers=None, **kwargs):
+            if "token1" in url:
+                barrier.wait()             # all three lookups are rejected together
+                return MockResponse(401, "")
+            assert headers["X-Emby-Token"] == "token2"
+            return MockResponse(200, {"Items": [], "TotalRecordCount": 0})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet, \
+                mock.patch('requests.Session.post') as MockRequestsPost:
+            MockRequestsGet.side_effect = get
+            MockRequestsPost.return_value = MockResponse(200, {"User": {"Id": "user1"}, "AccessToken": "token2"})
+            client.get_unknown_music("the skeptic", "unknown-artist")
+
+            assert MockRequestsPost.call_count == 1
+            assert "X-Emby-Token" not in MockRequestsPost.call_args[1]["headers"]
+        assert client.login_count == logins + 1
+        assert client.auth.token == "token2"
+
+    @pytest.mark.mocked
+    def test_lookup_misses_not_cached_mock(self):
+        client = mocked_client()
+        found = {"Items": [{"Id": "p1", "Type": "Playlist"}], "TotalRecordCount": 1}
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = [MockResponse(200, {"Items": [], "TotalRecordCount": 0}),
+                                           MockResponse(200, found)]
+            assert client.get_playlist_id("road trip") == -1
+            assert client.get_playlist_id("road trip") == "p1" # created on the server since
+            assert client.get_playlist_id("road trip") == "p1"
+            assert MockRequestsGet.call_count == 2
+
+    @pytest.mark.mocked
+    def test_speculative_fetch_outlives_match_mock(self):
+        client = mocked_client()
+        album = {"Id": "a1", "Type": "MusicAlbum", "Name": "The Skeptic", "AlbumArtist": "Thrice"}
+        timeouts = {}
+
+        def get(url, timeout=None, **kwargs):
+            if "Artists?searchterm" in url or "IncludeItemTypes=Audio" in url:
+                return MockResponse(200, {"Items": []})
+            if "IncludeItemTypes=MusicAlbum" in url:
+                return MockResponse(200, {"Items": [album]})
+            timeouts["tracks"] = timeout
+            return MockResponse(200, {"Items": [{"Id": "t1", "Type": "Audio", "Name": "One"}]})
+
+        with mock.patch('requests.Session.get') as MockRequestsGet:
+            MockRequestsGet.side_effect = get
+            music_info = client.match_music("the skeptic", deadline=Deadline(5))
+            client.speculative[("album", "a1")][1].result()
+
+            assert music_info.track_ids is None
+            assert timeouts["tracks"] == client.timeout # not the match timeout or the deadline
+            client.drop_speculative()
+            assert client.speculative == {}
+
+
+def mocked_client(**kwargs):
+    """
+    Return an EmbyClient logged in against a mocked server
+    """
+    auth = {"User": {"Id": "user1"}, "AccessToken": "token1"}
+    with mock.patch('requests.Session.post') as MockRequestsPost:
+        MockRequestsPost.return_value = MockResponse(200, auth)
+        return EmbyClient(HOST, USERNAME, PASSWORD, **kwargs)
+
+
+class MockResponse:
+    def __init__(self, status_code, json_data):
+        self.json_data = json_data
+        self.text = json_data
+        self.content = json.dumps(json_data).encode()
+        self.status_code = status_code
+
+    def json(self):
+        return self.json_data
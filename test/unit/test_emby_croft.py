@@ -30,7 +30,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_auth_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -41,7 +41,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_instant_mix_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             search_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["search_response"]
             get_songs_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["get_songs_response"]
@@ -51,7 +51,7 @@ class TestEmbyCroft(object):
             MockRequestsPost.return_value = response
             emby_croft = EmbyCroft(HOST, USERNAME, PASSWORD)
 
-            with mock.patch('requests.get') as MockRequestsGet:
+            with mock.patch('requests.Session.get') as MockRequestsGet:
                 responses = [MockResponse(200, search_response), MockResponse(200, get_songs_response)]
                 MockRequestsGet.side_effect = responses
 
@@ -61,7 +61,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_parsing_common_phrase_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -74,7 +74,7 @@ class TestEmbyCroft(object):
                     "search_response"]
                 get_songs_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["common_play"][match_type][
                     "songs_response"]
-                with mock.patch('requests.get') as MockRequestsGet:
+                with mock.patch('requests.Session.get') as MockRequestsGet:
                     responses = [MockResponse(200, search_response), MockResponse(200, get_songs_response)]
                     MockRequestsGet.side_effect = responses
 
@@ -83,6 +83,51 @@ class TestEmbyCroft(object):
                     assert match_type == TestEmbyCroft.common_phrases[phrase]["match_type"]
                     assert songs
 
+    @pytest.mark.mocked
+    def test_auth_token_reused_mock(self, tmp_path):
+        token_file = str(tmp_path / "emby_token.json")
+        with mock.patch('requests.Session.post') as MockRequestsPost:
+            auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
+            MockRequestsPost.return_value = MockResponse(200, auth_server_response)
+            EmbyCroft(HOST, USERNAME, PASSWORD, token_file=token_file)
+            emby_croft = EmbyCroft(HOST, USERNAME, PASSWORD, token_file=token_file)
+
+            assert MockRequestsPost.call_count == 1
+            assert emby_croft.client.auth.token == auth_server_response["AccessToken"]
+            assert emby_croft.client.logins_per_hour() == 0
+
+    @pytest.mark.mocked
+    def test_version_read_once_from_file_mock(self, tmp_path):
+        version_file = tmp_path / "VERSION"
+        version_file.write_text("v1.2-3-gabcdef\n")
+        with mock.patch('emby_croft.VERSION_FILE', str(version_file)), \
+                mock.patch.object(EmbyCroft, 'cached_version', None), \
+                mock.patch('subprocess.check_output') as MockCheckOutput, \
+                mock.patch('requests.Session.post') as MockRequestsPost:
+            auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
+            MockRequestsPost.return_value = MockResponse(200, auth_server_response)
+            EmbyCroft(HOST, USERNAME, PASSWORD)
+            version_file.unlink()
+            emby_croft = EmbyCroft(HOST, USERNAME, PASSWORD)
+
+            assert emby_croft.version == "v1.2-3-gabcdef"
+            assert MockCheckOutput.call_count == 0
+
+    @pytest.mark.mocked
+    def test_auth_retried_on_401_mock(self):
+        with mock.patch('requests.Session.post') as MockRequestsPost:
+            auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
+            MockRequestsPost.return_value = MockResponse(200, auth_server_response)
+            emby_croft = EmbyCroft(HOST, USERNAME, PASSWORD)
+
+            with mock.patch('requests.Session.get') as MockRequestsGet:
+                MockRequestsGet.side_effect = [MockResponse(401, ""), MockResponse(200, {})]
+                response = emby_croft.get_server_info()
+
+                assert response.status_code == 200
+                assert MockRequestsPost.call_count == 2
+                assert emby_croft.client.logins_per_hour() == 2
+
     @pytest.mark.mocked
     def test_determine_intent(self):
         #@ToDo use pytest.parameterize
@@ -101,7 +146,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_find_songs_by_artist_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -111,7 +156,7 @@ class TestEmbyCroft(object):
                 "search_response"]
             get_songs_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["artist_search"][
                 "songs_response"]
-            with mock.patch('requests.get') as MockRequestsGet:
+            with mock.patch('requests.Session.get') as MockRequestsGet:
                 responses = [MockResponse(200, search_response), MockResponse(200, get_songs_response)]
                 MockRequestsGet.side_effect = responses
 
@@ -122,7 +167,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_find_songs_by_album_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -132,7 +177,7 @@ class TestEmbyCroft(object):
                 "search_response"]
             get_songs_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["album_search"][
                 "songs_response"]
-            with mock.patch('requests.get') as MockRequestsGet:
+            with mock.patch('requests.Session.get') as MockRequestsGet:
                 responses = [MockResponse(200, search_response), MockResponse(200, get_songs_response)]
                 MockRequestsGet.side_effect = responses
 
@@ -143,7 +188,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_handle_intent_by_playlist_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -153,7 +198,7 @@ class TestEmbyCroft(object):
                 "search_response"]
             get_songs_response = TestEmbyCroft.mocked_responses["emby"]["4.2.1.0"]["playlist_search"][
                 "songs_response"]
-            with mock.patch('requests.get') as MockRequestsGet:
+            with mock.patch('requests.Session.get') as MockRequestsGet:
                 responses = [MockResponse(200, search_response), MockResponse(200, get_songs_response)]
                 MockRequestsGet.side_effect = responses
 
@@ -164,7 +209,7 @@ class TestEmbyCroft(object):
 
     @pytest.mark.mocked
     def test_handle_intent_by_song_mock(self):
-        with mock.patch('requests.post') as MockRequestsPost:
+        with mock.patch('requests.Session.post') as MockRequestsPost:
             auth_server_response = TestEmbyCroft.mocked_responses["emby"]["3.5.2.0"]["auth_server_response"]
             response = MockResponse(200, auth_server_response)
             MockRequestsPost.return_value = response
@@ -172,7 +217,7 @@ class TestEmbyCroft(object):
 
             search_response = TestEmbyCroft.mocked_responses["emby"]["4.4.3.0"]["song_search"][
                 "search_response"]
-            with mock.patch('requests.get') as MockRequestsGet:
+            with mock.patch('requests.Session.get') as MockRequestsGet:
                 responses = [MockResponse(200, search_response)]
                 MockRequestsGet.side_effect = responses
 
@@ -186,7 +231,7 @@ class TestEmbyCroft(object):
 
         emby_croft = EmbyCroft(HOST, USERNAME, PASSWORD, diagnostic=True)
 
-        with mock.patch('requests.get') as MockRequestsGet:
+        with mock.patch('requests.Session.get') as MockRequestsGet:
             public_info_response = TestEmbyCroft.mocked_responses["emby"]["4.1.1.0"]["public_info"]
             response = MockResponse(200, public_info_response)
             MockRequestsGet.return_value = response
@@ -200,7 +245,7 @@ class TestEmbyCroft(object):
 
         emby_croft = EmbyCroft('badhostHere', USERNAME, PASSWORD, diagnostic=True)
 
-        with mock.patch('requests.get') as MockRequestsGet:
+        with mock.patch('requests.Session.get') as MockRequestsGet:
             MockRequestsGet.side_effect = Exception('Fail')
             connection_success, info = emby_croft.diag_public_server_info()
 
@@ -311,6 +356,7 @@ class MockResponse:
     def __init__(self, status_code, json_data):
         self.json_data = json_data
         self.text = json_data
+        self.content = json.dumps(json_data).encode()
         self.status_code = status_code
 
     def json(self):
@@ -0,0 +1,33 @@
+import pytest
+
+from fuzzy_index import FuzzyIndex, similarity
+
+
+class TestFuzzyIndex(object):
+
+    @pytest.mark.mocked
+    def test_misheard_names_found(self):
+        index = FuzzyIndex()
+        index.add("1", "MusicArtist", "Dance Gavin Dance")
+        index.add("2", "MusicAlbum", "The Skeptic")
+        index.add("3", "Audio", "I'd Rather See Your Star Explode")
+
+        assert index.search("dance gavin dancer", "MusicArtist")[0][1] == "1"
+        assert index.search("the sceptic", "MusicAlbum")[0][1] == "2"
+        assert index.search("id rather see your star explode", "Audio")[0][1] == "3"
+        assert index.search("the skeptic", "Audio") == []
+        assert index.search("thrice", "MusicArtist") == []
+
+    @pytest.mark.mocked
+    def test_remove(self):
+        index = FuzzyIndex()
+        index.add("2", "MusicAlbum", "The Skeptic")
+        index.remove("2")
+
+        assert index.search("the skeptic", "MusicAlbum") == []
+        assert index.postings == {}
+
+    @pytest.mark.mocked
+    def test_similarity(self):
+        assert similarity("The Skeptic", "the skeptic") == 1.0
+        assert similarity("the skeptic", "deadweight") < 0.2
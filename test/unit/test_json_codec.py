@@ -0,0 +1,31 @@
+import json
+
+import pytest
+import requests
+
+import json_codec
+
+
+def response_of(data):
+    response = requests.models.Response()
+    response._content = data
+    response.status_code = 200
+    return response
+
+
+class TestJsonCodec(object):
+
+    @pytest.mark.mocked
+    def test_decode_matches_stdlib(self):
+        payload = {"Items": [{"Id": "1", "Name": "Sigur Rós – Hoppípolla", "RunTimeTicks": 2680000000,
+                              "IsFolder": False, "Artists": ["Sigur Rós"], "UserData": None}],
+                   "TotalRecordCount": 1}
+        data = json.dumps(payload, ensure_ascii=False).encode()
+
+        assert json_codec.decode(response_of(data)) == payload
+        assert json_codec.decode(response_of(data)) == response_of(data).json()
+
+    @pytest.mark.mocked
+    def test_decode_error_is_value_error(self):
+        with pytest.raises(ValueError):
+            json_codec.decode(response_of(b"<html>Bad Gateway</html>"))
@@ -0,0 +1,42 @@
+import pytest
+
+from library_index import LibraryIndex, ARTIST_TYPE, ALBUM_TYPE, TRACK_TYPE
+
+ITEMS = [
+    {"Id": "1", "Type": "MusicArtist", "Name": "Dance Gavin Dance"},
+    {"Id": "2", "Type": "MusicAlbum", "Name": "The Skeptic", "AlbumArtist": "Thrice"},
+    {"Id": "3", "Type": "Audio", "Name": "Stitch", "Album": "The Skeptic", "AlbumId": "2",
+     "AlbumArtist": "Thrice", "IndexNumber": 2, "ArtistItems": [{"Id": "1"}]},
+    {"Id": "4", "Type": "Audio", "Name": "Deadweight", "Album": "The Skeptic", "AlbumId": "2",
+     "AlbumArtist": "Thrice", "IndexNumber": 1, "ArtistItems": [{"Id": "1"}]},
+]
+
+
+class TestLibraryIndex(object):
+
+    @pytest.mark.mocked
+    def test_find_exact_and_partial(self):
+        index = LibraryIndex(":memory:")
+        index.upsert(ITEMS)
+
+        assert index.find("the skeptic", ALBUM_TYPE)[0]["id"] == "2"
+        assert index.find("gavin", ARTIST_TYPE)[0]["id"] == "1"
+        assert index.find("the skeptic", TRACK_TYPE) == []
+
+    @pytest.mark.mocked
+    def test_tracks_in_order(self):
+        index = LibraryIndex(":memory:")
+        index.upsert(ITEMS)
+
+        assert index.tracks_for_album("2") == ["4", "3"]
+        assert sorted(index.tracks_for_artist("1")) == ["3", "4"]
+
+    @pytest.mark.mocked
+    def test_delete(self):
+        index = LibraryIndex(":memory:")
+        index.upsert(ITEMS)
+        index.delete(["3"])
+
+        assert index.count(TRACK_TYPE) == 1
+        assert index.find("stitch", TRACK_TYPE) == []
+        assert index.tracks_for_artist("1") == ["4"]
@@ -0,0 +1,42 @@
+import pytest
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Metrics, endpoint_of
+
+
+class TestMetrics(object):
+
+    @pytest.mark.mocked
+    def test_calls_grouped_by_intent(self):
+        metrics = Metrics()
+        with ThreadPoolExecutor(1) as executor:
+            with metrics.intent("handle_emby") as trace:
+                metrics.record_call("get", "/emby/Items?searchterm=x", 200, 100, 0.03)
+                executor.submit(contextvars.copy_context().run, metrics.record_call,
+                                "get", "/emby/Playlists/5a0b1c2d3e4f5a6b7c8d/Items", 200, 50, 0.2).result()
+        metrics.record_call("get", "/System/Info/Public", "error", 0, 1.5)
+
+        assert [span.endpoint for span in trace.spans] == ["/emby/Items", "/emby/Playlists/{id}/Items"]
+        calls = metrics.snapshot()["calls"]
+        assert [(call["intent"], call["status"]) for call in calls] == [
+            ("background", "error"), ("handle_emby", "200"), ("handle_emby", "200")]
+        assert calls[1]["seconds"]["buckets"]["0.05"] == 1
+        assert metrics.snapshot()["intents"]["handle_emby"]["count"] == 1
+
+    @pytest.mark.mocked
+    def test_prometheus_text(self, tmp_path):
+        metrics = Metrics()
+        with metrics.intent("handle_playlist"):
+            metrics.record_call("post", "/emby/Playlists/?api_key=x", 204, 0, 0.01)
+        path = str(tmp_path / "emby_metrics.prom")
+        metrics.write(path)
+
+        with open(path) as metrics_file:
+            text = metrics_file.read()
+        assert 'emby_http_requests_total{intent="handle_playlist",method="POST",endpoint="/emby/Playlists/",status="204"} 1' in text
+        assert 'emby_intent_seconds_count{intent="handle_playlist"} 1' in text
+
+    @pytest.mark.mocked
+    def test_endpoint_of(self):
+        assert endpoint_of("/emby/Items/12345?api_key=x") == "/emby/Items/{id}"
@@ -0,0 +1,41 @@
+import json
+import os
+import pytest
+
+from music_grammar import MusicRequest, parse_play, parse_playlist_command
+
+PHRASES_FILE = os.path.join(os.path.dirname(__file__), "common_phrases.json")
+MATCH_TYPE_INTENTS = {"artist": ("artist", "unknown"), "song": ("track", "unknown"), "album": ("album", "unknown")}
+
+
+class TestMusicGrammar(object):
+
+    @pytest.mark.mocked
+    @pytest.mark.parametrize("phrase, expected", [
+        ("album", MusicRequest("partial", "album", "unknown-artist", None)),
+        ("random music", MusicRequest("music", "random music", "unknown-artist", None)),
+        ("genre jazz", MusicRequest("genre", "jazz", "unknown-artist", None)),
+        ("playlist workout", MusicRequest("playlist", "workout", "unknown-artist", "workout")),
+        ("record the skeptic by band thrice", MusicRequest("album-artist", "the skeptic", "thrice", None)),
+        ("song stand by me by ben e king", MusicRequest("track-artist", "stand by me", "ben e king", None)),
+        ("artist dance gavin dance", MusicRequest("artist", "all_music", "dance gavin dance", None)),
+        ("playlist rock by the sea", MusicRequest("unknown-artist", "playlist rock", "the sea", None)),
+        ("the skeptic", MusicRequest("unknown", "the skeptic", "unknown-artist", None)),
+    ])
+    def test_parse_play(self, phrase, expected):
+        assert parse_play(phrase) == expected
+
+    @pytest.mark.mocked
+    def test_common_phrases(self):
+        with open(PHRASES_FILE) as phrases_file:
+            phrases = json.load(phrases_file)
+        for phrase, expected in phrases.items():
+            assert parse_play(phrase.lower()).intent in MATCH_TYPE_INTENTS[expected["match_type"]]
+
+    @pytest.mark.mocked
+    def test_parse_playlist_command(self):
+        assert parse_playlist_command("create", "road trip from song the skeptic") == \
+            MusicRequest("create", "the skeptic", "unknown-artist", "road trip")
+        assert parse_playlist_command("add", "album the skeptic to playlist road trip").playlist_name == "road trip"
+        assert parse_playlist_command("delete", "the skeptic from playlist road trip").music_name == "the skeptic"
+        assert parse_playlist_command("add", "the skeptic road trip") is None
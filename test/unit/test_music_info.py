@@ -0,0 +1,32 @@
+import pytest
+
+from music_info import Music_info, TrackIds
+
+
+class TestMusicInfo(object):
+
+    @pytest.mark.mocked
+    @pytest.mark.parametrize("track_ids,kind", [
+        (["12", "7", "0", "123456789012"], "decimal"),
+        (["5" + "0" * 30 + "a", "f" * 32], "guid"),
+        (["12", "007", "t1"], "other"),
+    ])
+    def test_track_ids_packed(self, track_ids, kind):
+        packed = TrackIds(track_ids)
+
+        assert packed.kind == kind
+        assert packed == track_ids
+        assert list(packed) == track_ids
+        assert packed[-1] == track_ids[-1]
+        assert packed[1:] == track_ids[1:]
+        assert len(packed) == len(track_ids)
+
+    @pytest.mark.mocked
+    def test_music_info_immutable(self):
+        music_info = Music_info("song", "", {}, ["t1"], lambda track_id: "/Audio/" + track_id)
+
+        with pytest.raises(AttributeError):
+            music_info.mesg_file = "playing_random"
+        assert music_info._replace(mesg_file="playing_random").mesg_file == "playing_random"
+        assert music_info.entity is None
+        assert list(music_info.track_uris) == ["/Audio/t1"]
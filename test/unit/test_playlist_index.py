@@ -0,0 +1,26 @@
+import pytest
+
+from playlist_index import PlaylistIndex
+
+
+class TestPlaylistIndex(object):
+
+    @pytest.mark.mocked
+    def test_entries_of_repeated_items(self):
+        playlist_index = PlaylistIndex([{"Id": "t1", "PlaylistItemId": "e1"}, {"Id": "t2", "PlaylistItemId": "e2"},
+                                        {"Id": "t1", "PlaylistItemId": "e3"}])
+
+        assert "t1" in playlist_index
+        assert playlist_index.item_ids() == ["t1", "t2"]
+        assert playlist_index.entry_ids(["t1", "t3"]) == ["e1", "e3"]
+
+    @pytest.mark.mocked
+    def test_updated_after_changes(self):
+        playlist_index = PlaylistIndex([{"Id": "t1", "PlaylistItemId": "e1"}])
+        playlist_index.added(["t2"])
+
+        assert "t2" in playlist_index
+        assert playlist_index.entry_ids(["t1"]) == ["e1"]
+        assert playlist_index.entry_ids(["t2"]) is None
+        playlist_index.removed(["t1", "t2"])
+        assert len(playlist_index) == 0
@@ -0,0 +1,40 @@
+import pytest
+from unittest import mock
+
+from response_cache import ResponseCache
+
+
+class TestResponseCache(object):
+
+    @pytest.mark.mocked
+    def test_least_recently_used_evicted(self):
+        cache = ResponseCache(2, 60)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.stats() == {"hits": 2, "misses": 1, "size": 2}
+
+    @pytest.mark.mocked
+    def test_entries_expire(self):
+        cache = ResponseCache(2, 60)
+        with mock.patch('time.monotonic') as MockMonotonic:
+            MockMonotonic.return_value = 100
+            cache.put("a", 1)
+            MockMonotonic.return_value = 161
+
+            assert cache.get("a", stale=True) == 1
+            assert cache.get("a") is None
+            assert cache.stats()["size"] == 0
+
+    @pytest.mark.mocked
+    def test_invalidate_matching(self):
+        cache = ResponseCache(4, 60)
+        cache.put(("u", "/playlists/p1/items"), 1)
+        cache.put(("u", "/items"), 2)
+
+        assert cache.invalidate(lambda key: "p1" in key[1]) == 1
+        assert cache.get(("u", "/items")) == 2
@@ -0,0 +1,59 @@
+import logging
+import pytest
+
+from structured_log import StructuredLog, redact
+
+
+class Expensive(object):
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return "expensive"
+
+
+class TestStructuredLog(object):
+
+    @pytest.mark.mocked
+    def test_tokens_redacted(self):
+        assert redact("/emby/Items?api_key=abc123&Limit=1") == "/emby/Items?api_key=***&Limit=1"
+        assert redact('MediaBrowser Client="Mycroft", Token="abc123"') == 'MediaBrowser Client="Mycroft", Token="***"'
+        assert redact("{'Username': 'me', 'Pw': 'secret'}") == "{'Username': 'me', 'Pw': '***'}"
+
+    @pytest.mark.mocked
+    def test_formatted_only_when_written(self, caplog):
+        log = StructuredLog("test.lazy")
+        value = Expensive()
+        caplog.set_level(logging.WARNING, logger="test.lazy")
+        log.log(20, "value %s", value)
+        assert value.formatted == 0
+
+        caplog.set_level(logging.INFO, logger="test.lazy")
+        log.log(20, "value %s url /Items?api_key=%s", value, "abc123", tracks=2)
+        assert value.formatted == 1
+        assert caplog.messages == ["value expensive url /Items?api_key=*** tracks=2"]
+
+    @pytest.mark.mocked
+    def test_call_sites_sampled(self, caplog):
+        log = StructuredLog("test.sampled")
+        caplog.set_level(logging.INFO, logger="test.sampled")
+        for i in range(10):
+            log.log(20, "sampled %s", i, sample=4)
+            log.log(20, "every %s", i)
+        assert [message for message in caplog.messages if message.startswith("sampled")] == \
+            ["sampled 0", "sampled 4", "sampled 8"]
+        assert len(caplog.messages) == 13
+
+    @pytest.mark.mocked
+    def test_quiet_keeps_timings(self, caplog):
+        log = StructuredLog("test.quiet")
+        caplog.set_level(logging.INFO, logger="test.quiet")
+        StructuredLog.set_quiet(True)
+        try:
+            log.log(20, "detail")
+            log.timing("intent %s took %sms", "play", 12)
+            log.warning("warning")
+        finally:
+            StructuredLog.set_quiet(False)
+        assert caplog.messages == ["intent play took 12ms", "warning"]